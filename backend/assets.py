@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+import mimetypes
+import re
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip is always available
+    brotli = None
+
+# Files smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+def accepted_encodings(accept_encoding: str) -> Set[str]:
+    """Parse an Accept-Encoding header, ignoring encodings refused with q=0"""
+    return {
+        part.split(";")[0].strip().lower()
+        for part in (accept_encoding or "").split(",")
+        if part.strip() and not part.replace(" ", "").endswith(("q=0", "q=0.0"))
+    }
+
+
+class Asset:
+    """A static file held in memory with precomputed encodings"""
+
+    def __init__(self, name: str, body: bytes, media_type: str):
+        self.name = name
+        self.media_type = media_type
+        self.version = hashlib.sha256(body).hexdigest()[:16]
+        self.etag = f'"{self.version}"'
+        self.encodings: Dict[str, bytes] = {"identity": body}
+
+        if len(body) >= MIN_COMPRESS_SIZE and media_type.startswith(COMPRESSIBLE_TYPES):
+            gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gzipped) < len(body):
+                self.encodings["gzip"] = gzipped
+            if brotli is not None:
+                brotlied = brotli.compress(body, quality=11)
+                if len(brotlied) < len(body):
+                    self.encodings["br"] = brotlied
+
+    def negotiate(self, accept_encoding: str) -> str:
+        """Pick the best precomputed encoding the client accepts"""
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.encodings and encoding in accepted:
+                return encoding
+        return "identity"
+
+
+class AssetStore:
+    """Loads the frontend once and serves it from memory"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.assets: Dict[str, Asset] = {}
+
+        if root.exists():
+            for path in sorted(root.rglob("*")):
+                if path.is_file():
+                    name = path.relative_to(root).as_posix()
+                    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                    if media_type.startswith("text/"):
+                        media_type += "; charset=utf-8"
+                    self.assets[name] = Asset(name, path.read_bytes(), media_type)
+
+        # Pre-render the page with fingerprinted references to the other assets
+        index = self.assets.get("index.html")
+        if index is not None:
+            html = self._fingerprint_references(index.encodings["identity"].decode("utf-8"))
+            self.assets["index.html"] = Asset("index.html", html.encode("utf-8"), index.media_type)
+
+    def _fingerprint_references(self, html: str) -> str:
+        """Rewrite /static/<name> links to /static/<name>?v=<hash> so they can be cached forever"""
+        def replace(match):
+            asset = self.assets.get(match.group(2))
+            if asset is None:
+                return match.group(0)
+            return f"{match.group(1)}/static/{asset.name}?v={asset.version}{match.group(3)}"
+
+        return re.sub(r'(["\'])/static/([^"\'?#]+)(["\'])', replace, html)
+
+    def get(self, name: str) -> Optional[Asset]:
+        return self.assets.get(name)
+
+    @property
+    def index(self) -> Optional[Asset]:
+        return self.assets.get("index.html")
@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops calling a backend that keeps failing or answering slowly
+
+    Outcomes of the last `window` calls are kept. Once at least `min_calls`
+    are in and the share of errors, or of calls slower than `slow_seconds`,
+    reaches `failure_rate`, the circuit opens and calls are refused for
+    `open_seconds`. After that a single probe call is let through (half-open):
+    success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, window: int = 20, min_calls: int = 5, failure_rate: float = 0.5,
+                 slow_seconds: float = 20.0, open_seconds: float = 30.0):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_seconds = slow_seconds
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self._outcomes = deque(maxlen=window)  # (failed, slow) per call
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _cooled_down(self) -> bool:
+        return time.monotonic() - self.opened_at >= self.open_seconds
+
+    def available(self) -> bool:
+        """Whether a call would be let through now, without claiming the probe"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            return not self._probing and (self.state == HALF_OPEN or self._cooled_down())
+
+    def allow(self) -> bool:
+        """Claim permission for one call; in half-open state only the probe gets it"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self._cooled_down():
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record(self, failed: bool, seconds: float) -> None:
+        """Report the outcome of a call that allow() let through"""
+        slow = seconds >= self.slow_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if failed or slow:
+                    self._open()
+                else:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                return
+
+            self._outcomes.append((failed, slow))
+            if self.state == CLOSED and len(self._outcomes) >= self.min_calls:
+                failures = sum(1 for failed, _ in self._outcomes if failed)
+                slow_calls = sum(1 for _, slow in self._outcomes if slow)
+                limit = self.failure_rate * len(self._outcomes)
+                if failures >= limit or slow_calls >= limit:
+                    self._open()
+
+    def release(self) -> None:
+        """Give back a call that allow() let through without reporting an outcome
+
+        For calls that ended for the caller's reasons (its deadline, a
+        cancellation, a replay miss), which say nothing about the backend.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        self._outcomes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "trips": self.trips,
+                "recent_calls": len(self._outcomes),
+                "recent_failures": sum(1 for failed, _ in self._outcomes if failed),
+            }
+
+
+def from_env() -> CircuitBreaker:
+    """A breaker configured by the LLM_BREAKER_* environment variables"""
+    return CircuitBreaker(
+        window=int(os.getenv("LLM_BREAKER_WINDOW", 20)),
+        min_calls=int(os.getenv("LLM_BREAKER_MIN_CALLS", 5)),
+        failure_rate=float(os.getenv("LLM_BREAKER_FAILURE_RATE", 0.5)),
+        slow_seconds=float(os.getenv("LLM_BREAKER_SLOW_SECONDS", 20)),
+        open_seconds=float(os.getenv("LLM_BREAKER_OPEN_SECONDS", 30)),
+    )
@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, Any, Optional
+
+import llm
+
+
+class LazyComponent:
+    """Builds a heavy component on first access and reuses it afterwards"""
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+        self.build_seconds = None
+
+    def __call__(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    start = time.perf_counter()
+                    self._instance = self._factory()
+                    self.build_seconds = time.perf_counter() - start
+        return self._instance
+
+    @property
+    def built(self) -> bool:
+        return self._instance is not None
+
+
+def _build_transformer():
+    from transformer import CodeTransformer
+    return CodeTransformer()
+
+
+def _build_converter():
+    from converter import LanguageConverter
+    return LanguageConverter()
+
+
+def _build_explainer():
+    from explainer import CodeExplainer
+    return CodeExplainer()
+
+
+def _build_verifier():
+    from verifier import ConversionVerifier
+    return ConversionVerifier()
+
+
+def _build_perfcheck():
+    from perfcheck import PerformanceChecker
+    return PerformanceChecker()
+
+
+def _build_snippets():
+    from similarity import SnippetIndex
+    return SnippetIndex()
+
+
+def _build_assets():
+    from pathlib import Path
+    from assets import AssetStore
+    return AssetStore(Path(__file__).parent.parent / "frontend")
+
+
+transformer = LazyComponent("transformer", _build_transformer)
+converter = LazyComponent("converter", _build_converter)
+explainer = LazyComponent("explainer", _build_explainer)
+assets = LazyComponent("assets", _build_assets)
+verifier = LazyComponent("verifier", _build_verifier)
+perfcheck = LazyComponent("perfcheck", _build_perfcheck)
+snippets = LazyComponent("snippets", _build_snippets)
+
+# Future engines (AST rewriters, caches, translation memory) register here too
+REGISTRY: Dict[str, LazyComponent] = {
+    component.name: component
+    for component in (transformer, converter, explainer, assets, verifier, perfcheck, snippets)
+}
+
+_warmup_state = {"status": "idle", "error": None, "seconds": None, "finished": None}
+_warmup_lock = threading.Lock()
+# A failed warm-up is retried by the next readiness check after this long
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", 30))
+
+
+def register(name: str, factory: Callable[[], Any]) -> LazyComponent:
+    """Register an additional lazily-built component"""
+    component = LazyComponent(name, factory)
+    REGISTRY[name] = component
+    return component
+
+
+def warmup_enabled() -> bool:
+    """Warm-up is opt-in via the WARMUP environment variable"""
+    return os.getenv("WARMUP", "false").lower() == "true"
+
+
+def warm_up() -> None:
+    """Build every registered component and open the LLM connection"""
+    _warmup_state.update(status="running", error=None)
+    start = time.perf_counter()
+    try:
+        for component in list(REGISTRY.values()):
+            component()
+        llm.warm_up()
+        _warmup_state["status"] = "done"
+    except Exception as e:
+        _warmup_state["status"] = "failed"
+        _warmup_state["error"] = str(e)
+        print(f"⚠️ Warm-up failed: {e}")
+    finally:
+        _warmup_state["seconds"] = round(time.perf_counter() - start, 4)
+        _warmup_state["finished"] = time.time()
+
+
+def start_background_warm_up() -> Optional[threading.Thread]:
+    """Run warm-up on a daemon thread so startup is never blocked"""
+    with _warmup_lock:
+        if _warmup_state["status"] == "running":
+            return None
+        _warmup_state["status"] = "running"
+    thread = threading.Thread(target=warm_up, name="syntax-shift-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def readiness() -> Dict[str, Any]:
+    """Report whether the service can take traffic
+
+    Ready only once warm-up has succeeded (or when it is off). A failed
+    warm-up reports "degraded" and is retried after WARMUP_RETRY_SECONDS.
+    """
+    status = _warmup_state["status"]
+    if status == "failed" and time.time() - _warmup_state["finished"] >= WARMUP_RETRY_SECONDS:
+        start_background_warm_up()
+    return {
+        "ready": status in ("idle", "done"),
+        "status": {"running": "starting", "failed": "degraded"}.get(status, "ok"),
+        "warmup": dict(_warmup_state),
+        "llm_configured": llm.is_configured(),
+        "llm_connected": llm.is_connected(),
+        "llm_backends": llm.status(),
+        "components": {
+            name: component.built for name, component in REGISTRY.items()
+        },
+    }
@@ -0,0 +1,100 @@
+import contextvars
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+class RequestAborted(RuntimeError):
+    """The request was cancelled or ran out of time"""
+
+
+class RequestContext:
+    """State that follows one API request through every component"""
+
+    def __init__(self, client_id: str = "anonymous", operation: str = None, session_id: str = None,
+                 timeout: float = None):
+        from usage import Usage
+
+        self.request_id = uuid.uuid4().hex[:12]
+        self.client_id = client_id
+        self.operation = operation
+        # Editor session (X-Session-ID header), falling back to the client
+        self.session_id = session_id or client_id
+        self.usage = Usage()
+        self._cancelled = threading.Event()
+        # Set when an LLM call was refused because its backend is down
+        self.degraded = False
+        # Monotonic time after which nobody is waiting for the result
+        self.deadline = time.monotonic() + timeout if timeout else None
+        # For the request log: seconds per stage, memo hits and how an earlier result was reused
+        self.timings: Dict[str, float] = {}
+        self.cache_hits = 0
+        self.reused: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def add_timing(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def add_cache_hit(self) -> None:
+        with self._lock:
+            self.cache_hits += 1
+
+    def cancel(self) -> None:
+        """Mark the request as abandoned; LLM calls not yet started are skipped"""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, or None without one"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def has_time(self, seconds: float) -> bool:
+        """Whether a stage expected to take this long can still finish in time"""
+        remaining = self.remaining()
+        return not self.cancelled and (remaining is None or remaining >= seconds)
+
+    def check(self) -> None:
+        """Raise RequestAborted once the request is cancelled or past its deadline"""
+        if self.cancelled:
+            raise RequestAborted("Request was cancelled")
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise RequestAborted("Request deadline exceeded")
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("request_context", default=None)
+
+
+def current() -> Optional[RequestContext]:
+    """The context of the request being served, if any"""
+    return _current.get()
+
+
+@contextmanager
+def activate(ctx: RequestContext):
+    """Make ctx the current request context (propagates into threadpool calls)"""
+    token = _current.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _current.reset(token)
+
+
+def check() -> None:
+    """Abort the current request's work if it was cancelled or is out of time"""
+    ctx = _current.get()
+    if ctx is not None:
+        ctx.check()
+
+
+def has_time(seconds: float) -> bool:
+    """Whether the current request can afford a stage of this length (always True outside a request)"""
+    ctx = _current.get()
+    return ctx is None or ctx.has_time(seconds)
@@ -1,13 +1,11 @@
 from typing import Tuple, List
-from groq import Groq
+import llm
+import prompts
 
 class LanguageConverter:
     """Handles cross-language code conversion"""
     
     def __init__(self):
-        self.client = Groq()
-        self.model = "meta-llama/llama-4-maverick-17b-128e-instruct"
-        
         # Language mappings and syntax patterns
         self.language_mappings = {
             "python": {
@@ -32,8 +30,9 @@ class LanguageConverter:
             }
         }
     
-    def convert_language(self, code: str, source_lang: str, target_lang: str) -> Tuple[str, List[str]]:
-        """Convert code from source language to target language"""
+    def convert_language(self, code: str, source_lang: str, target_lang: str,
+                         use_ai: bool = True) -> Tuple[str, List[str]]:
+        """Convert code from source language to target language (rule-based passes only without AI)"""
         notes = []
         
         # Validate languages
@@ -44,18 +43,54 @@ class LanguageConverter:
         
         # Apply specific conversion rules
         if source_lang.lower() == "python" and target_lang.lower() == "javascript":
-            return self._python_to_javascript(code, notes)
+            return self._python_to_javascript(code, notes, use_ai)
+        elif source_lang.lower() == "javascript" and target_lang.lower() == "python":
+            return self._javascript_to_python(code, notes, use_ai)
+        elif not use_ai:
+            notes.append(f"⚠️ {source_lang} to {target_lang} conversion needs the AI service, which is unavailable right now")
+            return code, notes
         elif source_lang.lower() == "python" and target_lang.lower() == "cpp":
             return self._python_to_cpp(code, notes)
         elif source_lang.lower() == "python" and target_lang.lower() == "java":
             return self._python_to_java(code, notes)
-        elif source_lang.lower() == "javascript" and target_lang.lower() == "python":
-            return self._javascript_to_python(code, notes)
         else:
             # Use AI for other conversions
             return self._ai_convert(code, source_lang, target_lang, notes)
     
-    def _python_to_javascript(self, code: str, notes: List[str]) -> Tuple[str, List[str]]:
+    def convert_module(self, code: str, source_lang: str, target_lang: str, module: str,
+                       dependencies: str, use_ai: bool = True) -> Tuple[str, List[str], List[str]]:
+        """Convert one module of a project, given the interfaces of the modules it imports
+
+        Returns (code, notes, interface); the interface lists the converted
+        module's public declarations for the modules that import it. A
+        failed LLM call or an unusable reply raises instead of handing the
+        source back as if it were converted.
+        """
+        if not use_ai:
+            converted, notes = self.convert_language(code, source_lang, target_lang, use_ai=False)
+            return converted, notes, []
+        
+        if target_lang.lower() not in self.language_mappings:
+            raise ValueError(f"Unsupported target language: {target_lang}")
+        messages = prompts.render(
+            "convert_module", source_lang=source_lang, target_lang=target_lang,
+            module=module, dependencies=dependencies or "(none)", code=code
+        )
+        
+        content = llm.complete(
+            messages,
+            temperature=0.2,
+            stage="ai_convert_module"
+        )
+        
+        try:
+            result = llm.parse_json(content, {"converted_code": str, "conversion_notes": [str], "interface": [str]},
+                                    required=("converted_code",))
+        except ValueError as e:
+            raise ValueError(f"AI conversion failed: {str(e)}") from e
+        return result["converted_code"], result.get("conversion_notes", []), result.get("interface", [])
+    
+    def _python_to_javascript(self, code: str, notes: List[str], use_ai: bool = True) -> Tuple[str, List[str]]:
         """Convert Python code to JavaScript"""
         # Basic rule-based conversion
         js_code = code
@@ -86,6 +121,10 @@ class LanguageConverter:
         
         js_code = '\n'.join(converted_lines)
         
+        if not use_ai:
+            notes.append("Rule-based conversion only - review the result before running it")
+            return js_code, notes
+        
         # Use AI for more complex conversion
         return self._ai_convert_with_base(js_code, "python", "javascript", notes)
     
@@ -105,7 +144,7 @@ class LanguageConverter:
         
         return self._ai_convert(code, "python", "java", notes)
     
-    def _javascript_to_python(self, code: str, notes: List[str]) -> Tuple[str, List[str]]:
+    def _javascript_to_python(self, code: str, notes: List[str], use_ai: bool = True) -> Tuple[str, List[str]]:
         """Convert JavaScript code to Python"""
         # Basic rule-based conversion
         py_code = code
@@ -149,45 +188,30 @@ class LanguageConverter:
         
         py_code = '\n'.join(converted_lines)
         
+        if not use_ai:
+            notes.append("Rule-based conversion only - review the result before running it")
+            return py_code, notes
+        
         # Use AI for more complex conversion
         return self._ai_convert_with_base(py_code, "javascript", "python", notes)
     
     def _ai_convert(self, code: str, source_lang: str, target_lang: str, notes: List[str]) -> Tuple[str, List[str]]:
         """Use AI to convert code between languages"""
-        prompt = f"""
-        Convert this {source_lang} code to {target_lang}:
-        
-        ```{source_lang}
-        {code}
-        ```
-        
-        Return a JSON object with:
-        - "converted_code": the equivalent code in {target_lang}
-        - "conversion_notes": list of important notes about the conversion
-        - "language_differences": key differences to be aware of
-        
-        Make sure the converted code:
-        1. Maintains the same functionality
-        2. Follows {target_lang} best practices and conventions
-        3. Includes proper syntax and structure
-        4. Has appropriate type declarations if needed
-        5. Includes necessary imports/includes
-        """
+        messages = prompts.render("convert", source_lang=source_lang, target_lang=target_lang, code=code)
         
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+            content = llm.complete(
+                messages,
                 temperature=0.2,  # Lower temperature for more consistent conversions
-                max_completion_tokens=1024,
-                response_format={"type": "json_object"}
+                stage="ai_convert"
             )
             
-            result = eval(completion.choices[0].message.content)
+            result = llm.parse_json(content, {"converted_code": str, "conversion_notes": [str], "language_differences": [str]},
+                                    required=("converted_code",))
             notes.extend(result.get("conversion_notes", []))
             notes.extend(result.get("language_differences", []))
             
-            return result.get("converted_code", code), notes
+            return result["converted_code"], notes
             
         except Exception as e:
             notes.append(f"AI conversion failed: {str(e)}")
@@ -195,40 +219,21 @@ class LanguageConverter:
     
     def _ai_convert_with_base(self, base_code: str, source_lang: str, target_lang: str, notes: List[str]) -> Tuple[str, List[str]]:
         """Use AI to improve an already partially converted code"""
-        prompt = f"""
-        Improve this partially converted {source_lang} to {target_lang} code:
-        
-        ```{target_lang}
-        {base_code}
-        ```
-        
-        Return a JSON object with:
-        - "improved_code": the properly converted and improved code
-        - "improvements": list of improvements made
-        - "syntax_fixes": syntax corrections applied
-        
-        Focus on:
-        1. Fixing any syntax errors
-        2. Following {target_lang} conventions
-        3. Proper variable declarations and types
-        4. Correct function definitions
-        5. Appropriate built-in function usage
-        """
+        messages = prompts.render("convert_with_base", source_lang=source_lang, target_lang=target_lang, code=base_code)
         
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+            content = llm.complete(
+                messages,
                 temperature=0.2,
-                max_completion_tokens=1024,
-                response_format={"type": "json_object"}
+                stage="ai_convert_with_base"
             )
             
-            result = eval(completion.choices[0].message.content)
+            result = llm.parse_json(content, {"improved_code": str, "improvements": [str], "syntax_fixes": [str]},
+                                    required=("improved_code",))
             notes.extend(result.get("improvements", []))
             notes.extend(result.get("syntax_fixes", []))
             
-            return result.get("improved_code", base_code), notes
+            return result["improved_code"], notes
             
         except Exception as e:
             notes.append(f"AI improvement failed: {str(e)}")
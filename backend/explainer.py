@@ -1,34 +1,134 @@
 import ast
+import copy
+import difflib
 import re
-from typing import List, Dict
-from groq import Groq
+from typing import List, Dict, Optional, Tuple
+import llm
+import metrics
+import parsing
+import prompts
+import source
+from cache import LRUCache, content_key
+from memo import ExplanationMemo
+
+AI_TIPS_FALLBACK = "Keep practicing and experimenting with code! 🚀"
+
+# AI results starting with this are errors and are not memoized
+AI_FAILURE_PREFIX = "⚠️ Could not"
+
+# Python files with at least this many functions/classes are explained per definition,
+# so an edit to one function only re-explains that function
+MIN_UNITS_FOR_REUSE = 2
+
+# Above this many characters, change explanations get a diff instead of both full versions
+CHANGE_DIFF_THRESHOLD = 4000
 
 class CodeExplainer:
     """Generates clear, friendly explanations for code and transformations"""
     
     def __init__(self):
-        self.client = Groq()
-        self.model = "meta-llama/llama-4-maverick-17b-128e-instruct"
+        # Local analysis is cheap but editors call it on every keystroke
+        self._local_cache = LRUCache(maxsize=256)
+        self._ai_cache = LRUCache(maxsize=1024)
+        # Explanations by code hash, shared globally and kept per session
+        self._memo = ExplanationMemo()
     
-    def explain_code(self, code: str, language: str) -> List[str]:
+    def explain_code(self, code: str, language: str, use_ai: bool = True) -> List[str]:
         """Generate explanations for what the code does"""
-        explanations = []
+        if not use_ai:
+            return self.explain_locally(code, language)
         
-        if language.lower() == "python":
-            explanations.extend(self._explain_python_code(code))
+        key = content_key("explain", language.lower(), code)
+        cached = self._memo.get(key)
+        if cached is not None:
+            return list(cached)
+        
+        explanations = self.explain_locally(code, language)
         
-        # Add AI-powered explanation
-        ai_explanations = self._ai_explain_code(code, language)
+        # Add AI-powered explanation, reusing explanations of unchanged definitions
+        ai_explanations = self._explain_with_reuse(code, language)
         explanations.extend(ai_explanations)
         
+        if not any(e.startswith(AI_FAILURE_PREFIX) for e in ai_explanations):
+            self._memo.set(key, list(explanations))
         return explanations
     
+    def explain_locally(self, code: str, language: str) -> List[str]:
+        """Explanations from the syntax tree alone, without the LLM"""
+        if language.lower() == "python":
+            return self._explain_python_code(code)
+        if parsing.supports(language):
+            return self._explain_structure(code, language)
+        return []
+    
     def explain_changes(self, original_code: str, modified_code: str, language: str) -> List[str]:
         """Explain what changes were made and why"""
         if original_code.strip() == modified_code.strip():
             return ["No changes were made to the code."]
         
-        return self._ai_explain_changes(original_code, modified_code, language)
+        key = content_key("explain_changes", language.lower(), original_code, modified_code)
+        cached = self._memo.get(key)
+        if cached is not None:
+            return list(cached)
+        
+        explanations = self._ai_explain_changes(original_code, modified_code, language)
+        if not any(e.startswith(AI_FAILURE_PREFIX) for e in explanations):
+            self._memo.set(key, list(explanations))
+        return explanations
+    
+    def memo_stats(self) -> dict:
+        return self._memo.stats()
+    
+    def _definition_units(self, code: str, language: str) -> Optional[List[str]]:
+        """Source of each top-level function/class, preceded by the remaining module-level code"""
+        if language.lower() != "python":
+            return None
+        try:
+            tree = ast.parse(code)
+        except (SyntaxError, RecursionError, MemoryError):
+            return None
+        
+        text = source.SourceText(code)
+        definitions, covered = [], set()
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                first = min([node.lineno] + [d.lineno for d in node.decorator_list]) - 1
+                definitions.append(text.slice(text.span(first, node.end_lineno)))
+                covered.update(range(first, node.end_lineno))
+        if len(definitions) < MIN_UNITS_FOR_REUSE:
+            return None
+        
+        module_level = "\n".join(text.line(i) for i in range(len(text)) if i not in covered).strip()
+        return ([module_level] if module_level else []) + definitions
+    
+    def _explain_with_reuse(self, code: str, language: str) -> List[str]:
+        """AI explanations, explaining only the definitions that have not been explained before"""
+        units = self._definition_units(code, language)
+        if units is None:
+            return self._ai_explain_code(code, language)
+        
+        keys = [content_key("explain_unit", language.lower(), unit) for unit in units]
+        known = [self._memo.get(key) for key in keys]
+        missing = [i for i, explanations in enumerate(known) if explanations is None]
+        if not missing:
+            return [e for explanations in known for e in explanations]
+        
+        result = self._ai_explain_units([units[i] for i in missing], language)
+        if result is None:
+            return self._ai_explain_code(code, language)
+        
+        for i, explanations in zip(missing, result["units"]):
+            known[i] = explanations
+            self._memo.set(keys[i], explanations)
+        
+        explanations = [e for unit in known for e in unit]
+        # Purpose and key concepts describe the whole file only when every unit was sent
+        if len(missing) == len(units):
+            if result.get("purpose"):
+                explanations.insert(0, f"🎯 Purpose: {result['purpose']}")
+            if result.get("key_concepts"):
+                explanations.append(f"📚 Key concepts: {', '.join(result['key_concepts'])}")
+        return explanations
     
     def _explain_python_code(self, code: str) -> List[str]:
         """Analyze Python code and provide explanations"""
@@ -65,6 +165,8 @@ class CodeExplainer:
         
         except SyntaxError:
             explanations.append("⚠️ Code has syntax errors that prevent detailed analysis")
+        except (RecursionError, MemoryError):
+            explanations.append("⚠️ Code is nested too deeply for detailed analysis")
         
         # Check for common patterns
         if "range(len(" in code:
@@ -78,38 +180,48 @@ class CodeExplainer:
         
         return explanations
     
+    def _explain_structure(self, code: str, language: str) -> List[str]:
+        """Summarize the constructs of JavaScript, C++ or Java code from its syntax tree"""
+        summary = parsing.summarize(code, language)
+        if summary is None:
+            return []
+        
+        explanations = []
+        if summary["has_errors"]:
+            explanations.append("⚠️ Code has syntax errors - the analysis below may be incomplete")
+        
+        for name in summary["classes"]:
+            explanations.append(f"🏗️ Class '{name}' groups related data and behavior")
+        
+        for function in summary["functions"]:
+            explanations.append(f"🔧 Function '{function['name']}' defined with {function['params']} parameter(s)")
+        
+        if summary["loops"]:
+            explanations.append(f"🔄 {summary['loops']} loop(s) repeat work over data")
+        
+        if summary["conditions"]:
+            explanations.append(f"🔀 {summary['conditions']} conditional statement(s) choose between code paths")
+        
+        if summary["imports"]:
+            explanations.append(f"📦 Imports: {', '.join(summary['imports'])}")
+        
+        if summary["max_nesting_depth"] > 4:
+            explanations.append(f"🪜 Code is nested {summary['max_nesting_depth']} levels deep - early returns could flatten it")
+        
+        return explanations
+    
     def _ai_explain_code(self, code: str, language: str) -> List[str]:
         """Use AI to explain what the code does"""
-        prompt = f"""
-        Explain this {language} code in simple, friendly terms:
-        
-        ```{language}
-        {code}
-        ```
-        
-        Return a JSON object with:
-        - "explanations": list of clear explanations about what the code does
-        - "purpose": overall purpose of the code
-        - "key_concepts": important programming concepts used
-        
-        Make explanations:
-        1. Simple and easy to understand
-        2. Friendly and encouraging
-        3. Focus on WHAT the code does, not just HOW
-        4. Include emojis to make it more engaging
-        5. Explain any complex logic step by step
-        """
+        messages = prompts.render("explain_code", language=language, code=code)
         
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+            content = llm.complete(
+                messages,
                 temperature=0.4,
-                max_completion_tokens=1024,
-                response_format={"type": "json_object"}
+                stage="ai_explain_code"
             )
             
-            result = eval(completion.choices[0].message.content)
+            result = llm.parse_json(content, {"explanations": [str], "purpose": str, "key_concepts": [str]})
             explanations = result.get("explanations", [])
             
             if result.get("purpose"):
@@ -123,44 +235,48 @@ class CodeExplainer:
         except Exception as e:
             return [f"⚠️ Could not generate AI explanation: {str(e)}"]
     
+    def _ai_explain_units(self, units: List[str], language: str) -> Optional[Dict[str, any]]:
+        """Use AI to explain several definitions in one call, one explanation list per unit"""
+        numbered = "\n\n".join(
+            f"### Unit {i}\n```{language}\n{unit}\n```" for i, unit in enumerate(units, 1)
+        )
+        messages = prompts.render("explain_units", language=language, units=numbered)
+        
+        try:
+            content = llm.complete(
+                messages,
+                temperature=0.4,
+                stage="ai_explain_units"
+            )
+            
+            result = llm.parse_json(content, {"units": [[str]], "purpose": str, "key_concepts": [str]},
+                                    required=("units",))
+            unit_explanations = result.get("units", [])
+            if len(unit_explanations) != len(units) or not all(isinstance(u, list) for u in unit_explanations):
+                return None
+            return result
+            
+        except Exception:
+            return None
+    
     def _ai_explain_changes(self, original: str, modified: str, language: str) -> List[str]:
         """Use AI to explain what changes were made"""
-        prompt = f"""
-        Compare these two {language} code versions and explain the changes:
-        
-        Original:
-        ```{language}
-        {original}
-        ```
-        
-        Modified:
-        ```{language}
-        {modified}
-        ```
-        
-        Return a JSON object with:
-        - "changes": list of specific changes made
-        - "benefits": why these changes improve the code
-        - "impact": how these changes affect performance or readability
-        
-        Make explanations:
-        1. Clear and specific about what changed
-        2. Explain the benefits in simple terms
-        3. Use friendly, encouraging language
-        4. Include emojis for engagement
-        5. Focus on improvements and learning
-        """
+        if len(original) + len(modified) > CHANGE_DIFF_THRESHOLD:
+            diff = "\n".join(difflib.unified_diff(
+                original.split("\n"), modified.split("\n"), "original", "modified", n=3, lineterm=""
+            ))
+            messages = prompts.render("explain_changes_diff", language=language, diff=diff)
+        else:
+            messages = prompts.render("explain_changes", language=language, original=original, modified=modified)
         
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+            content = llm.complete(
+                messages,
                 temperature=0.3,
-                max_completion_tokens=1024,
-                response_format={"type": "json_object"}
+                stage="ai_explain_changes"
             )
             
-            result = eval(completion.choices[0].message.content)
+            result = llm.parse_json(content, {"changes": [str], "benefits": [str], "impact": [str]})
             explanations = []
             
             # Add changes
@@ -183,78 +299,73 @@ class CodeExplainer:
         except Exception as e:
             return [f"⚠️ Could not explain changes: {str(e)}"]
     
-    def get_code_complexity(self, code: str, language: str) -> Dict[str, any]:
-        """Analyze code complexity"""
+    def get_code_complexity(self, code: str, language: str, use_ai: bool = False) -> Dict[str, any]:
+        """Analyze code complexity locally from the syntax tree, AI enrichment optional"""
         if language.lower() == "python":
-            return self._analyze_python_complexity(code)
-        else:
-            return self._ai_analyze_complexity(code, language)
+            complexity = self._analyze_python_complexity(code)
+            if use_ai:
+                complexity["ai_analysis"] = self._cached_ai_complexity(code, language)
+            return complexity
+        
+        summary = parsing.summarize(code, language)
+        if summary is None:
+            return self._cached_ai_complexity(code, language)
+        
+        complexity = metrics.analyze_summary(summary, code)
+        if use_ai:
+            complexity["ai_analysis"] = self._cached_ai_complexity(code, language)
+        return complexity
     
     def _analyze_python_complexity(self, code: str) -> Dict[str, any]:
-        """Analyze Python code complexity"""
+        """Analyze Python code complexity from the AST in a single pass"""
+        key = content_key("complexity", code)
+        cached = self._local_cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        
         try:
-            tree = ast.parse(code)
-            
-            complexity = {
-                "lines": len(code.split('\n')),
-                "functions": 0,
-                "loops": 0,
-                "conditions": 0,
-                "imports": 0,
-                "complexity_level": "Simple"
-            }
-            
-            for node in ast.walk(tree):
-                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                    complexity["functions"] += 1
-                elif isinstance(node, (ast.For, ast.While)):
-                    complexity["loops"] += 1
-                elif isinstance(node, ast.If):
-                    complexity["conditions"] += 1
-                elif isinstance(node, (ast.Import, ast.ImportFrom)):
-                    complexity["imports"] += 1
-            
-            # Determine complexity level
-            total_constructs = complexity["functions"] + complexity["loops"] + complexity["conditions"]
-            if total_constructs > 10:
-                complexity["complexity_level"] = "Complex"
-            elif total_constructs > 5:
-                complexity["complexity_level"] = "Moderate"
-            
-            return complexity
-            
+            complexity = metrics.analyze_python(code)
         except SyntaxError:
-            return {
-                "lines": len(code.split('\n')),
+            complexity = {
+                "lines": code.count("\n") + 1,
                 "error": "Syntax errors prevent analysis",
                 "complexity_level": "Unknown"
             }
+        except (RecursionError, MemoryError):
+            complexity = {
+                "lines": code.count("\n") + 1,
+                "error": "Code is nested too deeply to analyze",
+                "complexity_level": "Unknown"
+            }
+        
+        self._local_cache.set(key, complexity)
+        return copy.deepcopy(complexity)
+    
+    def _cached_ai_complexity(self, code: str, language: str) -> Dict[str, any]:
+        """AI complexity analysis, cached by code hash (failures are not cached)"""
+        key = content_key("ai_complexity", language.lower(), code)
+        cached = self._ai_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+        
+        analysis = self._ai_analyze_complexity(code, language)
+        if analysis.get("complexity_level") != "Unknown":
+            self._ai_cache.set(key, analysis)
+        return dict(analysis)
     
     def _ai_analyze_complexity(self, code: str, language: str) -> Dict[str, any]:
         """Use AI to analyze code complexity"""
-        prompt = f"""
-        Analyze the complexity of this {language} code:
-        
-        ```{language}
-        {code}
-        ```
-        
-        Return a JSON object with:
-        - "complexity_level": "Simple", "Moderate", or "Complex"
-        - "analysis": detailed complexity analysis
-        - "suggestions": ways to reduce complexity if needed
-        """
+        messages = prompts.render("analyze_complexity", language=language, code=code)
         
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+            content = llm.complete(
+                messages,
                 temperature=0.3,
-                max_completion_tokens=512,
-                response_format={"type": "json_object"}
+                max_completion_tokens=llm.output_budget(messages, ratio=0.5, minimum=512),
+                stage="ai_analyze_complexity"
             )
             
-            return eval(completion.choices[0].message.content)
+            return llm.parse_json(content, {"complexity_level": str, "analysis": str, "suggestions": [str]})
             
         except Exception:
             return {
@@ -263,8 +374,12 @@ class CodeExplainer:
                 "suggestions": []
             }
     
-    def generate_learning_tips(self, code: str, language: str) -> List[str]:
-        """Generate learning tips based on the code"""
+    def generate_learning_tips(self, code: str, language: str, use_ai: bool = None) -> List[str]:
+        """Generate learning tips based on the code
+
+        AI tips are added when use_ai is True, or by default only when the
+        local checks found nothing to say.
+        """
         tips = []
         
         if language.lower() == "python":
@@ -281,43 +396,35 @@ class CodeExplainer:
             if "import" in code:
                 tips.append("📚 Libraries extend Python's capabilities - there's a library for almost everything!")
         
-        # Add AI-generated tips
-        ai_tips = self._ai_generate_tips(code, language)
-        tips.extend(ai_tips)
+        if use_ai is None:
+            use_ai = not tips
+        
+        # Add AI-generated tips (cached by code hash)
+        if use_ai:
+            key = content_key("ai_tips", language.lower(), code)
+            ai_tips = self._ai_cache.get(key)
+            if ai_tips is None:
+                ai_tips = self._ai_generate_tips(code, language)
+                if ai_tips != [AI_TIPS_FALLBACK]:
+                    self._ai_cache.set(key, ai_tips)
+            tips.extend(ai_tips)
         
         return tips
     
     def _ai_generate_tips(self, code: str, language: str) -> List[str]:
         """Use AI to generate learning tips"""
-        prompt = f"""
-        Generate helpful learning tips based on this {language} code:
-        
-        ```{language}
-        {code}
-        ```
-        
-        Return a JSON object with:
-        - "tips": list of educational tips and insights
-        
-        Make tips:
-        1. Educational and encouraging
-        2. Relevant to concepts in the code
-        3. Include best practices
-        4. Use emojis for engagement
-        5. Suitable for learners
-        """
+        messages = prompts.render("learning_tips", language=language, code=code)
         
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+            content = llm.complete(
+                messages,
                 temperature=0.5,
-                max_completion_tokens=512,
-                response_format={"type": "json_object"}
+                max_completion_tokens=llm.output_budget(messages, ratio=0.5, minimum=512),
+                stage="ai_generate_tips"
             )
             
-            result = eval(completion.choices[0].message.content)
+            result = llm.parse_json(content, {"tips": [str]})
             return result.get("tips", [])
             
         except Exception:
-            return ["Keep practicing and experimenting with code! 🚀"]
\ No newline at end of file
+            return [AI_TIPS_FALLBACK]
\ No newline at end of file
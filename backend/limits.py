@@ -0,0 +1,213 @@
+import asyncio
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List
+
+from fastapi import HTTPException
+
+import context
+import parsing
+import source
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+# Hard limits - anything above these is rejected with 413
+MAX_CODE_LENGTH = _env_int("MAX_CODE_LENGTH", 50000)  # characters
+MAX_CODE_LINES = _env_int("MAX_CODE_LINES", 5000)
+MAX_BODY_BYTES = _env_int("MAX_BODY_BYTES", MAX_CODE_LENGTH * 2 + 4096)  # room for JSON escaping
+# Project conversion: files per project and the size of the whole request
+MAX_PROJECT_FILES = _env_int("MAX_PROJECT_FILES", 200)
+MAX_PROJECT_BODY_BYTES = _env_int("MAX_PROJECT_BODY_BYTES", 4 * 1024 * 1024)
+
+# Estimated input tokens allowed per operation
+OPERATION_MAX_TOKENS: Dict[str, int] = {
+    "transform": 12000,
+    "optimize": 12000,
+    "convert": 12000,
+    "explain": 16000,
+}
+
+# Completion size: llm.output_budget allows OUTPUT_RATIO tokens per input
+# token plus OUTPUT_OVERHEAD_TOKENS, up to MAX_OUTPUT_TOKENS
+MAX_OUTPUT_TOKENS = _env_int("LLM_MAX_OUTPUT_TOKENS", 8192)
+OUTPUT_RATIO = 1.5
+OUTPUT_OVERHEAD_TOKENS = 256
+
+# Inputs above these budgets are split and processed chunk by chunk. The
+# default is the largest input whose rewrite still fits in one completion,
+# so chunking only starts where a single call would be cut off.
+DEFAULT_CHUNK_TOKENS = int((MAX_OUTPUT_TOKENS - OUTPUT_OVERHEAD_TOKENS) / OUTPUT_RATIO)
+OPERATION_CHUNK_TOKENS: Dict[str, int] = {
+    "transform": _env_int("CHUNK_TOKENS", DEFAULT_CHUNK_TOKENS),
+    "optimize": _env_int("CHUNK_TOKENS", DEFAULT_CHUNK_TOKENS),
+    "convert": _env_int("CHUNK_TOKENS", DEFAULT_CHUNK_TOKENS),
+    "explain": 4000,
+}
+
+# Admission control
+MAX_CONCURRENT_REQUESTS = _env_int("MAX_CONCURRENT_REQUESTS", 4)
+MAX_QUEUED_REQUESTS = _env_int("MAX_QUEUED_REQUESTS", 16)
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("QUEUE_TIMEOUT_SECONDS", 10))
+
+# Deadlines - a request's work stops once nobody is waiting for it any more
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_SECONDS", 90))
+# Optional stages (change explanations, DRY pass, verification, benchmarks) are
+# skipped when less than this is left before the deadline
+OPTIONAL_STAGE_SECONDS = float(os.getenv("OPTIONAL_STAGE_SECONDS", 15))
+# Shortest time an LLM call is given; clients cannot ask for a shorter deadline
+MIN_LLM_CALL_SECONDS = float(os.getenv("LLM_MIN_CALL_SECONDS", 5))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token for code)"""
+    return math.ceil(len(text) / 4)
+
+
+def check_request(code: str, operation: str) -> None:
+    """Reject inputs that exceed the configured size limits"""
+    if len(code) > MAX_CODE_LENGTH:
+        raise HTTPException(413, f"Code is too long ({len(code)} characters, max {MAX_CODE_LENGTH})")
+
+    lines = code.count("\n") + 1
+    if lines > MAX_CODE_LINES:
+        raise HTTPException(413, f"Code has too many lines ({lines}, max {MAX_CODE_LINES})")
+
+    max_tokens = OPERATION_MAX_TOKENS.get(operation)
+    tokens = estimate_tokens(code)
+    if max_tokens is not None and tokens > max_tokens:
+        raise HTTPException(413, f"Code is too large for '{operation}' (~{tokens} tokens, max {max_tokens})")
+
+
+def request_timeout(headers) -> float:
+    """Seconds the request may run: the client's X-Request-Timeout, kept between MIN_LLM_CALL_SECONDS and the server limit"""
+    requested = headers.get("x-request-timeout")
+    try:
+        seconds = float(requested) if requested else REQUEST_TIMEOUT_SECONDS
+    except ValueError:
+        raise HTTPException(400, "X-Request-Timeout must be a number of seconds")
+    if seconds <= 0:
+        raise HTTPException(400, "X-Request-Timeout must be positive")
+    return min(max(seconds, MIN_LLM_CALL_SECONDS), REQUEST_TIMEOUT_SECONDS)
+
+
+def has_time_for_optional_stage() -> bool:
+    """Whether the current request has time left for a stage it can do without"""
+    return context.has_time(OPTIONAL_STAGE_SECONDS)
+
+
+def _generic_boundaries(code: str) -> List[int]:
+    """Line indexes of unindented lines that follow a blank line or a closing brace"""
+    boundaries = []
+    previous = None
+    for i, line in enumerate(source.iter_lines(code)):
+        if i and line[:1] not in ("", " ", "\t", "}") and (not previous or previous.endswith("}")):
+            boundaries.append(i)
+        previous = line.strip()
+    return boundaries
+
+
+def chunk_spans(code: str, language: str, max_tokens: int) -> List[source.Span]:
+    """Split code at top-level boundaries into spans of roughly max_tokens each
+
+    Spans are offsets into the input rather than copies; the sliced chunks
+    joined with newlines reproduce the input exactly. A single top-level
+    block larger than the budget is kept whole.
+    """
+    if estimate_tokens(code) <= max_tokens:
+        return [(0, len(code))]
+
+    text = source.SourceText(code)
+    boundaries = parsing.top_level_boundaries(code, language)
+    if boundaries is None:
+        boundaries = _generic_boundaries(code)
+
+    starts = sorted(set([0] + [b for b in boundaries if 0 < b < len(text)]))
+
+    spans = []
+    chunk_start = None
+    current_chars = 0
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        segment_chars = text.span_length(start, end)
+        if chunk_start is not None and (current_chars + segment_chars) / 4 > max_tokens:
+            spans.append(text.span(chunk_start, start))
+            chunk_start, current_chars = None, 0
+        if chunk_start is None:
+            chunk_start = start
+        current_chars += segment_chars
+    if chunk_start is not None:
+        spans.append(text.span(chunk_start, len(text)))
+    return spans
+
+
+def plan_chunks(code: str, language: str, operation: str) -> List[source.Span]:
+    """Spans of the input to process for this operation (a single span for normal inputs)"""
+    budget = OPERATION_CHUNK_TOKENS.get(operation)
+    if budget is None:
+        return [(0, len(code))]
+    return chunk_spans(code, language, budget)
+
+
+class AdmissionGate:
+    """Limits concurrent work and sheds load once the wait queue is full"""
+
+    def __init__(self, max_concurrent: int, max_queued: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._avg_seconds = 2.0  # moving average of service time
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up"""
+        backlog = (self.waiting + 1) / max(1, self.max_concurrent)
+        return max(1, math.ceil(self._avg_seconds * backlog))
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        raise HTTPException(503, reason, headers={"Retry-After": str(self.retry_after())})
+
+    @asynccontextmanager
+    async def admit(self):
+        if not self._semaphore.locked():
+            # Free slot: acquire immediately without queueing
+            await self._semaphore.acquire()
+        else:
+            if self.waiting >= self.max_queued:
+                self._reject("Server is busy, please retry shortly")
+
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._reject("Timed out waiting for a free worker")
+            finally:
+                self.waiting -= 1
+
+        self.active += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (time.perf_counter() - start)
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+        }
+
+
+gate = AdmissionGate(MAX_CONCURRENT_REQUESTS, MAX_QUEUED_REQUESTS, QUEUE_TIMEOUT_SECONDS)
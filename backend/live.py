@@ -0,0 +1,163 @@
+import asyncio
+import os
+import uuid
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, WebSocket
+from starlette.concurrency import run_in_threadpool
+
+import components
+import context
+import limits
+import llm
+import parsing
+import usage
+
+# How long edits must settle before the LLM stage starts
+DEBOUNCE_SECONDS = int(os.getenv("LIVE_DEBOUNCE_MS", 600)) / 1000
+
+LANGUAGES = {"python"} | set(parsing.LANGUAGE_SPECS)
+
+
+def validate_edit(message: Any) -> Optional[str]:
+    """Why an incoming frame is not a usable edit, or None when it is"""
+    if not isinstance(message, dict):
+        return "Messages must be JSON objects"
+    if message.get("type", "edit") != "edit":
+        return f"Unknown message type: {message.get('type')}"
+    if not isinstance(message.get("code", ""), str):
+        return "'code' must be a string"
+    language = message.get("language") or "python"
+    if not isinstance(language, str) or language.lower() not in LANGUAGES:
+        return f"Unsupported language: {language}"
+    return None
+
+
+async def run_to_completion(fn, *args):
+    """Run fn in the threadpool; if the caller is cancelled, wait for the thread before re-raising
+
+    A worker thread cannot be interrupted, so a caller holding an admission
+    slot for it keeps the slot until the thread has returned.
+    """
+    work = asyncio.ensure_future(run_in_threadpool(fn, *args))
+    try:
+        return await asyncio.shield(work)
+    except asyncio.CancelledError:
+        while not work.done():
+            try:
+                await asyncio.wait({work})
+            except asyncio.CancelledError:
+                pass
+        if not work.cancelled():
+            work.exception()  # nobody is waiting for the result any more
+        raise
+
+
+def local_diagnostics(code: str, language: str, document_id: str = None) -> Dict[str, Any]:
+    """Everything that can be said about the code without the LLM
+
+    With a document_id the code is parsed incrementally against that
+    document's previous tree; the stages below find the summary cached.
+    """
+    if document_id and parsing.supports(language):
+        parsing.summarize(code, language, document_id)
+    explainer = components.explainer()
+    return {
+        "explanations": explainer.explain_locally(code, language),
+        "suggestions": components.transformer().local_suggestions(code, language),
+        "complexity": explainer.get_code_complexity(code, language) if parsing.supports(language) else None,
+    }
+
+
+class LiveSession:
+    """One editor connection: local diagnostics per edit, LLM results once the edits settle
+
+    Only the newest edit's LLM stage is kept. A new edit cancels the pending
+    stage before it reaches the LLM, or marks its context cancelled so no
+    further LLM calls are made for it.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.client_id = usage.client_id(websocket)
+        self.session_id = websocket.headers.get("x-session-id") or websocket.query_params.get("session")
+        # The editor's document, reparsed incrementally from one edit to the next
+        self.document_id = f"live:{self.client_id}:{self.session_id or uuid.uuid4().hex}"
+        self._pending: Optional[asyncio.Task] = None
+        self._pending_ctx: Optional[context.RequestContext] = None
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        async with self._send_lock:
+            await self.websocket.send_json(message)
+
+    async def run(self) -> None:
+        try:
+            while True:
+                try:
+                    message = await self.websocket.receive_json()
+                except (ValueError, KeyError):
+                    message = None  # not JSON, or a binary frame
+                error = validate_edit(message)
+                if error:
+                    edit_id = message.get("id") if isinstance(message, dict) else None
+                    await self.send({"type": "error", "id": edit_id, "status": 400, "message": error})
+                    continue
+                await self.handle_edit(message)
+        finally:
+            self.cancel_pending()
+
+    async def handle_edit(self, message: Dict[str, Any]) -> None:
+        edit_id = message.get("id")
+        code = message.get("code") or ""
+        language = (message.get("language") or "python").lower()
+        self.cancel_pending()
+
+        try:
+            limits.check_request(code, "explain")
+        except HTTPException as e:
+            await self.send({"type": "error", "id": edit_id, "status": e.status_code, "message": e.detail})
+            return
+
+        diagnostics = await run_in_threadpool(local_diagnostics, code, language, self.document_id)
+        await self.send({"type": "diagnostics", "id": edit_id, **diagnostics})
+
+        if message.get("ai", True) and code.strip():
+            ctx = context.RequestContext(self.client_id, "explain", self.session_id,
+                                         timeout=limits.REQUEST_TIMEOUT_SECONDS)
+            self._pending_ctx = ctx
+            self._pending = asyncio.create_task(self._analyze(edit_id, code, language, ctx))
+
+    def cancel_pending(self) -> None:
+        if self._pending is not None and not self._pending.done():
+            self._pending.cancel()
+        if self._pending_ctx is not None:
+            self._pending_ctx.cancel()
+        self._pending = self._pending_ctx = None
+
+    async def _analyze(self, edit_id: Any, code: str, language: str, ctx: context.RequestContext) -> None:
+        """LLM stage for one edit; cancelled while debouncing if a newer edit arrives"""
+        await asyncio.sleep(DEBOUNCE_SECONDS)
+        try:
+            usage.ledger.check_quota(ctx.client_id)
+            async with limits.gate.admit():
+                with context.activate(ctx):
+                    # While the LLM backend's circuit is open the local explanations are all there is
+                    use_ai = llm.available()
+                    # A newer edit cancels this task, but the slot is only freed once the thread is done
+                    explanations = await run_to_completion(components.explainer().explain_code, code, language, use_ai)
+        except HTTPException as e:
+            await self.send({"type": "error", "id": edit_id, "status": e.status_code, "message": e.detail})
+            return
+        except Exception as e:
+            await self.send({"type": "error", "id": edit_id, "status": 500, "message": str(e)})
+            return
+
+        if not ctx.cancelled:
+            await self.send({
+                "type": "analysis",
+                "id": edit_id,
+                "explanations": explanations,
+                "usage": ctx.usage.as_dict(),
+                "degraded": ctx.degraded or not use_ai,
+            })
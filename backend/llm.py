@@ -0,0 +1,471 @@
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import circuit
+import context
+import limits
+import payload
+import profiling
+import replay
+import usage
+
+DEFAULT_MODEL = "meta-llama/llama-4-maverick-17b-128e-instruct"
+
+# Seconds a call waits for a free slot on a saturated backend before failing
+BACKEND_WAIT_SECONDS = float(os.getenv("LLM_BACKEND_WAIT_SECONDS", 30))
+
+# Output budget: sized from the input, since most stages return rewritten code
+MAX_OUTPUT_TOKENS = limits.MAX_OUTPUT_TOKENS
+# Follow-up requests allowed when a completion stops at the output budget
+MAX_CONTINUATIONS = int(os.getenv("LLM_MAX_CONTINUATIONS", 2))
+
+CONTINUE_PROMPT = (
+    "Your previous reply was cut off. Continue it exactly where it stopped, "
+    "without repeating anything and without any preamble or code fences."
+)
+
+
+class BackendUnavailable(RuntimeError):
+    """The backend's circuit breaker is open"""
+
+
+def _caller_gave_up(error: Exception, timeout: Optional[float]) -> bool:
+    """Whether a call failed because of its caller: the request's deadline ran out or it was cancelled
+
+    The timeout passed to a call is the request's remaining time, so a
+    timeout error then means the deadline was reached, not that the backend
+    failed.
+    """
+    ctx = context.current()
+    if ctx is not None and ctx.cancelled:
+        return True
+    timed_out = isinstance(error, TimeoutError) or any("Timeout" in cls.__name__ for cls in type(error).__mro__)
+    return timed_out and timeout is not None
+
+
+class Backend:
+    """A model provider with a lazily-built client, a default model and a concurrency limit"""
+
+    def __init__(self, name: str, model: str, max_concurrent: int):
+        self.name = name
+        self.model = model
+        self.max_concurrent = max_concurrent
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.breaker = circuit.from_env()
+
+    def is_configured(self) -> bool:
+        raise NotImplementedError
+
+    def is_connected(self) -> bool:
+        """Whether the client has been built yet"""
+        return self._client is not None
+
+    def get_client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._build_client()
+        return self._client
+
+    def _build_client(self):
+        raise NotImplementedError
+
+    def warm_up(self) -> None:
+        raise NotImplementedError
+
+    def complete(self, messages: List[Dict[str, str]], model: str, temperature: float,
+                 max_completion_tokens: int, timeout: Optional[float] = None,
+                 json_mode: bool = True) -> Tuple[str, Any, Optional[str]]:
+        """Run one completion within this backend's concurrency limit
+
+        Returns (content, usage, finish_reason). timeout bounds both the wait
+        for a slot and the call itself; None uses the backend's defaults.
+        """
+        if not self.breaker.available():
+            raise BackendUnavailable(f"LLM backend '{self.name}' is unavailable")
+        wait = BACKEND_WAIT_SECONDS if timeout is None else min(BACKEND_WAIT_SECONDS, timeout)
+        if not self._slots.acquire(timeout=wait):
+            raise RuntimeError(f"LLM backend '{self.name}' is busy")
+        try:
+            # Checked again with a slot in hand so a half-open probe is never left waiting
+            if not self.breaker.allow():
+                raise BackendUnavailable(f"LLM backend '{self.name}' is unavailable")
+            start = time.perf_counter()
+            try:
+                result = self._complete(messages, model, temperature, max_completion_tokens, timeout, json_mode)
+            except Exception as e:
+                seconds = time.perf_counter() - start
+                if isinstance(e, replay.ReplayMiss):
+                    self.breaker.release()
+                elif _caller_gave_up(e, timeout):
+                    # Only the time it took says something about the backend
+                    if seconds >= self.breaker.slow_seconds:
+                        self.breaker.record(False, seconds)
+                    else:
+                        self.breaker.release()
+                else:
+                    self.breaker.record(True, seconds)
+                raise
+            self.breaker.record(False, time.perf_counter() - start)
+            return result
+        finally:
+            self._slots.release()
+
+    def _complete(self, messages, model, temperature, max_completion_tokens, timeout,
+                  json_mode) -> Tuple[str, Any, Optional[str]]:
+        raise NotImplementedError
+
+
+class GroqBackend(Backend):
+    """Groq's hosted API through the groq SDK"""
+
+    def is_configured(self) -> bool:
+        return bool(os.getenv("GROQ_API_KEY"))
+
+    def _build_client(self):
+        from groq import Groq
+        return Groq()
+
+    def warm_up(self) -> None:
+        # A cheap authenticated call establishes the TLS connection in the pool
+        self.get_client().models.list()
+
+    def _complete(self, messages, model, temperature, max_completion_tokens, timeout, json_mode):
+        options = {"timeout": timeout} if timeout is not None else {}
+        if json_mode:
+            options["response_format"] = {"type": "json_object"}
+        completion = self.get_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_completion_tokens=max_completion_tokens,
+            **options
+        )
+        choice = completion.choices[0]
+        return choice.message.content, completion.usage, choice.finish_reason
+
+
+class OpenAICompatibleBackend(Backend):
+    """Any server speaking the OpenAI chat completions API (llama.cpp, vLLM, Ollama)"""
+
+    def __init__(self, name: str, base_url: Optional[str], model: str, max_concurrent: int,
+                 api_key: Optional[str] = None, timeout: float = 120.0):
+        super().__init__(name, model, max_concurrent)
+        self.base_url = (base_url or "").rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def is_configured(self) -> bool:
+        return bool(self.base_url)
+
+    def _build_client(self):
+        import httpx
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        # Keep-alive to a local server; the pool is sized to the concurrency limit
+        return httpx.Client(
+            base_url=self.base_url,
+            headers=headers,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_concurrent),
+        )
+
+    def warm_up(self) -> None:
+        self.get_client().get("/models").raise_for_status()
+
+    def _complete(self, messages, model, temperature, max_completion_tokens, timeout, json_mode):
+        # Passing timeout=None to httpx would disable the client's timeout, so only override it
+        options = {"timeout": timeout} if timeout is not None else {}
+        body = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_completion_tokens,
+        }
+        if json_mode:
+            body["response_format"] = {"type": "json_object"}
+        response = self.get_client().post("/chat/completions", json=body, **options)
+        response.raise_for_status()
+        data = response.json()
+        completion_usage = SimpleNamespace(**data["usage"]) if data.get("usage") else None
+        choice = data["choices"][0]
+        return choice["message"]["content"], completion_usage, choice.get("finish_reason")
+
+
+class TrafficBackend(Backend):
+    """Records another backend's completions, or replays recorded ones without the network
+
+    Keeps the wrapped backend's name and concurrency limit, so replayed runs
+    queue like the real thing. Replayed calls wait for the recorded latency
+    divided by replay.SPEED.
+    """
+
+    def __init__(self, inner: Backend, store: replay.TrafficStore, mode: str):
+        super().__init__(inner.name, inner.model, inner.max_concurrent)
+        self.inner = inner
+        self.store = store
+        self.mode = mode
+
+    def is_configured(self) -> bool:
+        return self.mode == "replay" or self.inner.is_configured()
+
+    def is_connected(self) -> bool:
+        return self.mode == "replay" or self.inner.is_connected()
+
+    def get_client(self):
+        return None if self.mode == "replay" else self.inner.get_client()
+
+    def warm_up(self) -> None:
+        if self.mode != "replay":
+            self.inner.warm_up()
+
+    def _complete(self, messages, model, temperature, max_completion_tokens, timeout, json_mode):
+        if self.mode == "replay":
+            entry = self.store.lookup(replay.prompt_key(messages, json_mode))
+            if entry is None:
+                raise replay.ReplayMiss("No recorded response for this prompt")
+            if replay.SPEED > 0:
+                time.sleep(entry["seconds"] / replay.SPEED)
+            recorded_usage = SimpleNamespace(**entry["usage"]) if entry.get("usage") else None
+            return entry["content"], recorded_usage, entry.get("finish_reason")
+
+        start = time.perf_counter()
+        result = self.inner._complete(messages, model, temperature, max_completion_tokens, timeout, json_mode)
+        replay.record(self.store, self.name, model, messages, json_mode, result, time.perf_counter() - start)
+        return result
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+BACKENDS: Dict[str, Backend] = {
+    "groq": GroqBackend("groq", os.getenv("GROQ_MODEL", DEFAULT_MODEL), _env_int("GROQ_MAX_CONCURRENT", 8)),
+    "local": OpenAICompatibleBackend(
+        "local",
+        os.getenv("LOCAL_LLM_URL"),
+        os.getenv("LOCAL_LLM_MODEL", "local"),
+        _env_int("LOCAL_LLM_MAX_CONCURRENT", 1),  # CPU servers usually handle one request at a time
+        api_key=os.getenv("LOCAL_LLM_API_KEY"),
+    ),
+}
+
+# Record/replay (LLM_TRAFFIC_MODE) wraps every backend around one shared store
+traffic_store = None
+if replay.MODE in ("record", "replay"):
+    traffic_store = replay.TrafficStore(replay.STORE_PATH)
+    if replay.MODE == "replay":
+        print(f"📼 Replaying {traffic_store.load()} recorded LLM completions from {replay.STORE_PATH}")
+    BACKENDS = {name: TrafficBackend(backend, traffic_store, replay.MODE) for name, backend in BACKENDS.items()}
+
+DEFAULT_BACKEND = os.getenv("LLM_BACKEND", "groq")
+
+
+def _parse_routes(spec: str) -> Dict[str, str]:
+    """"explain=local,ai_generate_tips=local" -> {"explain": "local", "ai_generate_tips": "local"}"""
+    routes = {}
+    for item in spec.split(","):
+        key, _, backend = item.partition("=")
+        if key.strip() and backend.strip():
+            routes[key.strip()] = backend.strip()
+    return routes
+
+
+# Keys are stages (ai_explain_code) or request operations (explain, analysis)
+ROUTES = _parse_routes(os.getenv("LLM_ROUTES", ""))
+
+
+def route(stage: str) -> Backend:
+    """Pick the backend for a call: by stage, then by the request's operation, then the default"""
+    ctx = context.current()
+    operation = ctx.operation if ctx is not None else None
+    name = ROUTES.get(stage) or (ROUTES.get(operation) if operation else None) or DEFAULT_BACKEND
+    backend = BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown LLM backend '{name}'")
+    return backend
+
+
+def available(stage: str = "llm") -> bool:
+    """Whether the backend a call would be routed to is accepting calls (circuit not open)"""
+    return route(stage).breaker.available()
+
+
+def _used_backends() -> List[Backend]:
+    names = {DEFAULT_BACKEND, *ROUTES.values()}
+    return [BACKENDS[name] for name in names if name in BACKENDS]
+
+
+def is_configured() -> bool:
+    """Whether every backend that calls can be routed to is configured"""
+    return all(backend.is_configured() for backend in _used_backends())
+
+
+def is_connected() -> bool:
+    """Whether the default backend's client has been built yet"""
+    return BACKENDS[DEFAULT_BACKEND].is_connected()
+
+
+def status() -> Dict[str, Dict[str, Any]]:
+    """Configuration and connection state of the backends in use"""
+    return {
+        backend.name: {
+            "model": backend.model,
+            "configured": backend.is_configured(),
+            "connected": backend.is_connected(),
+            "max_concurrent": backend.max_concurrent,
+            "circuit": backend.breaker.stats(),
+            **({"traffic": traffic_store.stats()} if traffic_store is not None else {}),
+        }
+        for backend in _used_backends()
+    }
+
+
+def warm_up() -> None:
+    """Build the clients and open pooled connections ahead of the first request"""
+    for backend in _used_backends():
+        if backend.is_configured():
+            backend.warm_up()
+
+
+def output_budget(messages: List[Dict[str, str]], ratio: float = limits.OUTPUT_RATIO, minimum: int = 1024) -> int:
+    """Completion tokens to allow for these messages
+
+    Scales with the variable input (the user messages) rather than the fixed
+    instructions. The default ratio leaves room for rewritten code, which
+    grows when escaped into JSON, plus the notes that come with it.
+    """
+    input_tokens = sum(limits.estimate_tokens(m["content"]) for m in messages if m["role"] == "user")
+    return min(MAX_OUTPUT_TOKENS, max(minimum, int(input_tokens * ratio) + limits.OUTPUT_OVERHEAD_TOKENS))
+
+
+def _call_timeout(ctx: Optional[context.RequestContext]) -> Optional[float]:
+    """The time a call may take: what is left of the request's deadline
+
+    A call is not started with less than limits.MIN_LLM_CALL_SECONDS left,
+    since it would only time out.
+    """
+    if ctx is None:
+        return None
+    ctx.check()
+    timeout = ctx.remaining()
+    if timeout is not None and timeout < limits.MIN_LLM_CALL_SECONDS:
+        raise context.RequestAborted("Not enough time left before the request deadline for an LLM call")
+    return timeout
+
+
+def parse_json(content: str, fields: Dict[str, Any], required: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """The fields of a JSON-mode completion, checked against their expected types
+
+    fields maps a name to a type, or to [type] for a list of them (so
+    [[str]] is a list of lists of strings). The required fields carry the
+    reply's payload (the rewritten code) and must be present with their
+    exact type. Other fields are coerced where that is unambiguous: a bare
+    string becomes a one-item list and list items of the wrong type are
+    dropped; what still does not fit, or is missing or null, is left out.
+    Anything that is not a JSON object, or a missing or mistyped required
+    field, raises ValueError. The reply is model output and is never
+    evaluated.
+    """
+    result = json.loads(content)
+    if not isinstance(result, dict):
+        raise ValueError("The LLM reply is not a JSON object")
+    checked = {}
+    for name, kind in fields.items():
+        value = result.get(name)
+        if name in required:
+            if value is None:
+                raise ValueError(f"The LLM reply has no '{name}' field")
+            if not payload.matches(value, kind):
+                raise ValueError(f"The LLM reply's '{name}' field has the wrong type")
+        elif value is not None:
+            value = _coerce(value, kind)
+        if value is not None:
+            checked[name] = value
+    return checked
+
+
+def _coerce(value: Any, kind: Any) -> Any:
+    """value as kind, or None when it cannot be made to fit"""
+    if payload.matches(value, kind):
+        return value
+    if isinstance(kind, list):
+        items = (_coerce(item, kind[0]) for item in (value if isinstance(value, list) else [value]))
+        return [item for item in items if item is not None]
+    return None
+
+
+def _stitch(piece: str, previous: str) -> str:
+    """The continuation text to append, without the code fence models like to open with
+
+    Repeated text is not trimmed: code repeats itself often enough that an
+    apparent overlap is usually genuine.
+    """
+    if piece.startswith("```"):
+        piece = piece.split("\n", 1)[1] if "\n" in piece else ""
+        if piece.rstrip().endswith("```") and "```" not in previous:
+            piece = piece.rstrip()[:-3]
+    return piece
+
+
+def _continue(backend: Backend, messages: List[Dict[str, str]], content: str, model: str,
+              temperature: float, max_completion_tokens: int, stage: str) -> str:
+    """Ask for the rest of a completion that stopped at the output budget and stitch it on"""
+    finish_reason = "length"
+    continuations = 0
+    while finish_reason == "length" and continuations < MAX_CONTINUATIONS:
+        timeout = _call_timeout(context.current())
+        followup = messages + [
+            {"role": "assistant", "content": content},
+            {"role": "user", "content": CONTINUE_PROMPT},
+        ]
+        # JSON mode would reject the partial object, so the follow-ups run unconstrained
+        with profiling.stage(f"llm.{stage}.continue"):
+            piece, completion_usage, finish_reason = backend.complete(
+                followup, model, temperature, max_completion_tokens, timeout, json_mode=False
+            )
+        usage.record(stage, completion_usage)
+        content += _stitch(piece or "", content)
+        continuations += 1
+    usage.ledger.record_completion(stage, continuations, recovered=finish_reason != "length")
+    return content
+
+
+def complete(messages: Union[str, List[Dict[str, str]]], model: str = None, temperature: float = 0.3,
+             max_completion_tokens: int = None, stage: str = "llm") -> str:
+    """Run a JSON-mode chat completion on the routed backend and record its token usage
+
+    messages is usually prompts.render(...) output; a plain string is sent
+    as a single user message. model defaults to the backend's model, and
+    max_completion_tokens to output_budget(messages). Output cut off at the
+    budget is completed with up to MAX_CONTINUATIONS follow-up requests.
+    Calls for a cancelled request are refused, and the call may only use
+    the time left before the request's deadline.
+    """
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+    ctx = context.current()
+    timeout = _call_timeout(ctx)
+    backend = route(stage)
+    model = model or backend.model
+    max_completion_tokens = max_completion_tokens or output_budget(messages)
+    try:
+        with profiling.stage(f"llm.{stage}"):
+            content, completion_usage, finish_reason = backend.complete(
+                messages, model, temperature, max_completion_tokens, timeout
+            )
+    except BackendUnavailable:
+        if ctx is not None:
+            ctx.degraded = True
+        raise
+    usage.record(stage, completion_usage)
+    if finish_reason == "length":
+        content = _continue(backend, messages, content or "", model, temperature, max_completion_tokens, stage)
+    else:
+        usage.ledger.record_completion(stage)
+    return content
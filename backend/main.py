@@ -1,18 +1,47 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
 from pydantic import BaseModel
 import uvicorn
 import os
+import time
 from pathlib import Path
+from typing import List
 
-# Import our custom modules
-from transformer import CodeTransformer
-from converter import LanguageConverter
-from explainer import CodeExplainer
+# Core components are built lazily on first use (see components.py)
+import components
+import assets
+import context
+import limits
+import live
+import llm
+import parsing
+import payload
+import profiling
+import project
+import prompts
+import requestlog
+import similarity
+import transformer
+import usage
+from explainer import AI_FAILURE_PREFIX
 
-app = FastAPI(title="Syntax Shift API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Static assets are small; compress them once up front instead of per request
+    components.assets()
+    # Optional warm-up runs in the background so liveness is answered immediately
+    if components.warmup_enabled():
+        components.start_background_warm_up()
+    yield
+
+
+app = FastAPI(title="Syntax Shift API", version="1.0.0", lifespan=lifespan)
 
 # Enable CORS for frontend communication
 app.add_middleware(
@@ -23,15 +52,96 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Serve static files (frontend)
 frontend_path = Path(__file__).parent.parent / "frontend"
-if frontend_path.exists():
-    app.mount("/static", StaticFiles(directory=str(frontend_path)), name="static")
 
-# Initialize our core components
-transformer = CodeTransformer()
-converter = LanguageConverter()
-explainer = CodeExplainer()
+class LimitBodySize:
+    """Reject oversized request bodies before they are parsed
+
+    A Content-Length above the limit is answered with 413 right away. A body
+    without one (Transfer-Encoding: chunked) is counted as it is read, and
+    reading stops with 413 as soon as it passes the limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        max_bytes = limits.MAX_PROJECT_BODY_BYTES if scope["path"] == "/api/convert/project" else limits.MAX_BODY_BYTES
+        detail = f"Request body too large (max {max_bytes} bytes)"
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            return await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+
+        received = 0
+
+        async def counted_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    # Raised inside the body read, so FastAPI answers it like any HTTPException
+                    raise HTTPException(413, detail)
+            return message
+
+        await self.app(scope, counted_receive, send)
+
+app.add_middleware(LimitBodySize)
+
+def _is_admin(headers) -> bool:
+    admin_token = os.getenv("ADMIN_TOKEN")
+    return bool(admin_token) and headers.get("x-admin-token") == admin_token
+
+async def profile_request(request: Request, call_next):
+    """Profile requests that ask for it (X-Profile with the admin token) or are sampled
+
+    Only admin requests get the profile's id and timings back as headers;
+    sampled profiles are just saved for /api/admin/profiles.
+    """
+    requested = "x-profile" in request.headers
+    if requested and not _is_admin(request.headers):
+        return JSONResponse({"detail": "Profiling requires the admin token"}, status_code=403)
+    if not profiling.should_profile(requested):
+        return await call_next(request)
+    
+    profile = profiling.Profile(request.url.path)
+    with profiling.activate(profile):
+        response = await call_next(request)
+    # Joining the sampler and writing the files block, so they stay off the event loop
+    await run_in_threadpool(profile.finish)
+    if requested:
+        response.headers["X-Profile-ID"] = profile.id
+        response.headers["Server-Timing"] = profile.server_timing()
+    return response
+
+# Without sampling or an admin token nothing can be profiled, so the middleware is not installed
+if profiling.SAMPLE_RATE > 0 or os.getenv("ADMIN_TOKEN"):
+    app.middleware("http")(profile_request)
+
+async def log_request(request: Request, call_next):
+    """Queue a structured record of each API request; the writes happen on a background thread"""
+    if not request.url.path.startswith("/api/"):
+        return await call_next(request)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Handlers leave their request context and fields on request.state;
+        # streamed responses record themselves once the stream ends
+        if not getattr(request.state, "streamed", False):
+            requestlog.log.record(requestlog.build_record(
+                request.method, request.url.path, status, time.perf_counter() - start,
+                getattr(request.state, "ctx", None), getattr(request.state, "log", None),
+            ))
+
+# Without REQUEST_LOG_DIR the middleware is not installed at all
+if requestlog.log.enabled:
+    app.middleware("http")(log_request)
 
 # Request/Response models
 class CodeRequest(BaseModel):
@@ -39,100 +149,564 @@ class CodeRequest(BaseModel):
     source_language: str = "python"
     target_language: str = None
     operation: str  # "transform", "optimize", "convert", "explain"
+    # "fused" (one LLM call that also explains the changes) or "multi" for optimize/transform;
+    # defaults to the server's FUSED_OPERATIONS setting
+    pipeline: str = None
+    # Payload options
+    include_original: bool = True
+    fields: List[str] = None  # only return these response fields
+    code_format: str = "full"  # "full" or "diff" (unified diff against the input)
+    # Conversion verification (runs both programs locally, see verifier.py)
+    verify: bool = False
+    test_inputs: List[str] = None  # stdin for each run; generated calls are added for functions
+    # Performance check for Python optimize (times both versions locally, see perfcheck.py)
+    benchmark: bool = False
+    benchmark_calls: List[dict] = None  # [{"function": name, "args": [...]}]; synthesized when omitted
+
+class AnalysisRequest(BaseModel):
+    code: str
+    language: str = "python"
+    ai: bool = None  # request AI enrichment (cached); local-only by default
+
+class ProjectFile(BaseModel):
+    path: str  # relative to the project root, e.g. "pkg/util.py"
+    code: str
+
+class ProjectRequest(BaseModel):
+    files: List[ProjectFile]
+    target_language: str
+    source_language: str = "python"
 
 class CodeResponse(BaseModel):
-    original_code: str
-    transformed_code: str
+    original_code: str = None
+    transformed_code: str = None
+    transformed_diff: str = None
     explanations: list
     suggestions: list
     success: bool
     error_message: str = None
+    usage: dict = None  # LLM token usage for this request
+    verification: dict = None
+    benchmark: dict = None
+    degraded: bool = False  # served by the local rule passes because the LLM backend is down
+
+def _asset_response(asset, request: Request, cache_control: str) -> Response:
+    """Serve an in-memory asset with ETag revalidation and content negotiation"""
+    headers = {
+        "ETag": asset.etag,
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match == "*" or asset.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    encoding = asset.negotiate(request.headers.get("accept-encoding", ""))
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=asset.encodings[encoding], media_type=asset.media_type, headers=headers)
 
 @app.get("/")
-async def serve_frontend():
-    """Serve the main frontend page"""
-    frontend_file = frontend_path / "index.html"
-    if frontend_file.exists():
-        return FileResponse(str(frontend_file))
+async def serve_frontend(request: Request):
+    """Serve the pre-rendered frontend page from memory"""
+    index = components.assets().index
+    if index is not None:
+        return _asset_response(index, request, assets.REVALIDATE_CACHE)
     return {"message": "Syntax Shift API is running! Frontend not found."}
 
-@app.post("/api/transform", response_model=CodeResponse)
-async def transform_code(request: CodeRequest):
-    """Main endpoint for code transformation operations"""
-    try:
+@app.get("/static/{asset_path:path}")
+async def serve_static(asset_path: str, request: Request):
+    """Serve frontend assets; fingerprinted URLs (?v=<hash>) are cached forever"""
+    asset = components.assets().get(asset_path)
+    if asset is None:
+        raise HTTPException(404, "Asset not found")
+    fingerprinted = request.query_params.get("v") == asset.version
+    cache_control = assets.IMMUTABLE_CACHE if fingerprinted else assets.REVALIDATE_CACHE
+    return _asset_response(asset, request, cache_control)
+
+# CodeResponse documents the schema; results are built by the server itself, so they
+# are filled in with these defaults, type-checked and serialized directly
+RESPONSE_DEFAULTS = {
+    name: field.default for name, field in CodeResponse.model_fields.items() if not field.is_required()
+}
+
+# Types checked before encoding, in place of the model validation that is skipped
+RESPONSE_TYPES = {
+    "original_code": str,
+    "transformed_code": str,
+    "explanations": [str],
+    "suggestions": [str],
+    "success": bool,
+    "error_message": str,
+    "usage": dict,
+    "verification": dict,
+    "benchmark": dict,
+    "degraded": bool,
+}
+
+def _code_response(result: dict, request: CodeRequest, http_request: Request,
+                   ctx: context.RequestContext) -> Response:
+    """Apply the request's payload options, then encode and compress as the client accepts"""
+    data = {**RESPONSE_DEFAULTS, **result}
+    data["usage"] = ctx.usage.as_dict()
+    data["degraded"] = data["degraded"] or ctx.degraded
+    payload.check_types(data, RESPONSE_TYPES)
+    http_request.state.log.update(success=data["success"], error=data.get("error_message"))
+    with profiling.stage("serialize"):
+        data = payload.shape(
+            data,
+            request.code,
+            include_original=request.include_original,
+            fields=request.fields,
+            code_format=request.code_format,
+        )
+        response = payload.json_response(
+            data,
+            http_request.headers.get("accept-encoding", ""),
+            accept=http_request.headers.get("accept", ""),
+        )
+    response.headers["X-Request-ID"] = ctx.request_id
+    response.headers["X-Token-Usage"] = ctx.usage.header()
+    return response
+
+def _reusable(result: dict) -> bool:
+    """Only complete AI results are kept for reuse, never errors or skipped stages"""
+    ctx = context.current()
+    if ctx is not None and ctx.degraded:
+        return False
+    if any(" failed: " in s or s.startswith("⏳") for s in result["suggestions"]):
+        return False
+    return not any(e.startswith(AI_FAILURE_PREFIX) for e in result["explanations"])
+
+def _run_operation(request: CodeRequest, code: str, use_ai: bool = True) -> dict:
+    """Run the requested operation, reusing the result of a near-identical earlier input"""
+    index = components.snippets()
+    if not use_ai or index.capacity <= 0:
+        return _compute_operation(request, code, use_ai)
+    
+    # Results are only reused for the client whose input produced them
+    ctx = context.current()
+    client = ctx.client_id if ctx is not None else ""
+    namespace = f"{client}|{request.operation}|{request.source_language.lower()}|{(request.target_language or '').lower()}"
+    with profiling.stage("similarity"):
+        fingerprint = similarity.fingerprint(code, request.source_language, namespace)
+        match = index.lookup(fingerprint)
+        reused = match and similarity.adapt(
+            match, code, fingerprint.names, request.source_language,
+            request.target_language or request.source_language,
+            allow_merge=request.operation in ("optimize", "transform"),
+        )
+    if reused:
+        if ctx is not None:
+            ctx.reused = "exact" if match.exact else "near"
+        return {"original_code": code, **reused, "success": True}
+    
+    result = _compute_operation(request, code, use_ai)
+    if _reusable(result):
+        # Copies, since the caller keeps appending to the lists
+        index.add(code, request.source_language, namespace, {
+            "transformed_code": result["transformed_code"],
+            "explanations": list(result["explanations"]),
+            "suggestions": list(result["suggestions"]),
+        }, fingerprint)
+    return result
+
+def _compute_operation(request: CodeRequest, code: str, use_ai: bool = True) -> dict:
+    """Run the requested operation on one piece of code (local rule passes only without AI)"""
+    result = {
+        "original_code": code,
+        "transformed_code": code,
+        "explanations": [],
+        "suggestions": [],
+        "success": True
+    }
+    
+    if use_ai and transformer.use_fused(request.operation, request.pipeline):
+        # One call returns the rewrite, its suggestions and the explanation of the changes
+        rewritten, suggestions, explanations = components.transformer().rewrite_fused(
+            code, request.source_language, request.operation
+        )
+        result.update(transformed_code=rewritten, suggestions=suggestions, explanations=explanations)
+        return result
+    
+    if request.operation == "optimize":
+        # Optimize the code for performance and readability
+        optimized_code, suggestions = components.transformer().optimize_code(
+            code, request.source_language, use_ai
+        )
+        result["transformed_code"] = optimized_code
+        result["suggestions"] = suggestions
+        
+    elif request.operation == "transform":
+        # Apply general transformations (DRY, clean structure)
+        transformed_code, suggestions = components.transformer().transform_code(
+            code, request.source_language, use_ai
+        )
+        result["transformed_code"] = transformed_code
+        result["suggestions"] = suggestions
+        
+    elif request.operation == "convert":
+        # Convert to target language
+        if not request.target_language:
+            raise HTTPException(400, "Target language required for conversion")
+        
+        converted_code, notes = components.converter().convert_language(
+            code, request.source_language, request.target_language, use_ai
+        )
+        result["transformed_code"] = converted_code
+        result["suggestions"] = notes
+        
+    elif request.operation == "explain":
+        # Generate explanations for the code
+        explanations = components.explainer().explain_code(
+            code, request.source_language, use_ai
+        )
+        result["explanations"] = explanations
+        result["transformed_code"] = code  # No transformation, just explanation
+        
+    # Explain the changes if code was modified by the AI and there is time left for it
+    if result["transformed_code"] != code and use_ai:
+        if not limits.has_time_for_optional_stage():
+            result["suggestions"].append("⏳ Skipped the explanation of changes to finish in time")
+        else:
+            with profiling.stage("explain_changes"):
+                change_explanations = components.explainer().explain_changes(
+                    code, result["transformed_code"], request.source_language
+                )
+            result["explanations"].extend(change_explanations)
+    
+    return result
+
+def _process(request: CodeRequest) -> dict:
+    """Run the operation, splitting oversized inputs into chunks"""
+    # While the LLM backend's circuit is open, answer right away from the local passes
+    use_ai = llm.available()
+    spans = limits.plan_chunks(request.code, request.source_language, request.operation)
+    if len(spans) == 1:
+        with profiling.stage(request.operation):
+            result = _run_operation(request, request.code, use_ai)
+    else:
+        # Chunks are sliced from the input one at a time and only their outputs are kept
+        transformed, explanations = [], []
+        suggestions = [f"📦 Large input was processed in {len(spans)} chunks"]
+        for start, end in spans:
+            # Stop between chunks once the client is gone or the deadline has passed
+            context.check()
+            with profiling.stage(request.operation):
+                chunk_result = _run_operation(request, request.code[start:end], use_ai)
+            transformed.append(chunk_result["transformed_code"])
+            explanations.extend(chunk_result["explanations"])
+            suggestions.extend(chunk_result["suggestions"])
         result = {
             "original_code": request.code,
-            "transformed_code": request.code,
-            "explanations": [],
-            "suggestions": [],
+            "transformed_code": "\n".join(transformed),
+            "explanations": explanations,
+            "suggestions": suggestions,
             "success": True
         }
-        
-        if request.operation == "optimize":
-            # Optimize the code for performance and readability
-            optimized_code, suggestions = transformer.optimize_code(
-                request.code, request.source_language
-            )
-            result["transformed_code"] = optimized_code
-            result["suggestions"] = suggestions
-            
-        elif request.operation == "transform":
-            # Apply general transformations (DRY, clean structure)
-            transformed_code, suggestions = transformer.transform_code(
-                request.code, request.source_language
-            )
-            result["transformed_code"] = transformed_code
-            result["suggestions"] = suggestions
-            
-        elif request.operation == "convert":
-            # Convert to target language
-            if not request.target_language:
-                raise HTTPException(400, "Target language required for conversion")
-            
-            converted_code, notes = converter.convert_language(
-                request.code, request.source_language, request.target_language
-            )
-            result["transformed_code"] = converted_code
-            result["suggestions"] = notes
-            
-        elif request.operation == "explain":
-            # Generate explanations for the code
-            explanations = explainer.explain_code(
-                request.code, request.source_language
-            )
-            result["explanations"] = explanations
-            result["transformed_code"] = request.code  # No transformation, just explanation
-            
-        # Always add explanations for changes if code was modified
-        if result["transformed_code"] != request.code:
-            change_explanations = explainer.explain_changes(
-                request.code, result["transformed_code"], request.source_language
+    
+    if not use_ai:
+        result["degraded"] = True
+        result["suggestions"].insert(0, "⚡ The AI service is unavailable - showing results from the local rule passes only")
+    
+    run_optional = limits.has_time_for_optional_stage()
+    if (request.verify or request.benchmark) and not run_optional:
+        result["suggestions"].append("⏳ Skipped verification and benchmarks to finish in time")
+    
+    if request.operation == "convert" and request.verify and run_optional:
+        with profiling.stage("verify"):
+            verification = components.verifier().verify(
+                request.code, request.source_language,
+                result["transformed_code"], request.target_language,
+                request.test_inputs
             )
-            result["explanations"].extend(change_explanations)
-            
-        return CodeResponse(**result)
-        
-    except Exception as e:
-        return CodeResponse(
-            original_code=request.code,
-            transformed_code=request.code,
-            explanations=[],
-            suggestions=[],
-            success=False,
-            error_message=str(e)
+        result["verification"] = verification
+        if verification["status"] == "passed":
+            result["suggestions"].append(f"✅ Conversion verified: same output on {verification['passed']} check(s)")
+        elif verification["status"] == "failed":
+            result["suggestions"].append(f"⚠️ Conversion differs from the original on {verification['failed']} check(s)")
+    
+    if (request.operation == "optimize" and request.benchmark and run_optional
+            and request.source_language.lower() == "python"
+            and result["transformed_code"] != request.code):
+        with profiling.stage("benchmark"):
+            report = components.perfcheck().compare(request.code, result["transformed_code"], request.benchmark_calls)
+        result["benchmark"] = report
+        if report["verdict"] == "accepted":
+            interval = f"(95% CI {report['ci_low']}-{report['ci_high']})"
+            if report["ci_low"] > 1.0:
+                result["suggestions"].append(f"⏱️ Optimized code runs {report['speedup']}x as fast {interval}")
+            elif report["speedup"] < 1.0:
+                # Kept: the slowdown is within perfcheck.REGRESSION_TOLERANCE or the noise
+                result["suggestions"].append(
+                    f"⏱️ Optimized code is not faster: it runs at {report['speedup']}x the original's speed "
+                    f"{interval}, a slowdown within the benchmark's tolerance"
+                )
+            else:
+                result["suggestions"].append(
+                    f"⏱️ No measurable speed difference ({report['speedup']}x, {interval[1:-1]})"
+                )
+        elif report["verdict"] == "inconclusive":
+            result["suggestions"].append(f"⏱️ Benchmark inconclusive: {report['reason']}")
+        elif report["verdict"] == "rejected":
+            # Keep the original rather than ship a slower or behavior-changing rewrite
+            result["transformed_code"] = request.code
+            result["explanations"] = []
+            result["suggestions"].append(f"⏱️ Optimization discarded: {report['reason']}")
+    
+    return result
+
+# How often a running request checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 0.5
+
+async def _cancel_on_disconnect(http_request: Request, ctx: context.RequestContext) -> None:
+    """Cancel the request's remaining LLM work once the client goes away"""
+    while not await http_request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+    ctx.cancel()
+
+async def _run_in_context(fn, http_request: Request, ctx: context.RequestContext):
+    """Run blocking work in the threadpool while watching for the client disconnecting"""
+    watcher = asyncio.create_task(_cancel_on_disconnect(http_request, ctx))
+    try:
+        return await run_in_threadpool(profiling.traced(fn))
+    finally:
+        watcher.cancel()
+
+def _request_context(http_request: Request, operation: str) -> context.RequestContext:
+    ctx = context.RequestContext(
+        usage.client_id(http_request),
+        operation,
+        http_request.headers.get("x-session-id"),
+        timeout=limits.request_timeout(http_request.headers),
+    )
+    http_request.state.ctx = ctx
+    return ctx
+
+def _log_fields(http_request: Request, code: str, language: str, **fields) -> None:
+    """Describe the request's input for the request log"""
+    http_request.state.log = {
+        "language": language,
+        "code_chars": len(code),
+        "code_lines": code.count("\n") + 1,
+        **fields,
+    }
+
+@app.post("/api/transform", response_model=CodeResponse)
+async def transform_code(request: CodeRequest, http_request: Request):
+    """Main endpoint for code transformation operations"""
+    _log_fields(http_request, request.code, request.source_language,
+                target_language=request.target_language, pipeline=request.pipeline)
+    limits.check_request(request.code, request.operation)
+    if request.pipeline and request.pipeline not in transformer.PIPELINES:
+        raise HTTPException(400, f"Unknown pipeline '{request.pipeline}' (use 'fused' or 'multi')")
+    ctx = _request_context(http_request, request.operation)
+    usage.ledger.check_quota(ctx.client_id)
+    
+    # Queue for a worker slot (or fail fast with Retry-After when the queue is full)
+    async with limits.gate.admit():
+        with context.activate(ctx):
+            try:
+                # Operations block on the LLM, so keep them off the event loop;
+                # a client disconnect cancels the LLM calls that have not started yet
+                result = await _run_in_context(lambda: _process(request), http_request, ctx)
+                return _code_response(result, request, http_request, ctx)
+                
+            except Exception as e:
+                return _code_response({
+                    "original_code": request.code,
+                    "transformed_code": request.code,
+                    "explanations": [],
+                    "suggestions": [],
+                    "success": False,
+                    "error_message": str(e)
+                }, request, http_request, ctx)
+
+@app.post("/api/convert/project")
+async def convert_project(request: ProjectRequest, http_request: Request):
+    """Convert a Python project in import order, streaming one NDJSON line per module"""
+    _log_fields(http_request, "\n".join(file.code for file in request.files), request.source_language,
+                target_language=request.target_language)
+    if request.source_language.lower() != "python":
+        raise HTTPException(400, "Project conversion needs Python sources")
+    if request.target_language.lower() not in project.EXTENSIONS:
+        raise HTTPException(400, f"Unsupported target language: {request.target_language}")
+    if not request.files:
+        raise HTTPException(400, "No files to convert")
+    if len(request.files) > limits.MAX_PROJECT_FILES:
+        raise HTTPException(413, f"Too many files ({len(request.files)}, max {limits.MAX_PROJECT_FILES})")
+    for file in request.files:
+        limits.check_request(file.code, "convert")
+    try:
+        plan = project.Project([(file.path, file.code) for file in request.files])
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    
+    ctx = _request_context(http_request, "convert_project")
+    usage.ledger.check_quota(ctx.client_id)
+    # The whole project holds one worker slot; it is taken here so a busy
+    # server still answers 503 before the stream starts
+    admission = AsyncExitStack()
+    await admission.enter_async_context(limits.gate.admit())
+    use_ai = llm.available()
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    
+    def run():
+        try:
+            for event in project.convert_project(plan, request.target_language, use_ai):
+                loop.call_soon_threadsafe(events.put_nowait, event)
+        except Exception as e:
+            loop.call_soon_threadsafe(events.put_nowait, {"type": "error", "error_message": str(e)})
+        finally:
+            loop.call_soon_threadsafe(events.put_nowait, None)
+    
+    started = time.perf_counter()
+    http_request.state.streamed = True
+    with context.activate(ctx):
+        worker = asyncio.create_task(run_in_threadpool(profiling.traced(run)))
+    # Cancels the remaining LLM calls if the client leaves, even before the stream starts
+    watcher = asyncio.create_task(_cancel_on_disconnect(http_request, ctx))
+    
+    def finished(_) -> None:
+        # Runs once the conversion has stopped, whether or not the stream ever started
+        watcher.cancel()
+        asyncio.ensure_future(admission.aclose())
+        requestlog.log.record(requestlog.build_record(
+            http_request.method, http_request.url.path, 200, time.perf_counter() - started,
+            ctx, http_request.state.log,
+        ))
+    worker.add_done_callback(finished)
+    
+    async def stream():
+        try:
+            while (event := await events.get()) is not None:
+                yield payload.dumps_json(event) + b"\n"
+        finally:
+            # Stops the remaining LLM calls when the client disconnects mid-stream
+            ctx.cancel()
+    
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"X-Request-ID": ctx.request_id},
+    )
+
+async def _run_analysis(fn, code: str, http_request: Request, needs_llm: bool):
+    """Run an analysis inline when it is local, or through admission control when it needs the LLM"""
+    if not needs_llm:
+        return fn()
+    
+    ctx = _request_context(http_request, "analysis")
+    usage.ledger.check_quota(ctx.client_id)
+    async with limits.gate.admit():
+        with context.activate(ctx):
+            return await _run_in_context(fn, http_request, ctx)
+
+ANALYSIS_TYPES = {"language": str, "complexity": dict, "tips": [str]}
+
+def _analysis_response(data: dict, http_request: Request) -> Response:
+    """Analysis results are built locally, so they skip FastAPI's encoder like /api/transform"""
+    payload.check_types(data, ANALYSIS_TYPES)
+    return payload.json_response(
+        data,
+        http_request.headers.get("accept-encoding", ""),
+        accept=http_request.headers.get("accept", ""),
+    )
+
+@app.post("/api/complexity")
+async def analyze_complexity(request: AnalysisRequest, http_request: Request):
+    """Complexity metrics - computed locally from the AST for Python"""
+    _log_fields(http_request, request.code, request.language, operation="complexity")
+    limits.check_request(request.code, "explain")
+    explainer = components.explainer()
+    use_ai = bool(request.ai)
+    needs_llm = use_ai or not parsing.supports(request.language)
+    
+    complexity = await _run_analysis(
+        lambda: explainer.get_code_complexity(request.code, request.language, use_ai=use_ai),
+        request.code, http_request, needs_llm
+    )
+    return _analysis_response({"language": request.language, "complexity": complexity}, http_request)
+
+@app.post("/api/tips")
+async def learning_tips(request: AnalysisRequest, http_request: Request):
+    """Learning tips - local checks first, AI tips only when asked for or nothing local applies"""
+    _log_fields(http_request, request.code, request.language, operation="tips")
+    limits.check_request(request.code, "explain")
+    explainer = components.explainer()
+    local_tips = explainer.generate_learning_tips(request.code, request.language, use_ai=False)
+    needs_llm = request.ai if request.ai is not None else not local_tips
+    
+    if not needs_llm:
+        tips = local_tips
+    else:
+        tips = await _run_analysis(
+            lambda: explainer.generate_learning_tips(request.code, request.language, use_ai=True),
+            request.code, http_request, True
         )
+    return _analysis_response({"language": request.language, "tips": tips}, http_request)
+
+@app.websocket("/ws/analyze")
+async def live_analysis(websocket: WebSocket):
+    """Live editor channel - local diagnostics per edit, LLM explanations once edits settle"""
+    await websocket.accept()
+    try:
+        await live.LiveSession(websocket).run()
+    except WebSocketDisconnect:
+        pass
+
+def _require_admin(http_request: Request) -> None:
+    """Admin endpoints need the ADMIN_TOKEN configured on the server"""
+    if not _is_admin(http_request.headers):
+        raise HTTPException(403, "Admin token required")
+
+@app.get("/api/admin/usage")
+async def usage_report(http_request: Request):
+    """Token usage aggregated per client, operation and LLM stage"""
+    _require_admin(http_request)
+    report = usage.ledger.snapshot()
+    report["prompt_versions"] = prompts.versions()
+    if components.snippets.built:
+        report["snippet_index"] = components.snippets().stats()
+    if components.explainer.built:
+        report["explanation_memo"] = components.explainer().memo_stats()
+    return report
+
+@app.get("/api/admin/profiles")
+async def list_profiles(http_request: Request):
+    """Ids of the request profiles stored in PROFILE_DIR"""
+    _require_admin(http_request)
+    return {"profiles": profiling.saved_profiles()}
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, http_request: Request):
+    """Collapsed stacks of one profile, ready for flamegraph.pl or speedscope"""
+    _require_admin(http_request)
+    folded = profiling.load_folded(profile_id)
+    if folded is None:
+        raise HTTPException(404, "Profile not found")
+    return PlainTextResponse(folded)
 
 @app.get("/api/health")
 async def health_check():
-    """Health check endpoint"""
+    """Liveness check - answers as soon as the process is up"""
     return {"status": "healthy", "service": "Syntax Shift API"}
 
+@app.get("/api/ready")
+async def readiness_check():
+    """Readiness check - reports warm-up and component state"""
+    state = components.readiness()
+    state["admission"] = limits.gate.stats()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
 @app.get("/api/languages")
 async def get_supported_languages():
     """Get list of supported programming languages"""
     return {
         "supported_languages": ["python", "javascript", "cpp", "java"],
-        "default_language": "python"
+        "default_language": "python",
+        "parsers": parsing.available_backends()
     }
 
 if __name__ == "__main__":
@@ -144,6 +718,7 @@ if __name__ == "__main__":
         "main:app",
         host="127.0.0.1",
         port=8000,
-        reload=True,
+        # Auto-reload restarts the whole process on file changes, so only in debug
+        reload=os.getenv("DEBUG", "false").lower() == "true",
         log_level="info"
     )
\ No newline at end of file
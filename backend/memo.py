@@ -0,0 +1,55 @@
+import threading
+from typing import Any, Hashable, Optional
+
+import context
+from cache import LRUCache
+
+
+class ExplanationMemo:
+    """Explanations keyed by code hash: a global LRU plus a small LRU per session
+
+    The session layer keeps a user's recent explanations around even when
+    global traffic would evict them, so explain -> optimize -> explain on the
+    same code stays instant.
+    """
+
+    def __init__(self, global_size: int = 4096, max_sessions: int = 1024, session_size: int = 256):
+        self._global = LRUCache(maxsize=global_size)
+        self._sessions = LRUCache(maxsize=max_sessions)
+        self._session_size = session_size
+        self._lock = threading.Lock()
+
+    def _session(self, create: bool) -> Optional[LRUCache]:
+        ctx = context.current()
+        if ctx is None or not ctx.session_id:
+            return None
+        session = self._sessions.get(ctx.session_id)
+        if session is None and create:
+            with self._lock:
+                session = self._sessions.get(ctx.session_id)
+                if session is None:
+                    session = LRUCache(maxsize=self._session_size)
+                    self._sessions.set(ctx.session_id, session)
+        return session
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        session = self._session(create=False)
+        value = session.get(key) if session is not None else None
+        if value is None:
+            value = self._global.get(key)
+            if value is not None and session is not None:
+                session.set(key, value)
+        if value is not None:
+            ctx = context.current()
+            if ctx is not None:
+                ctx.add_cache_hit()
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._global.set(key, value)
+        session = self._session(create=True)
+        if session is not None:
+            session.set(key, value)
+
+    def stats(self) -> dict:
+        return {"global": self._global.stats(), "sessions": len(self._sessions)}
@@ -0,0 +1,172 @@
+import ast
+import math
+from typing import Dict, Any, List, Optional
+
+# Nodes that add a branch to the control flow graph
+_BRANCH_NODES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp, ast.ExceptHandler, ast.Assert)
+
+# Nodes that open a new nesting level
+_NESTING_NODES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.With, ast.AsyncWith, ast.Try,
+                  ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+if hasattr(ast, "match_case"):
+    _BRANCH_NODES += (ast.match_case,)
+if hasattr(ast, "TryStar"):
+    _NESTING_NODES += (ast.TryStar,)
+
+
+class _MetricsCollector:
+    """Collects counts, cyclomatic complexity, nesting and Halstead data in one walk"""
+
+    def __init__(self):
+        self.counts = {"functions": 0, "classes": 0, "loops": 0, "conditions": 0, "imports": 0}
+        self.decisions = 0
+        self.max_depth = 0
+        self.functions: List[Dict[str, Any]] = []
+        self.operators: Dict[str, int] = {}
+        self.operands: Dict[str, int] = {}
+
+    def _operator(self, name: str, count: int = 1):
+        self.operators[name] = self.operators.get(name, 0) + count
+
+    def _operand(self, name: str):
+        self.operands[name] = self.operands.get(name, 0) + 1
+
+    def visit(self, tree: ast.AST):
+        """Walk the tree iteratively, so deeply nested expressions cannot exhaust the stack"""
+        stack = [(tree, 0, None)]
+        while stack:
+            node, depth, function = stack.pop()
+            function, depth = self._visit_node(node, depth, function)
+            # Reversed so children are visited in source order, as a recursive walk would
+            stack.extend((child, depth, function) for child in reversed(list(ast.iter_child_nodes(node))))
+
+    def _visit_node(self, node: ast.AST, depth: int, function: Optional[Dict[str, Any]]):
+        """Count one node; returns the enclosing function and nesting depth for its children"""
+        decision = 0
+
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            self.counts["functions"] += 1
+            function = {"name": node.name, "line": node.lineno, "complexity": 1}
+            self.functions.append(function)
+        elif isinstance(node, ast.ClassDef):
+            self.counts["classes"] += 1
+        elif isinstance(node, (ast.For, ast.AsyncFor, ast.While)):
+            self.counts["loops"] += 1
+        elif isinstance(node, ast.If):
+            self.counts["conditions"] += 1
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            self.counts["imports"] += 1
+
+        # Cyclomatic complexity: one per branch, plus short-circuit and comprehension branches
+        if isinstance(node, _BRANCH_NODES):
+            decision = 1
+        elif isinstance(node, ast.BoolOp):
+            decision = len(node.values) - 1
+        elif isinstance(node, ast.comprehension):
+            decision = 1 + len(node.ifs)
+
+        # Halstead operators and operands
+        if isinstance(node, (ast.BinOp, ast.AugAssign)):
+            self._operator(type(node.op).__name__)
+        elif isinstance(node, ast.UnaryOp):
+            self._operator(type(node.op).__name__)
+        elif isinstance(node, ast.BoolOp):
+            self._operator(type(node.op).__name__, len(node.values) - 1)
+        elif isinstance(node, ast.Compare):
+            for op in node.ops:
+                self._operator(type(op).__name__)
+        elif isinstance(node, ast.Name):
+            self._operand(node.id)
+        elif isinstance(node, ast.Constant):
+            self._operand(repr(node.value))
+
+        if decision:
+            self.decisions += decision
+            if function is not None:
+                function["complexity"] += decision
+
+        if isinstance(node, _NESTING_NODES):
+            depth += 1
+            self.max_depth = max(self.max_depth, depth)
+        return function, depth
+
+    def halstead(self) -> Dict[str, float]:
+        return halstead(self.operators, self.operands)
+
+
+def halstead(operators: Dict[str, int], operands: Dict[str, int]) -> Dict[str, float]:
+    """Halstead measures from operator and operand occurrence counts"""
+    n1, n2 = len(operators), len(operands)
+    N1, N2 = sum(operators.values()), sum(operands.values())
+    vocabulary = n1 + n2
+    length = N1 + N2
+    volume = length * math.log2(vocabulary) if vocabulary > 1 else 0.0
+    difficulty = (n1 / 2) * (N2 / n2) if n2 else 0.0
+    effort = difficulty * volume
+    return {
+        "distinct_operators": n1,
+        "distinct_operands": n2,
+        "total_operators": N1,
+        "total_operands": N2,
+        "vocabulary": vocabulary,
+        "length": length,
+        "volume": round(volume, 2),
+        "difficulty": round(difficulty, 2),
+        "effort": round(effort, 2),
+        "time_seconds": round(effort / 18, 2),
+        "estimated_bugs": round(volume / 3000, 3),
+    }
+
+
+def complexity_level(cyclomatic: int, max_depth: int) -> str:
+    """Bucket the metrics into the levels the UI already shows"""
+    if cyclomatic > 20 or max_depth > 5:
+        return "Complex"
+    if cyclomatic > 10 or max_depth > 3:
+        return "Moderate"
+    return "Simple"
+
+
+def analyze_tree(tree: ast.AST, code: str) -> Dict[str, Any]:
+    """Compute all local metrics for an already-parsed module"""
+    collector = _MetricsCollector()
+    collector.visit(tree)
+
+    cyclomatic = 1 + collector.decisions
+    result = {"lines": code.count("\n") + 1}
+    result.update(collector.counts)
+    result.update({
+        "cyclomatic_complexity": cyclomatic,
+        "max_nesting_depth": collector.max_depth,
+        "function_complexity": collector.functions,
+        "halstead": collector.halstead(),
+        "complexity_level": complexity_level(cyclomatic, collector.max_depth),
+    })
+    return result
+
+
+def analyze_python(code: str) -> Dict[str, Any]:
+    """Compute all local metrics for Python source"""
+    return analyze_tree(ast.parse(code), code)
+
+
+def analyze_summary(summary: Dict[str, Any], code: str) -> Dict[str, Any]:
+    """Same metrics as analyze_python, from a tree-sitter summary (see parsing.py)"""
+    cyclomatic = 1 + summary["decisions"]
+    return {
+        "lines": code.count("\n") + 1,
+        "functions": len(summary["functions"]),
+        "classes": len(summary["classes"]),
+        "loops": summary["loops"],
+        "conditions": summary["conditions"],
+        "imports": len(summary["imports"]),
+        "cyclomatic_complexity": cyclomatic,
+        "max_nesting_depth": summary["max_nesting_depth"],
+        "function_complexity": [
+            {"name": f["name"], "line": f["line"], "complexity": f["complexity"]}
+            for f in summary["functions"]
+        ],
+        "halstead": halstead(summary["operators"], summary["operands"]),
+        "complexity_level": complexity_level(cyclomatic, summary["max_nesting_depth"]),
+    }
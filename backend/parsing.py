@@ -0,0 +1,332 @@
+import ast
+import threading
+from typing import Any, Dict, List, Optional
+
+from cache import LRUCache, content_key
+
+try:
+    from tree_sitter import Language, Parser
+except ImportError:  # tree-sitter is optional; non-Python code then falls back to the AI path
+    Language = Parser = None
+
+# Grammar packages for the tree-sitter languages
+_GRAMMAR_MODULES = {
+    "javascript": "tree_sitter_javascript",
+    "cpp": "tree_sitter_cpp",
+    "java": "tree_sitter_java",
+}
+
+# Node types per language, normalized to the categories the explainer and metrics use
+LANGUAGE_SPECS: Dict[str, Dict[str, set]] = {
+    "javascript": {
+        "functions": {"function_declaration", "function_expression", "arrow_function", "method_definition",
+                      "generator_function_declaration", "generator_function"},
+        "classes": {"class_declaration", "class"},
+        "loops": {"for_statement", "for_in_statement", "while_statement", "do_statement"},
+        "conditions": {"if_statement"},
+        "branches": {"ternary_expression", "switch_case", "catch_clause"},
+        "imports": {"import_statement"},
+        "blocks": {"try_statement", "switch_statement"},
+        "logical": {"&&", "||", "??"},
+    },
+    "cpp": {
+        "functions": {"function_definition", "lambda_expression"},
+        "classes": {"class_specifier", "struct_specifier"},
+        "loops": {"for_statement", "for_range_loop", "while_statement", "do_statement"},
+        "conditions": {"if_statement"},
+        "branches": {"conditional_expression", "case_statement", "catch_clause"},
+        "imports": {"preproc_include"},
+        "blocks": {"try_statement", "switch_statement", "namespace_definition"},
+        "logical": {"&&", "||", "and", "or"},
+    },
+    "java": {
+        "functions": {"method_declaration", "constructor_declaration", "lambda_expression"},
+        "classes": {"class_declaration", "interface_declaration", "enum_declaration", "record_declaration"},
+        "loops": {"for_statement", "enhanced_for_statement", "while_statement", "do_statement"},
+        "conditions": {"if_statement"},
+        "branches": {"ternary_expression", "switch_label", "catch_clause"},
+        "imports": {"import_declaration"},
+        "blocks": {"try_statement", "switch_expression", "switch_statement"},
+        "logical": {"&&", "||"},
+    },
+}
+
+# Anonymous tokens counted as Halstead operators
+OPERATOR_TOKENS = {
+    "+", "-", "*", "/", "%", "**", "=", "==", "===", "!=", "!==", "<", ">", "<=", ">=",
+    "&&", "||", "??", "!", "++", "--", "+=", "-=", "*=", "/=", "%=", "&", "|", "^", "~",
+    "<<", ">>", ">>>", "<<=", ">>=", "&=", "|=", "^=", "?", "->", "::", ".",
+    "new", "delete", "instanceof", "typeof", "and", "or", "not",
+}
+
+# Named leaf nodes counted as Halstead operands
+OPERAND_TYPES = {"number", "string_fragment", "true", "false", "null", "this", "nullptr", "character"}
+
+_NAME_TYPES = {"identifier", "field_identifier", "property_identifier", "destructor_name", "operator_name"}
+
+_languages: Dict[str, Any] = {}
+_parsers: Dict[str, Any] = {}
+_parser_locks: Dict[str, threading.Lock] = {}
+_setup_lock = threading.Lock()
+
+# Summaries keyed by content hash, and the last tree per document for incremental reparse
+_summary_cache = LRUCache(maxsize=512)
+_documents = LRUCache(maxsize=256)
+
+
+def _get_parser(language: str):
+    """Load the grammar and build a parser for the language, or None if unavailable"""
+    if Parser is None or language not in _GRAMMAR_MODULES:
+        return None
+    if language not in _parsers:
+        with _setup_lock:
+            if language not in _parsers:
+                try:
+                    import importlib
+                    grammar = importlib.import_module(_GRAMMAR_MODULES[language])
+                    _languages[language] = Language(grammar.language())
+                    _parsers[language] = Parser(_languages[language])
+                except (ImportError, AttributeError, TypeError, ValueError):
+                    _parsers[language] = None
+                _parser_locks[language] = threading.Lock()
+    return _parsers[language]
+
+
+def available_backends() -> Dict[str, str]:
+    """Which parser backs each supported language"""
+    backends = {"python": "ast"}
+    for language in _GRAMMAR_MODULES:
+        backends[language] = "tree-sitter" if _get_parser(language) is not None else "llm"
+    return backends
+
+
+def supports(language: str) -> bool:
+    """Whether local structural analysis is available for the language"""
+    language = language.lower()
+    return language == "python" or _get_parser(language) is not None
+
+
+def _point(source: bytes, offset: int):
+    row = source.count(b"\n", 0, offset)
+    return (row, offset - (source.rfind(b"\n", 0, offset) + 1))
+
+
+def _edit_tree(tree, old: bytes, new: bytes) -> None:
+    """Describe the change between two versions as a single edit for incremental reparsing"""
+    limit = min(len(old), len(new))
+    prefix = 0
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+
+    old_end, new_end = len(old) - suffix, len(new) - suffix
+    tree.edit(
+        start_byte=prefix,
+        old_end_byte=old_end,
+        new_end_byte=new_end,
+        start_point=_point(old, prefix),
+        old_end_point=_point(old, old_end),
+        new_end_point=_point(new, new_end),
+    )
+
+
+def parse(code: str, language: str, document_id: str = None):
+    """Parse code into a tree-sitter tree, reusing the document's previous tree when possible"""
+    language = language.lower()
+    parser = _get_parser(language)
+    if parser is None:
+        return None
+
+    source = code.encode("utf-8")
+    previous = _documents.get((document_id, language)) if document_id else None
+
+    with _parser_locks[language]:
+        if previous is not None and previous[0] != source:
+            old_source, old_tree = previous
+            _edit_tree(old_tree, old_source, source)
+            tree = parser.parse(source, old_tree)
+        elif previous is not None:
+            tree = previous[1]
+        else:
+            tree = parser.parse(source)
+
+    if document_id:
+        _documents.set((document_id, language), (source, tree))
+    return tree
+
+
+def _node_text(node) -> str:
+    return node.text.decode("utf-8", errors="replace") if node.text is not None else ""
+
+
+def _function_name(node) -> str:
+    """Best-effort name for a function-like node"""
+    name = node.child_by_field_name("name")
+    if name is not None:
+        return _node_text(name)
+
+    # C++: the name sits inside the declarator chain
+    declarator = node.child_by_field_name("declarator")
+    while declarator is not None:
+        if declarator.type in _NAME_TYPES or declarator.type == "qualified_identifier":
+            return _node_text(declarator)
+        declarator = declarator.child_by_field_name("declarator")
+
+    # Arrow functions and lambdas take the name of the variable they are assigned to
+    parent = node.parent
+    if parent is not None and parent.type == "variable_declarator":
+        name = parent.child_by_field_name("name")
+        if name is not None:
+            return _node_text(name)
+    return "<anonymous>"
+
+
+def _parameter_count(node) -> int:
+    parameters = node.child_by_field_name("parameters")
+    if parameters is None:
+        declarator = node.child_by_field_name("declarator")
+        while declarator is not None and parameters is None:
+            parameters = declarator.child_by_field_name("parameters")
+            declarator = declarator.child_by_field_name("declarator")
+    if parameters is None:
+        return 1 if node.child_by_field_name("parameter") is not None else 0
+    return sum(1 for child in parameters.named_children if child.type != "comment")
+
+
+def _summarize_tree(tree, language: str) -> Dict[str, Any]:
+    """Walk a tree-sitter tree once and collect structure, complexity and Halstead counts"""
+    spec = LANGUAGE_SPECS[language]
+    nesting_types = spec["functions"] | spec["classes"] | spec["loops"] | spec["conditions"] | spec["blocks"]
+
+    summary = {
+        "functions": [],
+        "classes": [],
+        "loops": 0,
+        "conditions": 0,
+        "imports": [],
+        "decisions": 0,
+        "max_nesting_depth": 0,
+        "operators": {},
+        "operands": {},
+        "has_errors": tree.root_node.has_error,
+    }
+    operators, operands = summary["operators"], summary["operands"]
+
+    # Iterative walk: (node, depth, enclosing function)
+    stack = [(tree.root_node, 0, None)]
+    while stack:
+        node, depth, function = stack.pop()
+        node_type = node.type
+        decision = 0
+
+        if not node.is_named:
+            # Keywords such as `class` share names with node types; only leaves matter here
+            pass
+        elif node_type in spec["functions"]:
+            function = {
+                "name": _function_name(node),
+                "line": node.start_point[0] + 1,
+                "params": _parameter_count(node),
+                "complexity": 1,
+            }
+            summary["functions"].append(function)
+        elif node_type in spec["classes"]:
+            name = node.child_by_field_name("name")
+            summary["classes"].append(_node_text(name) if name is not None else "<anonymous>")
+        elif node_type in spec["loops"]:
+            summary["loops"] += 1
+            decision = 1
+        elif node_type in spec["conditions"]:
+            summary["conditions"] += 1
+            decision = 1
+        elif node_type in spec["branches"]:
+            # `default:` labels are not a decision
+            decision = 1 if node.named_child_count or node_type == "catch_clause" else 0
+        elif node_type in spec["imports"]:
+            summary["imports"].append(_node_text(node).strip())
+
+        if not node.children:
+            if not node.is_named and node_type in OPERATOR_TOKENS:
+                operators[node_type] = operators.get(node_type, 0) + 1
+                if node_type in spec["logical"]:
+                    decision = 1
+            elif node.is_named and (node_type in OPERAND_TYPES or node_type.endswith(("identifier", "literal"))):
+                text = _node_text(node)
+                operands[text] = operands.get(text, 0) + 1
+
+        if decision:
+            summary["decisions"] += decision
+            if function is not None:
+                function["complexity"] += decision
+
+        if node_type in nesting_types:
+            depth += 1
+            if depth > summary["max_nesting_depth"]:
+                summary["max_nesting_depth"] = depth
+
+        for child in reversed(node.children):
+            stack.append((child, depth, function))
+
+    summary["functions"].sort(key=lambda f: f["line"])
+    return summary
+
+
+def summarize(code: str, language: str, document_id: str = None) -> Optional[Dict[str, Any]]:
+    """Structural summary for JavaScript, C++ or Java, cached by content hash
+
+    Returns None when no local parser is available for the language.
+    """
+    language = language.lower()
+    if language not in LANGUAGE_SPECS:
+        return None
+
+    key = content_key("summary", language, code)
+    cached = _summary_cache.get(key)
+    if cached is not None:
+        return cached
+
+    tree = parse(code, language, document_id)
+    if tree is None:
+        return None
+
+    summary = _summarize_tree(tree, language)
+    summary["boundaries"] = _tree_boundaries(tree)
+    _summary_cache.set(key, summary)
+    return summary
+
+
+def _tree_boundaries(tree) -> List[int]:
+    """Start lines of top-level nodes, with leading comments attached to the node they describe"""
+    boundaries = []
+    comment_start = None
+    for child in tree.root_node.children:
+        if child.type == "comment":
+            if comment_start is None:
+                comment_start = child.start_point[0]
+            continue
+        start = comment_start if comment_start is not None else child.start_point[0]
+        boundaries.append(start)
+        comment_start = None
+    return boundaries
+
+
+def top_level_boundaries(code: str, language: str) -> Optional[List[int]]:
+    """Line indexes where top-level definitions start, or None if the code cannot be parsed"""
+    language = language.lower()
+    if language == "python":
+        try:
+            tree = ast.parse(code)
+        except (SyntaxError, RecursionError, MemoryError):
+            return None
+        boundaries = []
+        for node in tree.body:
+            decorators = getattr(node, "decorator_list", [])
+            boundaries.append(min([node.lineno] + [d.lineno for d in decorators]) - 1)
+        return boundaries
+
+    summary = summarize(code, language)
+    if summary is None or summary["has_errors"]:
+        return None
+    return summary["boundaries"]
@@ -0,0 +1,129 @@
+import difflib
+import gzip
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.responses import Response
+
+from assets import accepted_encodings, brotli
+
+# Optional fast encoders; the standard library json is the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 1024
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+# Fields that are always returned so clients can detect failures
+ALWAYS_INCLUDED = {"success", "error_message"}
+
+
+def unified_diff(original: str, modified: str) -> str:
+    """Context-free unified diff over '\\n'-split lines (matches JS String.split)"""
+    return "\n".join(difflib.unified_diff(
+        original.split("\n"), modified.split("\n"), n=0, lineterm=""
+    ))
+
+
+def shape(data: Dict[str, Any], original: str, include_original: bool = True,
+          fields: Optional[List[str]] = None, code_format: str = "full") -> Dict[str, Any]:
+    """Trim a response dict down to what the client asked for"""
+    transformed = data.get("transformed_code")
+
+    # Send a diff instead of the full text when it is actually smaller
+    if code_format == "diff" and transformed is not None:
+        if transformed == original:
+            data["transformed_diff"] = ""
+            del data["transformed_code"]
+        else:
+            diff = unified_diff(original, transformed)
+            if len(diff) < len(transformed):
+                data["transformed_diff"] = diff
+                del data["transformed_code"]
+
+    if not include_original:
+        data.pop("original_code", None)
+
+    if fields:
+        wanted = set(fields) | ALWAYS_INCLUDED
+        if "transformed_code" in wanted:
+            wanted.add("transformed_diff")
+        data = {key: value for key, value in data.items() if key in wanted}
+
+    return {key: value for key, value in data.items() if value is not None or key in ALWAYS_INCLUDED}
+
+
+def compress(body: bytes, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+    """Compress a response body with the best encoding the client accepts"""
+    if len(body) < MIN_COMPRESS_SIZE:
+        return body, None
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return brotli.compress(body, quality=5), "br"
+    if "gzip" in accepted:
+        return gzip.compress(body, compresslevel=6), "gzip"
+    return body, None
+
+
+def matches(value: Any, kind: Any) -> bool:
+    """Whether value is of type kind; [kind] means a list of them, so [[str]] is a list of lists of strings"""
+    if isinstance(kind, list):
+        return isinstance(value, list) and all(matches(item, kind[0]) for item in value)
+    return isinstance(value, kind)
+
+
+def check_types(data: Dict[str, Any], types: Dict[str, Any]) -> None:
+    """Raise TypeError when a field of data has another type than types gives for it (None passes)
+
+    The encoders below take data as it is, and part of it comes from model
+    output, so responses are checked here instead of by model validation.
+    """
+    for name, kind in types.items():
+        value = data.get(name)
+        if value is not None and not matches(value, kind):
+            raise TypeError(f"Response field '{name}' has the wrong type")
+
+
+def dumps_json(data: Any) -> bytes:
+    """Compact UTF-8 JSON, through orjson when it is installed"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits, which only the stdlib encoder handles
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def wants_msgpack(accept: str) -> bool:
+    """Whether the Accept header asks for msgpack and msgpack is installed"""
+    if msgpack is None or not accept:
+        return False
+    return any(item.split(";")[0].strip().lower() in MSGPACK_MEDIA_TYPES for item in accept.split(","))
+
+
+def encode(data: Any, accept: str = "") -> Tuple[bytes, str]:
+    """Serialize for the client: msgpack when negotiated via Accept, JSON otherwise"""
+    if wants_msgpack(accept):
+        return msgpack.packb(data, use_bin_type=True), "application/msgpack"
+    return dumps_json(data), "application/json"
+
+
+def json_response(data: Dict[str, Any], accept_encoding: str = "", status_code: int = 200,
+                  accept: str = "") -> Response:
+    """Serialize data that the server built itself (no model validation), negotiating
+    msgpack through Accept and compression through Accept-Encoding"""
+    body, media_type = encode(data, accept)
+    body, encoding = compress(body, accept_encoding)
+    headers = {"Vary": "Accept, Accept-Encoding" if msgpack is not None else "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
@@ -0,0 +1,252 @@
+import ast
+import json
+import math
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+
+import context
+import sandbox
+from cache import LRUCache, content_key
+from verifier import _python_functions
+
+RESULT_MARKER = "__SYNTAX_SHIFT_BENCH__"
+
+# Benchmark-sized arguments tried for functions when no calls are given
+SYNTHESIZED_ARGUMENTS = [list(range(2000)), 2000, "abc" * 500, [str(i) for i in range(500)]]
+
+# An optimization is rejected when it is at least this much slower with 95% confidence
+REGRESSION_TOLERANCE = 0.05
+
+BENCH_TIMEOUT_SECONDS = 30.0
+# A run is not started with less time than this left before the request's deadline
+MIN_RUN_SECONDS = 1.0
+OUT_OF_TIME = "Not enough time left before the request deadline"
+REPEAT = 5
+ROUNDS = 2  # alternate original/optimized runs to spread out machine noise
+
+# Runs inside the sandbox: finds a loop count with timeit.autorange, takes REPEAT
+# samples, measures peak memory of one run with tracemalloc and hashes the first run's output.
+# Return values are hashed by structure: each run is its own process, so memory
+# addresses in default reprs and the order of sets of strings differ between runs.
+_HARNESS = '''
+import contextlib, hashlib, io, json, re, sys, timeit, tracemalloc
+
+SOURCE = {source!r}
+CALLS = json.loads({calls!r})
+PROBE = {probe!r}
+REPEAT = {repeat}
+
+def _copy(value):
+    return list(value) if isinstance(value, list) else value
+
+def _build():
+    compiled = compile(SOURCE, "<benchmark>", "exec")
+    if CALLS is None:
+        def run():
+            namespace = {{"__name__": "__benchmark__"}}
+            exec(compiled, namespace)
+            return None
+        return run, []
+    namespace = {{"__name__": "__benchmark__"}}
+    with contextlib.redirect_stdout(io.StringIO()):
+        exec(compiled, namespace)
+    usable = []
+    for index, call in enumerate(CALLS):
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                namespace[call["function"]](*[_copy(a) for a in call["args"]])
+            usable.append(index)
+        except Exception:
+            if not PROBE:
+                raise
+    if PROBE:
+        return None, usable
+    targets = [(namespace[c["function"]], c["args"]) for c in CALLS]
+    def run():
+        return [fn(*[_copy(a) for a in args]) for fn, args in targets]
+    return run, usable
+
+ADDRESS = re.compile(r" at 0x[0-9a-fA-F]+")
+
+def _canonical(value, seen=()):
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+        return repr(value)
+    if id(value) in seen:
+        return "<cycle>"
+    seen = seen + (id(value),)
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__ + "[" + ",".join(_canonical(v, seen) for v in value) + "]"
+    if isinstance(value, (set, frozenset)):
+        return type(value).__name__ + "{{" + ",".join(sorted(_canonical(v, seen) for v in value)) + "}}"
+    if isinstance(value, dict):
+        return "dict{{" + ",".join(_canonical(k, seen) + ":" + _canonical(v, seen) for k, v in value.items()) + "}}"
+    text = repr(value)
+    if ADDRESS.search(text):
+        # A default repr: compare the object's state, or just its type when it has none
+        state = getattr(value, "__dict__", None)
+        return type(value).__qualname__ + ("" if state is None else _canonical(state, seen))
+    return text
+
+run, usable = _build()
+if PROBE:
+    print({marker!r} + json.dumps({{"usable": usable}}))
+    sys.exit(0)
+
+captured = io.StringIO()
+with contextlib.redirect_stdout(captured):
+    returned = run()
+with contextlib.redirect_stdout(io.StringIO()):
+    timer = timeit.Timer(run)
+    number, _ = timer.autorange()
+    samples = [t / number for t in timer.repeat(repeat=REPEAT, number=number)]
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+output = hashlib.sha256((_canonical(returned) + ADDRESS.sub("", captured.getvalue())).encode()).hexdigest()
+print({marker!r} + json.dumps({{"samples": samples, "number": number, "peak_bytes": peak, "output": output}}))
+'''
+
+
+def _synthesize_calls(original: str, optimized: str) -> List[Dict[str, Any]]:
+    """Calls to functions present in both versions, with benchmark-sized arguments"""
+    optimized_names = {f["name"]: f["arity"] for f in _python_functions(optimized)}
+    calls = []
+    for function in _python_functions(original):
+        if optimized_names.get(function["name"]) == function["arity"]:
+            for value in SYNTHESIZED_ARGUMENTS:
+                calls.append({"function": function["name"], "args": [value] * function["arity"]})
+    return calls
+
+
+def _run_harness(code: str, calls: Optional[List[Dict[str, Any]]], probe: bool = False,
+                 timeout: float = BENCH_TIMEOUT_SECONDS) -> Dict[str, Any]:
+    program = _HARNESS.format(
+        source=code,
+        calls=json.dumps(calls),
+        probe=probe,
+        repeat=REPEAT,
+        marker=RESULT_MARKER,
+    )
+    result = sandbox.run(program, "python", timeout=timeout)
+    for line in result.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    error = "timed out" if result.timed_out else (result.stderr.strip().splitlines() or ["no output"])[-1]
+    return {"error": error, "timed_out": result.timed_out}
+
+
+def _run_timeout(deadline: Optional[float]) -> Optional[float]:
+    """Timeout for the next run: BENCH_TIMEOUT_SECONDS, cut to the time left; None when too little is left"""
+    if deadline is None:
+        return BENCH_TIMEOUT_SECONDS
+    left = deadline - time.monotonic()
+    return min(BENCH_TIMEOUT_SECONDS, left) if left >= MIN_RUN_SECONDS else None
+
+
+def _speedup_interval(original: List[float], optimized: List[float]) -> Optional[Dict[str, float]]:
+    """Speedup (original/optimized mean time) with a 95% interval via the log-ratio delta method
+
+    None when either mean is not positive (a run too fast for the timer), since no ratio exists.
+    """
+    mean_a, mean_b = statistics.fmean(original), statistics.fmean(optimized)
+    if mean_a <= 0 or mean_b <= 0:
+        return None
+    var_a = statistics.variance(original) if len(original) > 1 else 0.0
+    var_b = statistics.variance(optimized) if len(optimized) > 1 else 0.0
+    se = math.sqrt(var_a / (len(original) * mean_a ** 2) + var_b / (len(optimized) * mean_b ** 2))
+    speedup = mean_a / mean_b
+    return {
+        "speedup": round(speedup, 3),
+        "ci_low": round(speedup * math.exp(-1.96 * se), 3),
+        "ci_high": round(speedup * math.exp(1.96 * se), 3),
+    }
+
+
+class PerformanceChecker:
+    """Benchmarks original against optimized Python and flags regressions"""
+
+    def __init__(self):
+        self._cache = LRUCache(maxsize=128)
+
+    def compare(self, original: str, optimized: str, calls: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Time both versions in isolated subprocesses and decide whether to keep the optimization"""
+        if not sandbox.execution_enabled():
+            return {"verdict": "skipped", "reason": "Set ENABLE_CODE_EXECUTION=true on the server"}
+
+        key = content_key("perf", original, optimized, json.dumps(calls))
+        cached = self._cache.get(key)
+        if cached is not None:
+            return dict(cached, cached=True)
+
+        # Runs are cut short at the current request's deadline
+        ctx = context.current()
+        report = self._measure(original, optimized, calls, ctx.deadline if ctx is not None else None)
+        if report.get("reason") != OUT_OF_TIME:
+            self._cache.set(key, report)
+        return dict(report, cached=False)
+
+    def _measure(self, original: str, optimized: str, calls: Optional[List[Dict[str, Any]]],
+                 deadline: Optional[float] = None) -> Dict[str, Any]:
+        out_of_time = {"verdict": "skipped", "reason": OUT_OF_TIME}
+
+        # 1. Choose the workload: given calls, synthesized calls, or running the whole script
+        if calls is None:
+            candidates = _synthesize_calls(original, optimized)
+            if candidates:
+                timeout = _run_timeout(deadline)
+                if timeout is None:
+                    return out_of_time
+                probe = _run_harness(original, candidates, probe=True, timeout=timeout)
+                calls = [candidates[i] for i in probe.get("usable", [])] or None
+        workload = "calls" if calls else "script"
+
+        # 2. Alternate runs so drift affects both versions equally
+        samples = {"original": [], "optimized": []}
+        runs = {}
+        for _ in range(ROUNDS):
+            for name, code in (("original", original), ("optimized", optimized)):
+                timeout = _run_timeout(deadline)
+                if timeout is None:
+                    return dict(out_of_time, workload=workload)
+                run = _run_harness(code, calls, timeout=timeout)
+                if run.get("timed_out") and timeout < BENCH_TIMEOUT_SECONDS:
+                    # Stopped by the deadline, which says nothing about either version
+                    return dict(out_of_time, workload=workload)
+                if "error" in run:
+                    if name == "original":
+                        return {"verdict": "skipped", "workload": workload,
+                                "reason": f"Original code could not be benchmarked: {run['error']}"}
+                    return {"verdict": "rejected", "workload": workload,
+                            "reason": f"Optimized code failed: {run['error']}"}
+                samples[name].extend(run["samples"])
+                runs[name] = run
+
+        # 3. Behavior must not change
+        if runs["original"]["output"] != runs["optimized"]["output"]:
+            return {"verdict": "rejected", "workload": workload,
+                    "reason": "Optimized code produces different output"}
+
+        interval = _speedup_interval(samples["original"], samples["optimized"])
+        if interval is None:
+            return {"verdict": "inconclusive", "workload": workload,
+                    "reason": "The runs were too fast for the timer to tell the versions apart"}
+        report = {
+            "workload": workload,
+            "calls": len(calls) if calls else 0,
+            "original_seconds": statistics.fmean(samples["original"]),
+            "optimized_seconds": statistics.fmean(samples["optimized"]),
+            "original_peak_bytes": runs["original"]["peak_bytes"],
+            "optimized_peak_bytes": runs["optimized"]["peak_bytes"],
+            "memory_delta_bytes": runs["optimized"]["peak_bytes"] - runs["original"]["peak_bytes"],
+        }
+        report.update(interval)
+
+        if interval["ci_high"] < 1.0 - REGRESSION_TOLERANCE:
+            report["verdict"] = "rejected"
+            report["reason"] = f"Optimized code is slower ({interval['speedup']}x)"
+        else:
+            report["verdict"] = "accepted"
+        return report
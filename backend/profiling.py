@@ -0,0 +1,220 @@
+import contextvars
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import context
+
+# Share of requests profiled without being asked to (0 disables sampling)
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+# Seconds between stack samples
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", 5)) / 1000
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+# Profiles kept in PROFILE_DIR; the oldest are deleted beyond this
+MAX_PROFILES = int(os.getenv("PROFILE_MAX_COUNT", 200))
+
+
+class Profile:
+    """Per-stage timings and sampled stacks for one request
+
+    A background thread samples the stacks of the threadpool workers running
+    the request's work every SAMPLE_INTERVAL. The event loop thread is left
+    out, since it runs every other request's handlers too. Stacks are kept in the collapsed "a;b;c count"
+    format that flamegraph.pl, speedscope and inferno read directly.
+    """
+
+    def __init__(self, path: str, interval: float = SAMPLE_INTERVAL):
+        self.id = uuid.uuid4().hex[:12]
+        self.path = path
+        self.interval = interval
+        self.started = time.time()
+        self.timings: Dict[str, List[float]] = {}  # stage -> [seconds, count]
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._threads: Dict[int, int] = {}  # thread ident -> nesting depth
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, name=f"profile-{self.id}", daemon=True)
+
+    def start(self) -> None:
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._sampler.join()
+
+    def finish(self) -> None:
+        """Stop sampling and save; blocks, so async callers run it in a threadpool"""
+        self.stop()
+        self.save()
+
+    def add_thread(self, ident: int) -> None:
+        with self._lock:
+            self._threads[ident] = self._threads.get(ident, 0) + 1
+
+    def remove_thread(self, ident: int) -> None:
+        with self._lock:
+            depth = self._threads.get(ident, 0) - 1
+            if depth > 0:
+                self._threads[ident] = depth
+            else:
+                self._threads.pop(ident, None)
+
+    def add_timing(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.timings.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def _sample_loop(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self._threads)
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is not None and ident != own:
+                    self.stacks[_fold(frame)] += 1
+                    self.samples += 1
+
+    def server_timing(self) -> str:
+        """Timings as a Server-Timing header value (milliseconds)"""
+        return ", ".join(
+            f"{stage};dur={seconds * 1000:.1f}" for stage, (seconds, _) in self.timings.items()
+        )
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "path": self.path,
+            "started": self.started,
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "timings_ms": {
+                stage: {"total": round(seconds * 1000, 2), "count": count}
+                for stage, (seconds, count) in self.timings.items()
+            },
+        }
+
+    def save(self, directory: Path = PROFILE_DIR) -> None:
+        """Write <id>.folded (flamegraph input) and <id>.json (timings) to the profile directory"""
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            (directory / f"{self.id}.folded").write_text(self.folded() + "\n", encoding="utf-8")
+            (directory / f"{self.id}.json").write_text(json.dumps(self.summary(), indent=2), encoding="utf-8")
+            _prune(directory)
+        except OSError as e:
+            print(f"⚠️ Could not write profile {self.id}: {e}")
+
+
+def _prune(directory: Path, keep: int = MAX_PROFILES) -> None:
+    """Delete the oldest profiles beyond `keep`"""
+    saved = []
+    for path in directory.glob("*.folded"):
+        try:
+            saved.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            pass  # pruned by a concurrent save
+    saved.sort()
+    for _, path in saved[:max(0, len(saved) - keep)]:
+        path.unlink(missing_ok=True)
+        path.with_suffix(".json").unlink(missing_ok=True)
+
+
+def _fold(frame) -> str:
+    """Root-to-leaf stack of a frame as 'function (file:line);...'"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("profile", default=None)
+
+
+def current() -> Optional[Profile]:
+    return _current.get()
+
+
+def should_profile(requested: bool) -> bool:
+    """Profile when the (authenticated) request asks for it, or when PROFILE_SAMPLE_RATE samples it"""
+    return requested or (SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE)
+
+
+@contextmanager
+def activate(profile: Profile):
+    """Time stages and sample the threadpool work started within the block
+
+    The sampler keeps running afterwards; call profile.finish() (off the
+    event loop) to stop it and save the profile.
+    """
+    token = _current.set(profile)
+    profile.start()
+    start = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        profile.add_timing("total", time.perf_counter() - start)
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a stage of the current request for its profile and the request log"""
+    profile = _current.get()
+    ctx = context.current()
+    if profile is None and ctx is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        if profile is not None:
+            profile.add_timing(name, seconds)
+        if ctx is not None:
+            ctx.add_timing(name, seconds)
+
+
+def traced(fn: Callable) -> Callable:
+    """Wrap work handed to a threadpool so its thread is sampled while it runs"""
+    profile = _current.get()
+    if profile is None:
+        return fn
+
+    def run(*args, **kwargs):
+        ident = threading.get_ident()
+        profile.add_thread(ident)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.remove_thread(ident)
+    return run
+
+
+def saved_profiles() -> List[str]:
+    if not PROFILE_DIR.is_dir():
+        return []
+    return sorted(path.stem for path in PROFILE_DIR.glob("*.folded"))
+
+
+def load_folded(profile_id: str) -> Optional[str]:
+    if not profile_id.isalnum():
+        return None
+    path = PROFILE_DIR / f"{profile_id}.folded"
+    return path.read_text(encoding="utf-8") if path.is_file() else None
@@ -0,0 +1,249 @@
+import ast
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+import components
+import context
+import llm
+import profiling
+
+# Modules of one dependency level converted at the same time
+PROJECT_WORKERS = int(os.getenv("PROJECT_WORKERS", 4))
+# Declarations passed along per imported module
+MAX_INTERFACE_LINES = 40
+
+EXTENSIONS = {"python": ".py", "javascript": ".js", "cpp": ".cpp", "java": ".java"}
+
+
+def module_name(path: str) -> str:
+    """Dotted module name of a Python file path: pkg/util.py -> pkg.util, pkg/__init__.py -> pkg"""
+    parts = [part for part in path.replace("\\", "/").split("/") if part and part != "."]
+    if parts and parts[-1].endswith(".py"):
+        parts[-1] = parts[-1][:-3]
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+class Module:
+    """One file of the project with what the graph needs to know about it"""
+
+    def __init__(self, path: str, code: str):
+        self.path = path
+        self.code = code
+        self.name = module_name(path)
+        self.is_package = path.endswith("__init__.py")
+        self.imports: Set[str] = set()  # project modules this one imports
+        self.symbols: List[str] = []  # top-level Python signatures
+        try:
+            self.tree = ast.parse(code)
+        except (SyntaxError, RecursionError, MemoryError):
+            self.tree = None
+
+    def imported_names(self) -> Iterator[str]:
+        """The dotted names imported (`from a import b` gives a.b), relative imports resolved"""
+        if self.tree is None:
+            return
+        package = self.name if self.is_package else self.name.rpartition(".")[0]
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    yield alias.name
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    base = package.split(".") if package else []
+                    base = base[:max(0, len(base) - node.level + 1)]
+                    prefix = ".".join(base + ([node.module] if node.module else []))
+                else:
+                    prefix = node.module or ""
+                for alias in node.names:
+                    yield f"{prefix}.{alias.name}" if prefix else alias.name
+
+
+def _signatures(tree: ast.Module) -> List[str]:
+    """Compact public interface of a Python module: functions, classes with their methods, constants"""
+    lines = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and not node.name.startswith("_"):
+            returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+            lines.append(f"def {node.name}({ast.unparse(node.args)}){returns}")
+        elif isinstance(node, ast.ClassDef) and not node.name.startswith("_"):
+            bases = f"({', '.join(ast.unparse(base) for base in node.bases)})" if node.bases else ""
+            methods = [
+                f"{item.name}({ast.unparse(item.args)})"
+                for item in node.body
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))
+                and (not item.name.startswith("_") or item.name == "__init__")
+            ]
+            lines.append(f"class {node.name}{bases}" + (f": {', '.join(methods)}" if methods else ""))
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            lines.extend(
+                target.id for target in targets
+                if isinstance(target, ast.Name) and target.id.isupper()
+            )
+    return lines
+
+
+class Project:
+    """Modules, their import graph and the levels they can be converted in
+
+    Level 0 holds modules that import nothing from the project, level n the
+    modules whose project imports are all in earlier levels. Modules caught
+    in an import cycle share one last level.
+    """
+
+    def __init__(self, files: List[Tuple[str, str]]):
+        self.modules: Dict[str, Module] = {}
+        for path, code in files:
+            if not path.endswith(".py"):
+                raise ValueError(f"Only Python files can be converted as a project: {path}")
+            module = Module(path, code)
+            if module.name in self.modules:
+                raise ValueError(f"{path} and {self.modules[module.name].path} are the same module")
+            self.modules[module.name] = module
+        for module in self.modules.values():
+            module.symbols = _signatures(module.tree) if module.tree is not None else []
+            for name in module.imported_names():
+                # The most specific project module the name lives in; the
+                # enclosing packages' __init__ files are not dependencies
+                parts = name.split(".")
+                for i in range(len(parts), 0, -1):
+                    target = ".".join(parts[:i])
+                    if target in self.modules:
+                        if target != module.name:
+                            module.imports.add(target)
+                        break
+        self.levels, self.cyclic = self._levels()
+
+    def _levels(self) -> Tuple[List[List[Module]], List[str]]:
+        waiting = {name: set(module.imports) for name, module in self.modules.items()}
+        levels, cyclic = [], []
+        while waiting:
+            ready = sorted(name for name, imports in waiting.items() if not imports)
+            if not ready:
+                ready = sorted(waiting)
+                cyclic = [self.modules[name].path for name in ready]
+            levels.append([self.modules[name] for name in ready])
+            for name in ready:
+                del waiting[name]
+            for imports in waiting.values():
+                imports.difference_update(ready)
+        return levels, cyclic
+
+    def plan(self) -> Dict[str, Any]:
+        return {
+            "type": "plan",
+            "modules": [
+                {"path": m.path, "module": m.name, "imports": sorted(m.imports)}
+                for m in self.modules.values()
+            ],
+            "levels": [[m.path for m in level] for level in self.levels],
+            "cyclic": self.cyclic,
+        }
+
+
+def target_path(path: str, target_language: str) -> str:
+    stem, _ = os.path.splitext(path)
+    return stem + EXTENSIONS.get(target_language.lower(), os.path.splitext(path)[1])
+
+
+def _dependency_context(module: Module, project: Project, interfaces: Dict[str, List[str]],
+                        target_language: str) -> str:
+    """The interfaces of the modules `module` imports: converted ones in the target language"""
+    sections = []
+    for name in sorted(module.imports):
+        dependency = project.modules[name]
+        converted = interfaces.get(name)
+        if converted:
+            header = f"{name} ({target_path(dependency.path, target_language)}, converted):"
+            lines = converted
+        else:
+            # Not converted yet (import cycle) or no interface came back: the Python signatures
+            header = f"{name} ({dependency.path}, Python signatures):"
+            lines = dependency.symbols
+        sections.append(header + "".join(f"\n  {line}" for line in lines[:MAX_INTERFACE_LINES]))
+    return "\n".join(sections)
+
+
+def _convert(module: Module, level: int, project: Project, interfaces: Dict[str, List[str]],
+             target_language: str, use_ai: bool) -> Dict[str, Any]:
+    start = time.perf_counter()
+    dependencies = _dependency_context(module, project, interfaces, target_language)
+    event = {
+        "type": "module",
+        "path": module.path,
+        "target_path": target_path(module.path, target_language),
+        "module": module.name,
+        "level": level,
+        "success": True,
+    }
+    try:
+        # A cancelled project still reports every module, so `failed` covers them all
+        context.check()
+        with profiling.stage("convert_module"):
+            code, notes, interface = components.converter().convert_module(
+                module.code, "python", target_language, module.name, dependencies, use_ai
+            )
+        if module.tree is None:
+            notes = ["⚠️ Could not parse this module; it was converted without its imports"] + notes
+        event.update(converted_code=code, notes=notes, interface=interface)
+        if not use_ai:
+            # The rule passes give a draft at best, and the source itself for most targets
+            event.update(success=False, degraded=True,
+                         error_message="The AI service is unavailable; only the rule-based passes ran")
+            if code == module.code:
+                event["converted_code"] = None
+    except Exception as e:
+        # No converted code: the source must not pass for the target language
+        event.update(converted_code=None, notes=[], interface=[], success=False, error_message=str(e))
+        if isinstance(e, llm.BackendUnavailable):
+            event["degraded"] = True
+    event["seconds"] = round(time.perf_counter() - start, 3)
+    return event
+
+
+def convert_project(project: Project, target_language: str,
+                    use_ai: bool = True) -> Iterator[Dict[str, Any]]:
+    """Convert a Python project level by level, yielding an event per module as it finishes
+
+    The first event is the plan (import graph and levels), the last one a
+    summary. Modules of a level run in parallel, so the wall time follows
+    the depth of the import graph rather than the number of files.
+    """
+    start = time.perf_counter()
+    yield project.plan()
+
+    interfaces: Dict[str, List[str]] = {}
+    failed = 0
+    with ThreadPoolExecutor(max_workers=PROJECT_WORKERS, thread_name_prefix="project") as pool:
+        for level, modules in enumerate(project.levels):
+            # Modules of a level only see earlier levels, whichever finishes first
+            converted = dict(interfaces)
+            # Each task runs in its own copy of the request's context
+            futures = {
+                pool.submit(
+                    contextvars.copy_context().run, profiling.traced(_convert),
+                    module, level, project, converted, target_language, use_ai
+                ): module
+                for module in modules
+            }
+            for future in as_completed(futures):
+                event = future.result()
+                interfaces[futures[future].name] = event.pop("interface")
+                failed += not event["success"]
+                yield event
+
+    ctx = context.current()
+    yield {
+        "type": "done",
+        "modules": len(project.modules),
+        "levels": len(project.levels),
+        "failed": failed,
+        "seconds": round(time.perf_counter() - start, 3),
+        "usage": ctx.usage.as_dict() if ctx is not None else None,
+        "degraded": bool(ctx and ctx.degraded) or not use_ai,
+    }
@@ -0,0 +1,337 @@
+from typing import Dict, List
+
+# Every prompt is a fixed system message followed by a user message that carries
+# the variable input, with the code last. Requests for the same operation then
+# share an identical token prefix, which providers and local servers (llama.cpp,
+# vLLM) can serve from their prompt/KV cache instead of re-processing it.
+#
+# Template ids carry a version; bump it whenever the wording changes so benchmark
+# results for different wordings can be told apart.
+
+
+class PromptTemplate:
+    """A versioned prompt: stable instructions first, variable input last"""
+
+    __slots__ = ("name", "version", "system", "user")
+
+    def __init__(self, name: str, version: int, system: str, user: str):
+        self.name = name
+        self.version = version
+        self.system = system.strip()
+        self.user = user.strip()
+
+    @property
+    def id(self) -> str:
+        return f"{self.name}@v{self.version}"
+
+    def render(self, **values) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user.format(**values)},
+        ]
+
+
+TEMPLATES: Dict[str, PromptTemplate] = {}
+
+
+def register(template: PromptTemplate) -> PromptTemplate:
+    TEMPLATES[template.name] = template
+    return template
+
+
+def get(name: str) -> PromptTemplate:
+    return TEMPLATES[name]
+
+
+def render(name: str, **values) -> List[Dict[str, str]]:
+    """Chat messages for a registered template"""
+    return TEMPLATES[name].render(**values)
+
+
+def versions() -> Dict[str, str]:
+    """Template name -> versioned id, for diagnostics"""
+    return {name: template.id for name, template in TEMPLATES.items()}
+
+
+_CODE = """
+Language: {language}
+
+```{language}
+{code}
+```
+"""
+
+# Transformer
+
+register(PromptTemplate("optimize_python", 2, """
+You optimize Python code for better performance and readability.
+
+Return a JSON object with:
+- "optimized_code": the improved code
+- "improvements": list of improvements made
+
+Focus on:
+- Performance optimizations
+- Memory efficiency
+- Pythonic patterns
+- Code readability
+""", _CODE))
+
+register(PromptTemplate("transform_python", 2, """
+You transform Python code to be cleaner and follow best practices.
+
+Return a JSON object with:
+- "transformed_code": the cleaned code
+- "changes": list of changes made
+
+Focus on:
+- DRY principle (Don't Repeat Yourself)
+- Clean code structure
+- Removing redundancy
+- Better variable names
+- Function extraction
+""", _CODE))
+
+register(PromptTemplate("optimize", 2, """
+You optimize code for better performance. The language is given with the code.
+
+Return a JSON object with:
+- "optimized_code": the improved code
+- "improvements": list of improvements made
+""", _CODE))
+
+register(PromptTemplate("transform", 2, """
+You transform code to be cleaner and more maintainable. The language is given with the code.
+
+Return a JSON object with:
+- "transformed_code": the cleaned code
+- "changes": list of changes made
+""", _CODE))
+
+register(PromptTemplate("apply_dry", 2, """
+You refactor Python code to follow the DRY (Don't Repeat Yourself) principle.
+
+Return a JSON object with:
+- "refactored_code": the DRY code
+- "extractions": list of functions/methods extracted
+""", _CODE))
+
+# Fused single-call variants: the rewrite, its suggestions and the change
+# explanations in one response, instead of a rewrite call plus explain_changes
+
+_FUSED_EXPLANATIONS = """
+Make explanations:
+1. Clear and specific about what changed
+2. Explain the benefits in simple terms
+3. Use friendly, encouraging language
+4. Include emojis for engagement
+5. Focus on improvements and learning
+"""
+
+register(PromptTemplate("optimize_fused", 1, """
+You optimize code for better performance and readability, and explain your changes. The language is given with the code.
+
+Return a JSON object with:
+- "code": the improved code
+- "suggestions": list of improvements made
+- "explanations": list of explanations of the changes: what changed, why it is better, and how it affects performance or readability
+
+Focus on:
+- Performance optimizations
+- Memory efficiency
+- Idiomatic patterns for the language
+- Code readability
+""" + _FUSED_EXPLANATIONS, _CODE))
+
+register(PromptTemplate("transform_fused", 1, """
+You transform code to be cleaner and follow best practices, and explain your changes. The language is given with the code.
+
+Return a JSON object with:
+- "code": the cleaned code
+- "suggestions": list of changes made, including any functions or methods extracted
+- "explanations": list of explanations of the changes: what changed, why it is better, and how it affects readability
+
+Focus on:
+- DRY principle (Don't Repeat Yourself)
+- Clean code structure
+- Removing redundancy
+- Better variable names
+- Function extraction
+""" + _FUSED_EXPLANATIONS, _CODE))
+
+# Converter
+
+register(PromptTemplate("convert", 2, """
+You convert code from a source language to a target language, both given with the code.
+
+Return a JSON object with:
+- "converted_code": the equivalent code in the target language
+- "conversion_notes": list of important notes about the conversion
+- "language_differences": key differences to be aware of
+
+Make sure the converted code:
+1. Maintains the same functionality
+2. Follows the target language's best practices and conventions
+3. Includes proper syntax and structure
+4. Has appropriate type declarations if needed
+5. Includes necessary imports/includes
+""", """
+Source language: {source_lang}
+Target language: {target_lang}
+
+```{source_lang}
+{code}
+```
+"""))
+
+register(PromptTemplate("convert_with_base", 2, """
+You improve code that was partially converted from a source language to a target language, both given with the code.
+
+Return a JSON object with:
+- "improved_code": the properly converted and improved code
+- "improvements": list of improvements made
+- "syntax_fixes": syntax corrections applied
+
+Focus on:
+1. Fixing any syntax errors
+2. Following the target language's conventions
+3. Proper variable declarations and types
+4. Correct function definitions
+5. Appropriate built-in function usage
+""", """
+Source language: {source_lang}
+Target language: {target_lang}
+
+```{target_lang}
+{code}
+```
+"""))
+
+register(PromptTemplate("convert_module", 1, """
+You convert one module of a multi-module project from a source language to a target language, both given with the code.
+The modules it imports have already been converted; their interfaces in the target language are listed with the code.
+Use those names and signatures exactly, and import them the way the target language expects.
+
+Return a JSON object with:
+- "converted_code": the equivalent module in the target language
+- "conversion_notes": list of important notes about the conversion
+- "interface": list of one-line declarations (without bodies) of everything other modules can use from this module,
+  as written in the target language
+
+Make sure the converted code:
+1. Maintains the same functionality
+2. Follows the target language's best practices and conventions
+3. Keeps the public names other modules depend on
+4. Includes necessary imports/includes
+""", """
+Source language: {source_lang}
+Target language: {target_lang}
+Module: {module}
+
+Interfaces of the modules it imports:
+{dependencies}
+
+```{source_lang}
+{code}
+```
+"""))
+
+# Explainer
+
+register(PromptTemplate("explain_code", 2, """
+You explain code in simple, friendly terms. The language is given with the code.
+
+Return a JSON object with:
+- "explanations": list of clear explanations about what the code does
+- "purpose": overall purpose of the code
+- "key_concepts": important programming concepts used
+
+Make explanations:
+1. Simple and easy to understand
+2. Friendly and encouraging
+3. Focus on WHAT the code does, not just HOW
+4. Include emojis to make it more engaging
+5. Explain any complex logic step by step
+""", _CODE))
+
+register(PromptTemplate("explain_units", 1, """
+You explain code in simple, friendly terms. The code is split into numbered units (module-level code, functions and classes); explain each unit separately. The language is given with the code.
+
+Return a JSON object with:
+- "units": a list with one entry per unit, in order; each entry is a list of clear explanations of what that unit does
+- "purpose": overall purpose of the code
+- "key_concepts": important programming concepts used
+
+Make explanations:
+1. Simple and easy to understand
+2. Friendly and encouraging
+3. Focus on WHAT the code does, not just HOW
+4. Include emojis to make it more engaging
+5. Explain any complex logic step by step
+""", """
+Language: {language}
+
+{units}
+"""))
+
+_EXPLAIN_CHANGES = """
+You compare two versions of code and explain the changes. You are given either both versions or a unified diff from the original to the modified version.
+
+Return a JSON object with:
+- "changes": list of specific changes made
+- "benefits": why these changes improve the code
+- "impact": how these changes affect performance or readability
+
+Make explanations:
+1. Clear and specific about what changed
+2. Explain the benefits in simple terms
+3. Use friendly, encouraging language
+4. Include emojis for engagement
+5. Focus on improvements and learning
+"""
+
+register(PromptTemplate("explain_changes", 2, _EXPLAIN_CHANGES, """
+Language: {language}
+
+Original:
+```{language}
+{original}
+```
+
+Modified:
+```{language}
+{modified}
+```
+"""))
+
+register(PromptTemplate("explain_changes_diff", 2, _EXPLAIN_CHANGES, """
+Language: {language}
+
+Unified diff from the original to the modified version:
+```diff
+{diff}
+```
+"""))
+
+register(PromptTemplate("analyze_complexity", 2, """
+You analyze the complexity of code. The language is given with the code.
+
+Return a JSON object with:
+- "complexity_level": "Simple", "Moderate", or "Complex"
+- "analysis": detailed complexity analysis
+- "suggestions": ways to reduce complexity if needed
+""", _CODE))
+
+register(PromptTemplate("learning_tips", 2, """
+You generate helpful learning tips based on code. The language is given with the code.
+
+Return a JSON object with:
+- "tips": list of educational tips and insights
+
+Make tips:
+1. Educational and encouraging
+2. Relevant to concepts in the code
+3. Include best practices
+4. Use emojis for engagement
+5. Suitable for learners
+""", _CODE))
@@ -0,0 +1,133 @@
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# "record" appends every completion to the store; "replay" serves completions from it
+MODE = os.getenv("LLM_TRAFFIC_MODE", "").lower()
+STORE_PATH = os.getenv("LLM_TRAFFIC_PATH", "recordings/llm_traffic.jsonl.gz")
+# Replay at the recorded latency (1), faster (e.g. 10) or without any delay (0)
+SPEED = float(os.getenv("LLM_REPLAY_SPEED", 1))
+
+
+class ReplayMiss(RuntimeError):
+    """Replay mode has no recorded response for a prompt"""
+
+
+def prompt_key(messages: List[Dict[str, str]], json_mode: bool) -> str:
+    """Identity of a call for replay: the messages and the response format
+
+    The model and sampling settings are left out so a recording stays usable
+    when they are tuned.
+    """
+    payload = json.dumps([messages, json_mode], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+
+class TrafficStore:
+    """Recorded completions in a gzip-compressed JSONL file
+
+    Each line holds the prompt key, the messages, the response, its usage,
+    finish_reason and latency. A prompt recorded several times replays its
+    responses in turn.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._next: Dict[str, int] = {}
+        self._file = None
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+    def load(self) -> int:
+        """Read the store into memory; a file cut short by a crash keeps its complete lines"""
+        if not os.path.exists(self.path):
+            return 0
+        count = 0
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    self._entries.setdefault(entry["key"], []).append(entry)
+                    count += 1
+            except (EOFError, OSError):
+                pass
+        return count
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            try:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    self._file = gzip.open(self.path, "at", encoding="utf-8")
+                    atexit.register(self.close)
+                self._file.write(line)
+                # A sync flush keeps everything written so far readable if the process dies
+                self._file.flush()
+                self.recorded += 1
+            except OSError as e:
+                print(f"⚠️ Could not record LLM traffic: {e}")
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                return None
+            index = self._next.get(key, 0)
+            self._next[key] = index + 1
+            self.replayed += 1
+            return entries[index % len(entries)]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": MODE,
+            "path": self.path,
+            "prompts": len(self._entries),
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+        }
+
+
+def _usage_dict(completion_usage) -> Optional[Dict[str, int]]:
+    if completion_usage is None:
+        return None
+    return {
+        name: getattr(completion_usage, name, 0) or 0
+        for name in ("prompt_tokens", "completion_tokens", "total_tokens")
+    }
+
+
+def record(store: TrafficStore, backend_name: str, model: str, messages: List[Dict[str, str]],
+           json_mode: bool, result: Tuple[str, Any, Optional[str]], seconds: float) -> None:
+    content, completion_usage, finish_reason = result
+    store.append({
+        "key": prompt_key(messages, json_mode),
+        "ts": round(time.time(), 3),
+        "backend": backend_name,
+        "model": model,
+        "json_mode": json_mode,
+        "messages": messages,
+        "content": content,
+        "usage": _usage_dict(completion_usage),
+        "finish_reason": finish_reason,
+        "seconds": round(seconds, 4),
+    })
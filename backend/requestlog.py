@@ -0,0 +1,242 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+# Optional columnar output; JSONL is the fallback
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Directory for the log files (unset disables the log)
+LOG_DIR = os.getenv("REQUEST_LOG_DIR")
+# parquet, arrow or jsonl; parquet and arrow need pyarrow
+LOG_FORMAT = os.getenv("REQUEST_LOG_FORMAT", "parquet").lower()
+FLUSH_SECONDS = float(os.getenv("REQUEST_LOG_FLUSH_SECONDS", 5))
+# Flush early once this many records are waiting
+BATCH_SIZE = int(os.getenv("REQUEST_LOG_BATCH", 1000))
+# Start a new file after this many minutes or megabytes
+ROTATE_SECONDS = float(os.getenv("REQUEST_LOG_ROTATE_MINUTES", 60)) * 60
+ROTATE_BYTES = int(float(os.getenv("REQUEST_LOG_ROTATE_MB", 64)) * 1024 * 1024)
+# Records kept in memory while the writer catches up; older ones are dropped beyond this
+MAX_BUFFERED = int(os.getenv("REQUEST_LOG_MAX_BUFFERED", 100000))
+
+EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow", "jsonl": ".jsonl"}
+
+logger = logging.getLogger(__name__)
+
+# Column -> arrow type name; every record has exactly these fields
+COLUMNS = {
+    "ts": "float64",
+    "request_id": "string",
+    "method": "string",
+    "path": "string",
+    "status": "int32",
+    "duration_ms": "float64",
+    "client_id": "string",
+    "operation": "string",
+    "language": "string",
+    "target_language": "string",
+    "pipeline": "string",
+    "code_chars": "int64",
+    "code_lines": "int64",
+    "success": "bool",
+    "error": "string",
+    "degraded": "bool",
+    "reused": "string",
+    "cache_hits": "int32",
+    "llm_calls": "int32",
+    "prompt_tokens": "int64",
+    "completion_tokens": "int64",
+    "stage_ms": "map",
+}
+
+
+def _schema():
+    types = {
+        "float64": pyarrow.float64(), "string": pyarrow.string(), "int32": pyarrow.int32(),
+        "int64": pyarrow.int64(), "bool": pyarrow.bool_(),
+        "map": pyarrow.map_(pyarrow.string(), pyarrow.float64()),
+    }
+    return pyarrow.schema([(name, types[kind]) for name, kind in COLUMNS.items()])
+
+
+class _JsonlFile:
+    def __init__(self, path: str):
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        self._file.write("".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in records))
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ArrowFile:
+    """One Parquet file (a row group per flush) or Arrow IPC file (a record batch per flush)"""
+
+    def __init__(self, path: str, fmt: str):
+        self._schema = _schema()
+        if fmt == "parquet":
+            self._writer = pyarrow.parquet.ParquetWriter(path, self._schema, compression="zstd")
+        else:
+            self._writer = pyarrow.ipc.new_file(path, self._schema)
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        for record in records:
+            record["stage_ms"] = list(record["stage_ms"].items())
+        table = pyarrow.Table.from_pylist(records, schema=self._schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def _resolve_format(fmt: str) -> str:
+    """The requested file format, or JSONL when it is unknown or needs the missing pyarrow"""
+    if fmt in ("parquet", "arrow") and pyarrow is None:
+        logger.warning("REQUEST_LOG_FORMAT=%s needs pyarrow; writing JSONL instead", fmt)
+        return "jsonl"
+    if fmt not in EXTENSIONS:
+        logger.warning("Unknown REQUEST_LOG_FORMAT '%s'; writing JSONL instead", fmt)
+        return "jsonl"
+    return fmt
+
+
+class RequestLog:
+    """Structured per-request records, written in batches off the request path
+
+    record() only appends to an in-memory buffer. A daemon thread writes the
+    buffer every FLUSH_SECONDS (or once BATCH_SIZE records are waiting) to
+    the current file in `directory`, and starts a new file after
+    ROTATE_SECONDS or ROTATE_BYTES. Files are named
+    requests-<start time>.<ext> and are complete once rotated; Parquet and
+    Arrow files are only readable after they are closed.
+    """
+
+    def __init__(self, directory: Optional[str], fmt: str = LOG_FORMAT):
+        self.directory = directory
+        # The writer is only chosen (and its fallback reported) when the log is on
+        self.format = _resolve_format(fmt) if directory else None
+        self.written = 0
+        self.dropped = 0
+        self._buffer: deque = deque()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._opened = 0.0
+        self._thread = None
+        if directory:
+            self._thread = threading.Thread(target=self._run, name="request-log", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    @property
+    def enabled(self) -> bool:
+        return self._thread is not None
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        """Queue one record; never blocks on I/O"""
+        if self._thread is None:
+            return
+        if len(self._buffer) >= MAX_BUFFERED:
+            self._buffer.popleft()
+            self.dropped += 1
+        self._buffer.append(entry)
+        if len(self._buffer) >= BATCH_SIZE:
+            self._wakeup.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(FLUSH_SECONDS)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            records = []
+            while self._buffer:
+                records.append(self._buffer.popleft())
+            if not records:
+                return
+            try:
+                self._rotate_if_due()
+                self._file.write(records)
+                self.written += len(records)
+            except Exception as e:
+                self.dropped += len(records)
+                logger.warning("Could not write request log: %s", e)
+
+    def _rotate_if_due(self) -> None:
+        if self._file is not None:
+            too_old = time.time() - self._opened >= ROTATE_SECONDS
+            too_big = os.path.getsize(self._path) >= ROTATE_BYTES
+            if not (too_old or too_big):
+                return
+            self._file.close()
+        os.makedirs(self.directory, exist_ok=True)
+        self._opened = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime(self._opened))
+        self._path = os.path.join(self.directory, f"requests-{stamp}-{os.getpid()}{EXTENSIONS[self.format]}")
+        self._file = _JsonlFile(self._path) if self.format == "jsonl" else _ArrowFile(self._path, self.format)
+
+    def close(self) -> None:
+        """Write what is buffered and finish the current file"""
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "format": self.format,
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "dropped": self.dropped,
+            "current_file": self._path,
+        }
+
+
+def build_record(method: str, path: str, status: int, seconds: float, ctx=None,
+                 fields: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """One record with every column, from the request context and the handler's fields"""
+    record = dict.fromkeys(COLUMNS)
+    record.update(
+        ts=round(time.time(), 3),
+        method=method,
+        path=path,
+        status=status,
+        duration_ms=round(seconds * 1000, 2),
+        stage_ms={},
+    )
+    if ctx is not None:
+        usage = ctx.usage
+        record.update(
+            request_id=ctx.request_id,
+            client_id=ctx.client_id,
+            operation=ctx.operation,
+            degraded=ctx.degraded,
+            reused=ctx.reused,
+            cache_hits=ctx.cache_hits,
+            llm_calls=usage.calls,
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            stage_ms={stage: round(s * 1000, 2) for stage, s in ctx.timings.items()},
+        )
+    if fields:
+        record.update((key, value) for key, value in fields.items() if key in COLUMNS)
+    return record
+
+
+log = RequestLog(LOG_DIR)
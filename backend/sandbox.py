@@ -0,0 +1,131 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; runs there only get a wall-clock timeout
+    resource = None
+
+# Per-run limits
+DEFAULT_TIMEOUT_SECONDS = float(os.getenv("SANDBOX_TIMEOUT_SECONDS", 5))
+DEFAULT_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", 256))
+MAX_OUTPUT_BYTES = 64 * 1024
+MAX_FILE_BYTES = 1024 * 1024
+
+_FILENAMES = {"python": "main.py", "javascript": "main.js"}
+
+
+def execution_enabled() -> bool:
+    """Running user code is opt-in on the server (ENABLE_CODE_EXECUTION=true)"""
+    return os.getenv("ENABLE_CODE_EXECUTION", "false").lower() == "true"
+
+
+class RunResult:
+    """Outcome of running one program in the sandbox"""
+
+    def __init__(self, returncode: Optional[int], stdout: str, stderr: str, timed_out: bool, seconds: float):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.timed_out = timed_out
+        self.seconds = seconds
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not self.timed_out
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "returncode": self.returncode,
+            "stdout": self.stdout,
+            "stderr": self.stderr[-2000:],
+            "timed_out": self.timed_out,
+            "seconds": round(self.seconds, 4),
+        }
+
+
+def _command(language: str, path: str, memory_mb: int) -> Optional[List[str]]:
+    if language == "python":
+        # -I: isolated mode, ignores PYTHON* env vars and the user site directory
+        return [sys.executable, "-I", path]
+    if language == "javascript":
+        node = shutil.which("node")
+        if node is None:
+            return None
+        return [node, f"--max-old-space-size={memory_mb}", path]
+    return None
+
+
+def available(language: str) -> bool:
+    """Whether programs in this language can be run locally"""
+    return _command(language.lower(), "main", DEFAULT_MEMORY_MB) is not None
+
+
+# Applies rlimits and then execs the real program. A launcher process is used
+# instead of preexec_fn because preexec_fn is unsafe in threaded servers.
+_LAUNCHER = """
+import os, resource, sys
+cpu, memory, file_bytes = (int(v) for v in sys.argv[1:4])
+resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+resource.setrlimit(resource.RLIMIT_FSIZE, (file_bytes, file_bytes))
+resource.setrlimit(resource.RLIMIT_NOFILE, (64, 64))
+if memory:
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+os.execv(sys.argv[4], sys.argv[4:])
+"""
+
+
+def _with_limits(command: List[str], language: str, timeout: float, memory_mb: int) -> List[str]:
+    """Wrap a command so it runs under CPU, memory and file-size limits"""
+    if resource is None:
+        return command
+    cpu = int(timeout) + 1
+    # V8 reserves far more address space than it uses; node's heap is capped by flag instead
+    memory = 0 if language == "javascript" else memory_mb * 1024 * 1024
+    return [sys.executable, "-I", "-c", _LAUNCHER, str(cpu), str(memory), str(MAX_FILE_BYTES)] + command
+
+
+def run(code: str, language: str, stdin: str = "", timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        memory_mb: int = DEFAULT_MEMORY_MB) -> RunResult:
+    """Run a program in a throwaway directory with resource limits
+
+    This is best-effort isolation (rlimits, empty environment, temp working
+    directory), not a security boundary - only enable it for trusted users.
+    """
+    language = language.lower()
+    with tempfile.TemporaryDirectory(prefix="syntax-shift-") as workdir:
+        path = os.path.join(workdir, _FILENAMES.get(language, "main.txt"))
+        command = _command(language, path, memory_mb)
+        if command is None:
+            raise ValueError(f"No local runtime available for {language}")
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(code)
+
+        start = time.perf_counter()
+        try:
+            completed = subprocess.run(
+                _with_limits(command, language, timeout, memory_mb),
+                input=stdin,
+                capture_output=True,
+                text=True,
+                cwd=workdir,
+                env={"PATH": os.environ.get("PATH", ""), "PYTHONHASHSEED": "0", "HOME": workdir},
+                timeout=timeout,
+                start_new_session=True,
+            )
+            return RunResult(
+                completed.returncode,
+                completed.stdout[:MAX_OUTPUT_BYTES],
+                completed.stderr[:MAX_OUTPUT_BYTES],
+                False,
+                time.perf_counter() - start,
+            )
+        except subprocess.TimeoutExpired as e:
+            stdout = e.stdout.decode("utf-8", "replace") if isinstance(e.stdout, bytes) else (e.stdout or "")
+            return RunResult(None, stdout[:MAX_OUTPUT_BYTES], "Timed out", True, time.perf_counter() - start)
@@ -0,0 +1,461 @@
+import ast
+import builtins
+import difflib
+import hashlib
+import io
+import keyword
+import os
+import re
+import threading
+import tokenize as pytokenize
+import zlib
+from array import array
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# Past results kept for reuse (0 disables the index)
+INDEX_SIZE = int(os.getenv("SIMILAR_INDEX_SIZE", 10000))
+# Estimated Jaccard similarity above which a past result is merged into a new input
+THRESHOLD = float(os.getenv("SIMILAR_THRESHOLD", 0.85))
+
+# 64 MinHash values split into 8 bands of 8: snippets at 0.85 similarity
+# share a band with ~92% probability, at 0.5 with ~3%
+NUM_PERM = 64
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 4
+
+_MASK = 0xFFFFFFFF
+_EMPTY = 1 << 32
+_SEED = 0x9E3779B9
+_OFFSET = 0x6D2B79F5
+
+_STRINGS = (
+    r'"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\''
+    r'|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|`(?:\\.|[^`\\])*`'
+)
+# Comments come first so that quotes inside them never start a string
+_TOKENS = {
+    "python": re.compile(r"(?P<comment>#[^\n]*)|" + _STRINGS + r"|[A-Za-z_][\w]*|\d[\w.]*|\S"),
+    "default": re.compile(r"(?P<comment>//[^\n]*|/\*[\s\S]*?\*/)|" + _STRINGS + r"|[A-Za-z_$][\w$]*|\d[\w.]*|\S"),
+}
+# Python the tokenize module rejects: each line's indentation is kept as a token of its own
+_PYTHON_LAYOUT = re.compile(r"(?P<layout>\n[ \t]*(?=[^\s#]))|" + _TOKENS["python"].pattern)
+_LAYOUT_TYPES = {pytokenize.NEWLINE: "<newline>", pytokenize.INDENT: "<indent>", pytokenize.DEDENT: "<dedent>"}
+_SKIPPED_TYPES = {pytokenize.COMMENT, pytokenize.NL, pytokenize.ENDMARKER}
+_FSTRING_START = getattr(pytokenize, "FSTRING_START", None)
+_FSTRING_END = getattr(pytokenize, "FSTRING_END", None)
+
+_KEYWORDS = {
+    "python": set(keyword.kwlist) | set(dir(builtins)) | {"self", "cls"},
+    "default": {
+        "abstract", "auto", "boolean", "break", "byte", "case", "catch", "char", "class", "const", "constexpr",
+        "continue", "default", "delete", "do", "double", "else", "enum", "export", "extends", "false", "final",
+        "finally", "float", "for", "function", "if", "implements", "import", "include", "instanceof", "int",
+        "interface", "let", "long", "namespace", "new", "null", "nullptr", "package", "private", "protected",
+        "public", "return", "short", "static", "std", "string", "String", "struct", "super", "switch", "this",
+        "throw", "throws", "true", "try", "typeof", "undefined", "using", "var", "vector", "void", "while",
+        "yield", "async", "await", "of", "in", "from", "as", "console", "Math", "System", "Object", "Array", "List", "Map",
+        "cout", "endl", "main",
+    },
+}
+
+
+def _family(language: str) -> str:
+    return "python" if language.lower() == "python" else "default"
+
+
+def _python_tokens(code: str) -> Iterator[Tuple[str, bool]]:
+    """(token, is identifier) for Python code, with NEWLINE, INDENT and DEDENT kept
+
+    Indentation is part of a Python program, so code that only differs in
+    which block a statement belongs to must not normalize to the same tokens.
+    """
+    try:
+        tokens = list(pytokenize.generate_tokens(io.StringIO(code).readline))
+    except (pytokenize.TokenError, SyntaxError):
+        for match in _PYTHON_LAYOUT.finditer(code):
+            if not match.group("comment"):
+                token = match.group()
+                yield (token, False) if match.group("layout") else (token, token[0].isalpha() or token[0] == "_")
+        return
+    fstring, depth = [], 0
+    for token in tokens:
+        # Python 3.12+ splits f-strings into parts; keep them one opaque string as before
+        if token.type == _FSTRING_START:
+            depth += 1
+        if depth:
+            fstring.append(token.string)
+            if token.type == _FSTRING_END:
+                depth -= 1
+                if not depth:
+                    yield "".join(fstring), False
+                    fstring = []
+            continue
+        if token.type in _SKIPPED_TYPES:
+            continue
+        if token.type in _LAYOUT_TYPES:
+            yield _LAYOUT_TYPES[token.type], False
+        else:
+            yield token.string, token.type == pytokenize.NAME
+
+
+def _default_tokens(code: str) -> Iterator[Tuple[str, bool]]:
+    for match in _TOKENS["default"].finditer(code):
+        if not match.group("comment"):
+            token = match.group()
+            yield token, token[0].isalpha() or token[0] in "_$"
+
+
+def _source_tokens(code: str, family: str) -> List[Tuple[str, bool]]:
+    return list(_python_tokens(code) if family == "python" else _default_tokens(code))
+
+
+def _statement_end(token: str, family: str) -> bool:
+    if family == "python":
+        # NEWLINE from tokenize, or a line break kept by the fallback pattern
+        return token in ("<newline>", ";") or token.startswith("\n")
+    return token in (";", "from")
+
+
+def _literal_names(source: List[Tuple[str, bool]], family: str) -> set:
+    """Names that are part of an API rather than the snippet's own choice
+
+    The names in import statements (modules and what is imported from
+    them, but not `as` aliases) and Python keyword-argument names, so
+    snippets that call different APIs never normalize alike.
+    """
+    literal = set()
+    depth = 0
+    importing = False
+    previous = "<newline>"
+    for i, (token, is_name) in enumerate(source):
+        if importing:
+            if _statement_end(token, family):
+                importing = False
+            elif is_name and previous != "as":
+                literal.add(token)
+        elif token in (("import", "from") if family == "python" else ("import",)) and (
+                previous in ("<newline>", "<indent>", "<dedent>", ";", "{", "}") or previous.startswith("\n")):
+            importing = True
+        elif family == "python":
+            if token == "(":
+                depth += 1
+            elif token == ")":
+                depth = max(0, depth - 1)
+            elif is_name and depth and i + 1 < len(source) and source[i + 1][0] == "=":
+                literal.add(token)
+        previous = token
+    return literal
+
+
+def tokenize(code: str, language: str) -> Tuple[List[str], List[str]]:
+    """Normalized tokens and the identifiers they stand for, in order of first use
+
+    Comments and formatting are dropped (Python keeps its block structure)
+    and every identifier that is not a keyword, builtin, attribute name,
+    imported name or keyword-argument name becomes a placeholder (_0, _1,
+    ...), so renaming variables or reformatting gives the same tokens.
+    """
+    family = _family(language)
+    source = _source_tokens(code, family)
+    literal = _KEYWORDS[family] | _literal_names(source, family)
+    tokens: List[str] = []
+    names: Dict[str, str] = {}
+    previous = ""
+    for token, is_name in source:
+        original = token
+        if is_name and token not in literal and previous != ".":
+            token = names.setdefault(token, f"_{len(names)}")
+        tokens.append(token)
+        previous = original
+    return tokens, list(names)
+
+
+def _ast_shingles(code: str) -> List[str]:
+    """Parent node type with its children's types, for every node of a Python tree"""
+    try:
+        stack = [ast.parse(code)]
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        return []
+    shingles = []
+    while stack:
+        node = stack.pop()
+        children = list(ast.iter_child_nodes(node))
+        shingles.append(type(node).__name__ + ">" + ",".join(type(child).__name__ for child in children))
+        stack.extend(children)
+    return shingles
+
+
+def signature(tokens: List[str], extra: List[str] = ()) -> array:
+    """One-permutation MinHash of the token shingles (plus any extra shingles)
+
+    Each shingle is hashed once; the low bits pick one of NUM_PERM bins and
+    each bin keeps its smallest value. Empty bins borrow from the next
+    filled bin, so short inputs still get a full signature.
+    """
+    if len(tokens) <= SHINGLE_SIZE:
+        shingles = {" ".join(tokens)}
+    else:
+        shingles = {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+    shingles.update(extra)
+    bins = [_EMPTY] * NUM_PERM
+    for shingle in shingles:
+        data = shingle.encode("utf-8")
+        h = zlib.crc32(data) | zlib.crc32(data, _SEED) << 32
+        slot = h % NUM_PERM
+        value = (h // NUM_PERM) & _MASK
+        if value < bins[slot]:
+            bins[slot] = value
+    for i in range(NUM_PERM):
+        if bins[i] == _EMPTY:
+            for step in range(1, NUM_PERM):
+                borrowed = bins[(i + step) % NUM_PERM]
+                if borrowed != _EMPTY:
+                    bins[i] = (borrowed + step * _OFFSET) & _MASK
+                    break
+    return array("I", [0 if value == _EMPTY else value for value in bins])
+
+
+class Fingerprint(NamedTuple):
+    namespace: str
+    exact_key: bytes
+    names: List[str]
+    signature: array
+
+
+def fingerprint(code: str, language: str, namespace: str) -> Fingerprint:
+    tokens, names = tokenize(code, language)
+    exact_key = hashlib.blake2b(
+        (namespace + "\0" + " ".join(tokens)).encode("utf-8"), digest_size=16
+    ).digest()
+    extra = _ast_shingles(code) if language.lower() == "python" else []
+    return Fingerprint(namespace, exact_key, names, signature(tokens, extra))
+
+
+class Match(NamedTuple):
+    exact: bool
+    similarity: float
+    code: str
+    names: Tuple[str, ...]
+    result: Dict[str, Any]
+
+
+class SnippetIndex:
+    """Near-duplicate index of past inputs and their results (MinHash + LSH)
+
+    Entries live in a ring of `capacity` slots; signatures are packed into
+    one array and each LSH band maps a bucket hash to a slot (or a list of
+    slots), so an entry costs a few hundred bytes besides its result.
+    Inputs that only differ in identifier names, comments or formatting are
+    found through their exact normalized key.
+    """
+
+    def __init__(self, capacity: int = INDEX_SIZE, threshold: float = THRESHOLD):
+        self.capacity = capacity
+        self.threshold = threshold
+        self._signatures = array("I")
+        # slot -> (namespace, exact key, identifier names, input code, result)
+        self._entries: List[Tuple[str, bytes, Tuple[str, ...], str, Dict[str, Any]]] = []
+        self._exact: Dict[bytes, int] = {}
+        self._bands: List[Dict[int, Any]] = [{} for _ in range(BANDS)]
+        self._next = 0
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def _band_keys(self, namespace: str, sig) -> List[int]:
+        return [hash((namespace, *sig[i * ROWS:(i + 1) * ROWS])) for i in range(BANDS)]
+
+    def add(self, code: str, language: str, namespace: str, result: Dict[str, Any],
+            fp: Optional[Fingerprint] = None) -> None:
+        if self.capacity <= 0:
+            return
+        fp = fp or fingerprint(code, language, namespace)
+        entry = (fp.namespace, fp.exact_key, tuple(fp.names), code, result)
+        with self._lock:
+            slot = self._next
+            self._next = (slot + 1) % self.capacity
+            if slot < len(self._entries):
+                self._evict(slot)
+                self._signatures[slot * NUM_PERM:(slot + 1) * NUM_PERM] = fp.signature
+                self._entries[slot] = entry
+            else:
+                self._signatures.extend(fp.signature)
+                self._entries.append(entry)
+            self._exact[fp.exact_key] = slot
+            for band, key in zip(self._bands, self._band_keys(fp.namespace, fp.signature)):
+                current = band.get(key)
+                if current is None:
+                    band[key] = slot
+                elif isinstance(current, list):
+                    current.append(slot)
+                else:
+                    band[key] = [current, slot]
+
+    def _evict(self, slot: int) -> None:
+        namespace, exact_key = self._entries[slot][:2]
+        if self._exact.get(exact_key) == slot:
+            del self._exact[exact_key]
+        sig = self._signatures[slot * NUM_PERM:(slot + 1) * NUM_PERM]
+        for band, key in zip(self._bands, self._band_keys(namespace, sig)):
+            current = band.get(key)
+            if isinstance(current, list):
+                if slot in current:
+                    current.remove(slot)
+                if len(current) == 1:
+                    band[key] = current[0]
+            elif current == slot:
+                del band[key]
+
+    def lookup(self, fp: Fingerprint) -> Optional[Match]:
+        """The entry with the same normalized input, or else the most similar one above the threshold"""
+        with self._lock:
+            slot = self._exact.get(fp.exact_key)
+            if slot is not None:
+                _, _, names, code, result = self._entries[slot]
+                self.exact_hits += 1
+                return Match(True, 1.0, code, names, result)
+
+            candidates = set()
+            for band, key in zip(self._bands, self._band_keys(fp.namespace, fp.signature)):
+                current = band.get(key)
+                if isinstance(current, list):
+                    candidates.update(current)
+                elif current is not None:
+                    candidates.add(current)
+            best, best_similarity = None, self.threshold
+            for slot in candidates:
+                stored = self._signatures[slot * NUM_PERM:(slot + 1) * NUM_PERM]
+                similarity = sum(x == y for x, y in zip(stored, fp.signature)) / NUM_PERM
+                if similarity >= best_similarity:
+                    best, best_similarity = slot, similarity
+            if best is None:
+                self.misses += 1
+                return None
+            _, _, names, code, result = self._entries[best]
+            self.near_hits += 1
+            return Match(False, best_similarity, code, names, result)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "threshold": self.threshold,
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+        }
+
+
+def rename(code: str, language: str, mapping: Dict[str, str]) -> str:
+    """Rename identifier tokens only, leaving strings, comments and attributes alone"""
+    if not mapping:
+        return code
+    previous = ""
+
+    def replace(match):
+        nonlocal previous
+        token = match.group()
+        if not match.group("comment"):
+            if token in mapping and previous != ".":
+                token = mapping[token]
+            previous = match.group()
+        return token
+    return _TOKENS[_family(language)].sub(replace, code)
+
+
+def _word_pattern(words) -> re.Pattern:
+    return re.compile(r"(?<![\w$])(" + "|".join(map(re.escape, sorted(words, key=len, reverse=True))) + r")(?![\w$])")
+
+
+def _mentions(text: str, words) -> bool:
+    return _word_pattern(words).search(text) is not None
+
+
+def rename_text(text: str, mapping: Dict[str, str]) -> str:
+    """Rename whole-word mentions of identifiers in prose (explanations, suggestions)"""
+    if not mapping:
+        return text
+    return _word_pattern(mapping).sub(lambda m: mapping[m.group(1)], text)
+
+
+def merge(base: str, ours: str, theirs: str) -> Optional[str]:
+    """Line-based three-way merge; None when the two sides touch the same lines
+
+    base is the earlier input, ours the new input and theirs the earlier
+    result, so the earlier rewrite is replayed onto the edited input.
+    """
+    base_lines, our_lines, their_lines = base.split("\n"), ours.split("\n"), theirs.split("\n")
+
+    def edits(lines):
+        matcher = difflib.SequenceMatcher(None, base_lines, lines, autojunk=False)
+        return [(i1, i2, lines[j1:j2]) for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"]
+
+    our_edits, their_edits = edits(our_lines), edits(their_lines)
+    for i1, i2, _ in our_edits:
+        for j1, j2, _ in their_edits:
+            # Touching ranges conflict too: the order of two insertions at one line is unknown
+            if i1 <= j2 and j1 <= i2:
+                return None
+    merged = list(base_lines)
+    for i1, i2, lines in sorted(our_edits + their_edits, key=lambda edit: edit[0], reverse=True):
+        merged[i1:i2] = lines
+    return "\n".join(merged)
+
+
+def adapt(match: Match, code: str, names: List[str], input_language: str, output_language: str,
+          allow_merge: bool) -> Optional[Dict[str, Any]]:
+    """The earlier result made to fit the new input, or None when it cannot be
+
+    An exact match has its identifiers renamed to the new input's names;
+    output in another language is only reused when no name changed, since
+    the output's names need not be spelled like the input's. A near match
+    is only usable when the earlier rewrite merges cleanly into the edited
+    input.
+    """
+    result = match.result
+    if match.exact:
+        mapping = {old: new for old, new in zip(match.names, names) if old != new}
+        if result["transformed_code"] == match.code:
+            transformed = code
+        elif mapping and _family(input_language) != _family(output_language):
+            return None
+        else:
+            output_family = _family(output_language)
+            source = _source_tokens(result["transformed_code"], output_family)
+            result_names = {token for token, is_name in source if is_name}
+            # Names the rewrite introduced must not be taken by the new input's renamed ones
+            introduced = result_names - set(match.names) - _KEYWORDS[output_family]
+            if introduced & set(mapping.values()):
+                return None
+            # rename() would rewrite keyword-argument and imported names too
+            if set(mapping) & _literal_names(source, output_family):
+                return None
+            transformed = rename(result["transformed_code"], output_language, mapping)
+            # An old name still there (in an f-string, say) was not renamed consistently
+            stale = set(mapping) - set(mapping.values())
+            if stale and _mentions(transformed, stale):
+                return None
+        note = "♻️ Reused the result of an earlier snippet that differs only in names, comments or formatting"
+    else:
+        if not allow_merge:
+            return None
+        transformed = merge(match.code, code, result["transformed_code"])
+        if transformed is None:
+            return None
+        if output_language.lower() == "python":
+            try:
+                ast.parse(transformed)
+            except (SyntaxError, ValueError, RecursionError, MemoryError):
+                return None
+        mapping = {}
+        note = f"♻️ Applied the earlier rewrite of a {match.similarity:.0%} similar snippet"
+    return {
+        "transformed_code": transformed,
+        "explanations": [rename_text(e, mapping) for e in result["explanations"]],
+        "suggestions": [rename_text(s, mapping) for s in result["suggestions"]] + [note],
+    }
@@ -0,0 +1,55 @@
+from array import array
+from typing import Iterator, Tuple
+
+Span = Tuple[int, int]  # [start, end) character offsets into the source text
+
+
+def iter_lines(text: str) -> Iterator[str]:
+    """Yield lines one at a time without building a list (same lines as text.split('\\n'))"""
+    start = 0
+    while True:
+        end = text.find("\n", start)
+        if end < 0:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+
+class SourceText:
+    """Line view over one source buffer: line start offsets in a compact array, no line copies"""
+
+    def __init__(self, text: str):
+        self.text = text
+        starts = array("Q", [0])
+        find, position = text.find, text.find("\n")
+        while position >= 0:
+            starts.append(position + 1)
+            position = find("\n", position + 1)
+        self._starts = starts
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def line_span(self, index: int) -> Span:
+        start = self._starts[index]
+        end = self._starts[index + 1] - 1 if index + 1 < len(self._starts) else len(self.text)
+        return start, end
+
+    def line(self, index: int) -> str:
+        start, end = self.line_span(index)
+        return self.text[start:end]
+
+    def span(self, first: int, last: int) -> Span:
+        """Offsets of lines [first, last), without the newline that ends the last one"""
+        if last >= len(self._starts):
+            return self._starts[first], len(self.text)
+        return self._starts[first], self._starts[last] - 1
+
+    def span_length(self, first: int, last: int) -> int:
+        """Characters in lines [first, last) including their newlines"""
+        end = self._starts[last] if last < len(self._starts) else len(self.text) + 1
+        return end - self._starts[first]
+
+    def slice(self, span: Span) -> str:
+        return self.text[span[0]:span[1]]
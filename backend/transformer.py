@@ -1,39 +1,143 @@
 import ast
+import os
 import re
 from typing import Tuple, List
-from groq import Groq
+import limits
+import llm
+import parsing
+import prompts
+import source
+
+# Pattern rules for languages without a Python-style rewrite pass: (pattern, suggestion)
+LOCAL_RULES = {
+    "javascript": [
+        (re.compile(r'for\s*\(\s*(?:let|var)\s+(\w+)\s*=\s*0\s*;\s*\1\s*<\s*([\w.]+)\.length\s*;'),
+         "Index loop over {1} - use for...of or array methods instead"),
+        (re.compile(r'\bvar\s+(\w+)'),
+         "'var {0}' is function-scoped - prefer let or const"),
+        (re.compile(r'[^=!<>]==[^=]'),
+         "Loose equality (==) - prefer strict equality (===)"),
+    ],
+    "java": [
+        (re.compile(r'for\s*\(\s*int\s+(\w+)\s*=\s*0\s*;\s*\1\s*<\s*([\w.]+)\.(?:size\(\)|length)\s*;'),
+         "Index loop over {1} - use an enhanced for loop"),
+        (re.compile(r'\bString\s+(\w+)\s*=\s*"";'),
+         "String '{0}' starts empty - if it is built up in a loop, use a StringBuilder"),
+    ],
+    "cpp": [
+        (re.compile(r'for\s*\(\s*(?:int|size_t|unsigned)\s+(\w+)\s*=\s*0\s*;\s*\1\s*<\s*([\w.]+)\.size\(\)\s*;'),
+         "Index loop over {1} - use a range-based for loop"),
+        (re.compile(r'\bstd::endl\b|\bendl\b'),
+         "endl flushes the stream every time - use '\\n' in hot loops"),
+    ],
+}
+
+# Rewrite rules for the Python optimize pass, compiled once at import. Each runs as a
+# single regex scan over the whole buffer, so the code is never split into lines.
+RANGE_LEN_LOOP = re.compile(r'for\s+(\w+)\s+in\s+range\(len\((\w+)\)\):')
+# `for x in y:` directly followed by `name.append(expr)`; [^\S\n] is whitespace within a line
+APPEND_LOOP = re.compile(
+    r'^[^\S\n]*for [^\S\n]*(\w+)[^\S\n]+in[^\S\n]+(.+):[^\n]*\n'
+    r'([^\S\n]*(\w+)\.append\((.+)\)[^\n]*)$',
+    re.MULTILINE,
+)
+
+# Operations answered by one fused LLM call (code, suggestions and change
+# explanations together) instead of the multi-call pipeline
+FUSED_OPERATIONS = {op.strip() for op in os.getenv("FUSED_OPERATIONS", "").split(",") if op.strip()}
+PIPELINES = ("fused", "multi")
+
+
+def use_fused(operation: str, pipeline: str = None) -> bool:
+    """Whether an operation runs fused: the request's choice, else the FUSED_OPERATIONS default"""
+    if operation not in ("optimize", "transform"):
+        return False
+    if pipeline:
+        return pipeline == "fused"
+    return operation in FUSED_OPERATIONS
 
 class CodeTransformer:
     """Handles code optimization and transformation using AST analysis and AI"""
     
-    def __init__(self):
-        self.client = Groq()
-        self.model = "meta-llama/llama-4-maverick-17b-128e-instruct"
-    
-    def optimize_code(self, code: str, language: str) -> Tuple[str, List[str]]:
-        """Optimize code for performance and readability"""
+    def optimize_code(self, code: str, language: str, use_ai: bool = True) -> Tuple[str, List[str]]:
+        """Optimize code for performance and readability (rule passes only without AI)"""
         suggestions = []
         
+        if not use_ai:
+            if language.lower() == "python":
+                return self._rewrite_loops(code, suggestions), suggestions
+            self._apply_local_rules(code, language, suggestions)
+            return code, suggestions
+        
         if language.lower() == "python":
             # Apply Python-specific optimizations
             optimized_code = self._optimize_python(code, suggestions)
         else:
-            # Use AI for other languages
+            # Local rule passes from the syntax tree, then AI for the rewrite
+            self._apply_local_rules(code, language, suggestions)
             optimized_code = self._ai_optimize(code, language, suggestions)
         
         return optimized_code, suggestions
     
-    def transform_code(self, code: str, language: str) -> Tuple[str, List[str]]:
-        """Apply general code transformations (DRY, clean structure)"""
+    def transform_code(self, code: str, language: str, use_ai: bool = True) -> Tuple[str, List[str]]:
+        """Apply general code transformations (DRY, clean structure; rule passes only without AI)"""
         suggestions = []
         
+        if not use_ai:
+            return code, self.local_suggestions(code, language)
+        
         if language.lower() == "python":
             transformed_code = self._transform_python(code, suggestions)
         else:
+            self._apply_local_rules(code, language, suggestions)
+            self._remove_duplicates(code, suggestions)
             transformed_code = self._ai_transform(code, language, suggestions)
         
         return transformed_code, suggestions
     
+    def rewrite_fused(self, code: str, language: str, operation: str) -> Tuple[str, List[str], List[str]]:
+        """Optimize or transform with a single LLM call that also explains the changes
+
+        Returns (code, suggestions, explanations). The local rule passes run
+        first as in the multi-call pipeline.
+        """
+        suggestions = []
+        if language.lower() == "python" and operation == "optimize":
+            code = self._rewrite_loops(code, suggestions)
+        else:
+            if language.lower() != "python":
+                self._apply_local_rules(code, language, suggestions)
+            if operation == "transform":
+                self._remove_duplicates(code, suggestions)
+        
+        messages = prompts.render(f"{operation}_fused", language=language, code=code)
+        
+        try:
+            content = llm.complete(
+                messages,
+                temperature=0.3,
+                stage=f"ai_{operation}_fused"
+            )
+            
+            result = llm.parse_json(content, {"code": str, "suggestions": [str], "explanations": [str]},
+                                    required=("code",))
+            suggestions.extend(result.get("suggestions", []))
+            return result["code"], suggestions, result.get("explanations", [])
+            
+        except Exception as e:
+            suggestions.append(f"AI {operation} failed: {str(e)}")
+            return code, suggestions, []
+    
+    def local_suggestions(self, code: str, language: str) -> List[str]:
+        """Suggestions from the rule passes alone, without the LLM"""
+        suggestions = []
+        if language.lower() == "python":
+            self._rewrite_loops(code, suggestions)
+        else:
+            self._apply_local_rules(code, language, suggestions)
+        self._remove_duplicates(code, suggestions)
+        return suggestions
+    
     def _optimize_python(self, code: str, suggestions: List[str]) -> str:
         """Apply Python-specific optimizations"""
         try:
@@ -43,20 +147,15 @@ class CodeTransformer:
             # Apply rule-based optimizations
             optimized_code = code
             
-            # 1. Replace range(len()) with enumerate
-            if "range(len(" in code:
-                optimized_code = self._fix_range_len(optimized_code)
-                suggestions.append("Replaced range(len()) with enumerate for better performance")
-            
-            # 2. Convert simple loops to list comprehensions
-            optimized_code = self._convert_to_comprehensions(optimized_code, suggestions)
+            # 1-2. range(len()) -> enumerate and simple loops -> comprehensions, in one scan
+            optimized_code = self._rewrite_loops(optimized_code, suggestions)
             
             # 3. Use AI for complex optimizations
             optimized_code = self._ai_optimize_python(optimized_code, suggestions)
             
             return optimized_code
             
-        except SyntaxError:
+        except (SyntaxError, RecursionError, MemoryError):
             # If code can't be parsed, use AI fallback
             return self._ai_optimize(code, "python", suggestions)
     
@@ -68,8 +167,11 @@ class CodeTransformer:
             # 1. Remove duplicate code patterns
             transformed_code = self._remove_duplicates(transformed_code, suggestions)
             
-            # 2. Apply DRY principle
-            transformed_code = self._apply_dry_principle(transformed_code, suggestions)
+            # 2. Apply DRY principle - a second LLM pass, dropped when the request is short on time
+            if limits.has_time_for_optional_stage():
+                transformed_code = self._apply_dry_principle(transformed_code, suggestions)
+            else:
+                suggestions.append("⏳ Skipped the DRY pass to finish in time")
             
             # 3. Use AI for advanced transformations
             transformed_code = self._ai_transform_python(transformed_code, suggestions)
@@ -79,57 +181,53 @@ class CodeTransformer:
         except Exception:
             return self._ai_transform(code, "python", suggestions)
     
-    def _fix_range_len(self, code: str) -> str:
-        """Replace range(len()) patterns with enumerate"""
-        pattern = r'for\s+(\w+)\s+in\s+range\(len\((\w+)\)\):'
-        replacement = r'for \1, item in enumerate(\2):'
-        return re.sub(pattern, replacement, code)
+    def _apply_local_rules(self, code: str, language: str, suggestions: List[str]) -> None:
+        """Rule-based suggestions for JavaScript, C++ and Java"""
+        language = language.lower()
+        
+        # 1. Pattern rules over the source text
+        for pattern, message in LOCAL_RULES.get(language, []):
+            for match in pattern.finditer(code):
+                line = code.count('\n', 0, match.start()) + 1
+                suggestions.append(f"Line {line}: {message.format(*match.groups())}")
+        
+        # 2. Structural rules from the syntax tree
+        summary = parsing.summarize(code, language)
+        if summary is None:
+            return
+        
+        for function in summary["functions"]:
+            if function["complexity"] > 10:
+                suggestions.append(
+                    f"Function '{function['name']}' has cyclomatic complexity {function['complexity']} - consider splitting it"
+                )
+        
+        if summary["max_nesting_depth"] > 4:
+            suggestions.append(
+                f"Code is nested {summary['max_nesting_depth']} levels deep - use early returns or extract helpers"
+            )
     
-    def _convert_to_comprehensions(self, code: str, suggestions: List[str]) -> str:
-        """Convert simple loops to list comprehensions"""
-        # Simple pattern matching for basic for loops that append to lists
-        lines = code.split('\n')
-        new_lines = []
-        i = 0
+    def _rewrite_loops(self, code: str, suggestions: List[str]) -> str:
+        """Replace range(len()) with enumerate and convert simple append loops to list comprehensions"""
+        code, replaced = RANGE_LEN_LOOP.subn(r'for \1, item in enumerate(\2):', code)
+        if replaced:
+            suggestions.append("Replaced range(len()) with enumerate for better performance")
         
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            # Look for pattern: for x in y: result.append(transform(x))
-            if (line.startswith('for ') and i + 1 < len(lines) and 
-                'append(' in lines[i + 1] and lines[i + 1].strip().count(' ') <= 8):
-                
-                # Extract components
-                for_match = re.match(r'for\s+(\w+)\s+in\s+(.+):', line)
-                if for_match and i + 1 < len(lines):
-                    var_name = for_match.group(1)
-                    iterable = for_match.group(2)
-                    next_line = lines[i + 1].strip()
-                    
-                    append_match = re.match(rf'(\w+)\.append\((.+)\)', next_line)
-                    if append_match:
-                        list_name = append_match.group(1)
-                        expression = append_match.group(2)
-                        
-                        # Create list comprehension
-                        comprehension = f"{list_name} = [{expression} for {var_name} in {iterable}]"
-                        new_lines.append(comprehension)
-                        suggestions.append(f"Converted loop to list comprehension for better performance")
-                        i += 2  # Skip both lines
-                        continue
-            
-            new_lines.append(lines[i])
-            i += 1
+        def to_comprehension(match):
+            var_name, iterable, append_line, list_name, expression = match.groups()
+            if append_line.strip().count(' ') > 8:
+                return match.group(0)
+            suggestions.append("Converted loop to list comprehension for better performance")
+            return f"{list_name} = [{expression} for {var_name} in {iterable}]"
         
-        return '\n'.join(new_lines)
+        return APPEND_LOOP.sub(to_comprehension, code)
     
     def _remove_duplicates(self, code: str, suggestions: List[str]) -> str:
         """Remove duplicate code patterns"""
-        lines = code.split('\n')
         seen_patterns = {}
         
         # Look for repeated function calls or similar patterns
-        for i, line in enumerate(lines):
+        for i, line in enumerate(source.iter_lines(code)):
             clean_line = line.strip()
             if len(clean_line) > 10:  # Only check substantial lines
                 if clean_line in seen_patterns:
@@ -146,36 +244,18 @@ class CodeTransformer:
     
     def _ai_optimize_python(self, code: str, suggestions: List[str]) -> str:
         """Use AI to optimize Python code"""
-        prompt = f"""
-        Optimize this Python code for better performance and readability:
-        
-        ```python
-        {code}
-        ```
-        
-        Return a JSON object with:
-        - "optimized_code": the improved code
-        - "improvements": list of improvements made
-        
-        Focus on:
-        - Performance optimizations
-        - Memory efficiency
-        - Pythonic patterns
-        - Code readability
-        """
+        messages = prompts.render("optimize_python", language="python", code=code)
         
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+            content = llm.complete(
+                messages,
                 temperature=0.3,
-                max_completion_tokens=1024,
-                response_format={"type": "json_object"}
+                stage="ai_optimize_python"
             )
             
-            result = eval(completion.choices[0].message.content)
+            result = llm.parse_json(content, {"optimized_code": str, "improvements": [str]}, required=("optimized_code",))
             suggestions.extend(result.get("improvements", []))
-            return result.get("optimized_code", code)
+            return result["optimized_code"]
             
         except Exception as e:
             suggestions.append(f"AI optimization failed: {str(e)}")
@@ -183,37 +263,18 @@ class CodeTransformer:
     
     def _ai_transform_python(self, code: str, suggestions: List[str]) -> str:
         """Use AI to transform Python code structure"""
-        prompt = f"""
-        Transform this Python code to be cleaner and follow best practices:
-        
-        ```python
-        {code}
-        ```
-        
-        Return a JSON object with:
-        - "transformed_code": the cleaned code
-        - "changes": list of changes made
-        
-        Focus on:
-        - DRY principle (Don't Repeat Yourself)
-        - Clean code structure
-        - Removing redundancy
-        - Better variable names
-        - Function extraction
-        """
+        messages = prompts.render("transform_python", language="python", code=code)
         
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+            content = llm.complete(
+                messages,
                 temperature=0.3,
-                max_completion_tokens=1024,
-                response_format={"type": "json_object"}
+                stage="ai_transform_python"
             )
             
-            result = eval(completion.choices[0].message.content)
+            result = llm.parse_json(content, {"transformed_code": str, "changes": [str]}, required=("transformed_code",))
             suggestions.extend(result.get("changes", []))
-            return result.get("transformed_code", code)
+            return result["transformed_code"]
             
         except Exception as e:
             suggestions.append(f"AI transformation failed: {str(e)}")
@@ -221,30 +282,18 @@ class CodeTransformer:
     
     def _ai_optimize(self, code: str, language: str, suggestions: List[str]) -> str:
         """Use AI to optimize code in any language"""
-        prompt = f"""
-        Optimize this {language} code for better performance:
-        
-        ```{language}
-        {code}
-        ```
-        
-        Return a JSON object with:
-        - "optimized_code": the improved code
-        - "improvements": list of improvements made
-        """
+        messages = prompts.render("optimize", language=language, code=code)
         
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+            content = llm.complete(
+                messages,
                 temperature=0.3,
-                max_completion_tokens=1024,
-                response_format={"type": "json_object"}
+                stage="ai_optimize"
             )
             
-            result = eval(completion.choices[0].message.content)
+            result = llm.parse_json(content, {"optimized_code": str, "improvements": [str]}, required=("optimized_code",))
             suggestions.extend(result.get("improvements", []))
-            return result.get("optimized_code", code)
+            return result["optimized_code"]
             
         except Exception as e:
             suggestions.append(f"AI optimization failed: {str(e)}")
@@ -252,30 +301,18 @@ class CodeTransformer:
     
     def _ai_transform(self, code: str, language: str, suggestions: List[str]) -> str:
         """Use AI to transform code structure in any language"""
-        prompt = f"""
-        Transform this {language} code to be cleaner and more maintainable:
-        
-        ```{language}
-        {code}
-        ```
-        
-        Return a JSON object with:
-        - "transformed_code": the cleaned code
-        - "changes": list of changes made
-        """
+        messages = prompts.render("transform", language=language, code=code)
         
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+            content = llm.complete(
+                messages,
                 temperature=0.3,
-                max_completion_tokens=1024,
-                response_format={"type": "json_object"}
+                stage="ai_transform"
             )
             
-            result = eval(completion.choices[0].message.content)
+            result = llm.parse_json(content, {"transformed_code": str, "changes": [str]}, required=("transformed_code",))
             suggestions.extend(result.get("changes", []))
-            return result.get("transformed_code", code)
+            return result["transformed_code"]
             
         except Exception as e:
             suggestions.append(f"AI transformation failed: {str(e)}")
@@ -283,30 +320,18 @@ class CodeTransformer:
     
     def _ai_apply_dry(self, code: str, suggestions: List[str]) -> str:
         """Use AI to apply DRY principle"""
-        prompt = f"""
-        Refactor this Python code to follow the DRY (Don't Repeat Yourself) principle:
-        
-        ```python
-        {code}
-        ```
-        
-        Return a JSON object with:
-        - "refactored_code": the DRY code
-        - "extractions": list of functions/methods extracted
-        """
+        messages = prompts.render("apply_dry", language="python", code=code)
         
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+            content = llm.complete(
+                messages,
                 temperature=0.3,
-                max_completion_tokens=1024,
-                response_format={"type": "json_object"}
+                stage="ai_apply_dry"
             )
             
-            result = eval(completion.choices[0].message.content)
+            result = llm.parse_json(content, {"refactored_code": str, "extractions": [str]}, required=("refactored_code",))
             suggestions.extend(result.get("extractions", []))
-            return result.get("refactored_code", code)
+            return result["refactored_code"]
             
         except Exception as e:
             suggestions.append(f"DRY refactoring failed: {str(e)}")
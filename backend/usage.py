@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+import context
+
+
+class Usage:
+    """Token counts summed over one or more LLM calls"""
+
+    __slots__ = ("calls", "prompt_tokens", "completion_tokens", "total_tokens", "_lock")
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.total_tokens = 0
+        # Project conversions make calls for one request from several threads
+        self._lock = threading.Lock()
+
+    def add(self, prompt_tokens: int, completion_tokens: int, total_tokens: int, calls: int = 1):
+        with self._lock:
+            self.calls += calls
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.total_tokens += total_tokens
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+        }
+
+    def header(self) -> str:
+        """Compact form for the X-Token-Usage response header"""
+        return f"calls={self.calls}; prompt={self.prompt_tokens}; completion={self.completion_tokens}; total={self.total_tokens}"
+
+
+class UsageLedger:
+    """Aggregates token usage per client, operation and LLM stage"""
+
+    def __init__(self, log_path: Optional[str] = None, client_quota: int = 0, quota_window: int = 3600,
+                 max_clients: int = 10000):
+        self.log_path = log_path
+        self.client_quota = client_quota
+        self.quota_window = quota_window
+        self.max_clients = max_clients
+        self.started = time.time()
+        self.total = Usage()
+        # Most recently active clients last; the least recent ones are folded into other_clients
+        self.by_client: "OrderedDict[str, Usage]" = OrderedDict()
+        self.other_clients = Usage()
+        self.by_operation: Dict[str, Usage] = defaultdict(Usage)
+        self.by_stage: Dict[str, Usage] = defaultdict(Usage)
+        # stage -> completions, how many were cut off at the output budget, the
+        # follow-ups sent to finish them and how many were still cut off after those
+        self.completions: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"completions": 0, "truncated": 0, "continuations": 0, "unrecovered": 0}
+        )
+        self._windows: Dict[str, list] = {}  # client -> [window_start, tokens]
+        self._lock = threading.Lock()
+        self._log_file = None
+
+    def record(self, client_id: str, operation: str, stage: str,
+               prompt_tokens: int, completion_tokens: int, total_tokens: int) -> None:
+        now = time.time()
+        with self._lock:
+            for bucket in (self.total, self._client_usage(client_id),
+                           self.by_operation[operation or "unknown"], self.by_stage[stage]):
+                bucket.add(prompt_tokens, completion_tokens, total_tokens)
+
+            window = self._windows.get(client_id)
+            if window is None or now - window[0] >= self.quota_window:
+                if window is None and len(self._windows) >= self.max_clients:
+                    self._expire_windows(now)
+                window = self._windows[client_id] = [now, 0]
+            window[1] += total_tokens
+
+            if self.log_path:
+                self._append_log({
+                    "ts": round(now, 3),
+                    "client": client_id,
+                    "operation": operation,
+                    "stage": stage,
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": total_tokens,
+                })
+
+    def _client_usage(self, client_id: str) -> Usage:
+        """The client's bucket, keeping at most max_clients of them (called with the lock held)"""
+        bucket = self.by_client.get(client_id)
+        if bucket is not None:
+            self.by_client.move_to_end(client_id)
+            return bucket
+        if len(self.by_client) >= self.max_clients:
+            _, evicted = self.by_client.popitem(last=False)
+            self.other_clients.add(evicted.prompt_tokens, evicted.completion_tokens,
+                                   evicted.total_tokens, evicted.calls)
+        bucket = self.by_client[client_id] = Usage()
+        return bucket
+
+    def _expire_windows(self, now: float) -> None:
+        """Drop quota windows that have run out (called with the lock held)"""
+        self._windows = {
+            client: window for client, window in self._windows.items()
+            if now - window[0] < self.quota_window
+        }
+
+    def record_completion(self, stage: str, continuations: int = 0, recovered: bool = True) -> None:
+        """Count a completion and, if it hit its output budget, the follow-ups sent to finish it"""
+        with self._lock:
+            counts = self.completions[stage]
+            counts["completions"] += 1
+            if continuations or not recovered:
+                counts["truncated"] += 1
+                counts["continuations"] += continuations
+                counts["unrecovered"] += 0 if recovered else 1
+
+    def _append_log(self, entry: Dict[str, Any]) -> None:
+        """Append one point to the JSONL time series (called with the lock held)"""
+        try:
+            if self._log_file is None:
+                os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+                self._log_file = open(self.log_path, "a", buffering=1, encoding="utf-8")
+            self._log_file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        except OSError as e:
+            print(f"⚠️ Could not write usage log: {e}")
+            self.log_path = None
+
+    def check_quota(self, client_id: str) -> None:
+        """Reject the request if the client used up its tokens for this window"""
+        if not self.client_quota:
+            return
+        with self._lock:
+            window = self._windows.get(client_id)
+            if window is None or time.time() - window[0] >= self.quota_window:
+                return
+            if window[1] >= self.client_quota:
+                retry_after = int(self.quota_window - (time.time() - window[0])) + 1
+                raise HTTPException(
+                    429,
+                    f"Token quota exceeded ({window[1]}/{self.client_quota} tokens this window)",
+                    headers={"Retry-After": str(retry_after)},
+                )
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "since": self.started,
+                "total": self.total.as_dict(),
+                "by_client": {key: value.as_dict() for key, value in self.by_client.items()},
+                "other_clients": self.other_clients.as_dict(),
+                "by_operation": {key: value.as_dict() for key, value in self.by_operation.items()},
+                "by_stage": {key: value.as_dict() for key, value in self.by_stage.items()},
+                "truncation": {
+                    key: dict(value, rate=round(value["truncated"] / value["completions"], 4))
+                    for key, value in self.completions.items()
+                },
+                "quota": {"tokens": self.client_quota, "window_seconds": self.quota_window},
+            }
+
+
+ledger = UsageLedger(
+    log_path=os.getenv("USAGE_LOG_PATH"),
+    client_quota=int(os.getenv("CLIENT_TOKEN_QUOTA", 0)),
+    quota_window=int(os.getenv("QUOTA_WINDOW_SECONDS", 3600)),
+    max_clients=int(os.getenv("USAGE_MAX_CLIENTS", 10000)),
+)
+
+
+def _key_hash(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+# Keys the server issued (comma-separated API_KEYS); only these identify a client
+API_KEY_HASHES = {_key_hash(key.strip()) for key in os.getenv("API_KEYS", "").split(",") if key.strip()}
+
+
+def client_id(request: Request) -> str:
+    """Identify the caller by (hashed) API key if it is one of API_KEYS, else by client address
+
+    An unknown key is ignored, so making up keys does not get a fresh quota.
+    """
+    api_key = request.headers.get("x-api-key")
+    if api_key:
+        digest = _key_hash(api_key)
+        if digest in API_KEY_HASHES:
+            return "key:" + digest[:12]
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+
+def record(stage: str, completion_usage) -> None:
+    """Record the usage block of one completion against the current request"""
+    if completion_usage is None:
+        return
+    prompt_tokens = getattr(completion_usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(completion_usage, "completion_tokens", 0) or 0
+    total_tokens = getattr(completion_usage, "total_tokens", 0) or prompt_tokens + completion_tokens
+
+    ctx = context.current()
+    if ctx is not None:
+        ctx.usage.add(prompt_tokens, completion_tokens, total_tokens)
+        ledger.record(ctx.client_id, ctx.operation, stage, prompt_tokens, completion_tokens, total_tokens)
+    else:
+        ledger.record("internal", None, stage, prompt_tokens, completion_tokens, total_tokens)
@@ -0,0 +1,197 @@
+import ast
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import sandbox
+from cache import LRUCache, content_key
+
+# Languages the sandbox can execute
+RUNNABLE_LANGUAGES = {"python", "javascript"}
+
+RESULT_MARKER = "__SYNTAX_SHIFT_RESULT__"
+
+# Argument values tried when generating calls for functions in the source
+SAMPLE_ARGUMENTS = [3, 0, -2, [3, 1, 2], [], "abc"]
+
+
+def _camel_case(name: str) -> str:
+    head, *rest = name.split("_")
+    return head + "".join(part[:1].upper() + part[1:] for part in rest)
+
+
+def _normalize_output(text: str) -> str:
+    """Make printed output comparable across languages (True/true, quotes, spacing, 1.0/1)"""
+    text = re.sub(r"\bTrue\b", "true", text)
+    text = re.sub(r"\bFalse\b", "false", text)
+    text = re.sub(r"\bNone\b", "null", text)
+    text = re.sub(r"(\d)\.0\b", r"\1", text)
+    return re.sub(r"[\s'\"]+", "", text)
+
+
+def _python_functions(code: str) -> List[Dict[str, Any]]:
+    """Top-level functions with plain positional parameters"""
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, RecursionError, MemoryError):
+        return []
+    functions = []
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and not node.args.vararg and not node.args.kwonlyargs:
+            required = len(node.args.args) - len(node.args.defaults)
+            if 1 <= required <= 3:
+                functions.append({"name": node.name, "arity": required})
+    return functions
+
+
+def _call_cases(functions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    cases = []
+    for function in functions:
+        for value in SAMPLE_ARGUMENTS:
+            cases.append({"function": function["name"], "args": [value] * function["arity"]})
+    return cases
+
+
+def _python_call_harness(code: str, cases: List[Dict[str, Any]]) -> str:
+    return code + f"""
+
+import json as __json
+for __i, __case in enumerate(__json.loads({json.dumps(json.dumps(cases))})):
+    try:
+        __value = globals()[__case["function"]](*__case["args"])
+        print("{RESULT_MARKER}" + __json.dumps({{"i": __i, "ok": True, "value": __value}}))
+    except Exception as __error:
+        print("{RESULT_MARKER}" + __json.dumps({{"i": __i, "ok": False, "error": type(__error).__name__}}))
+"""
+
+
+def _javascript_call_harness(code: str, cases: List[Dict[str, Any]]) -> str:
+    lookups = []
+    for name in sorted({case["function"] for case in cases}):
+        camel = _camel_case(name)
+        lookups.append(
+            f'"{name}": (typeof {name} === "function" ? {name} : '
+            f'(typeof {camel} === "function" ? {camel} : undefined))'
+        )
+    return code + f"""
+;(() => {{
+    const __functions = {{{", ".join(lookups)}}};
+    const __cases = {json.dumps(cases)};
+    __cases.forEach((__case, __i) => {{
+        try {{
+            const __value = __functions[__case.function](...__case.args);
+            console.log("{RESULT_MARKER}" + JSON.stringify({{i: __i, ok: true, value: __value === undefined ? null : __value}}));
+        }} catch (__error) {{
+            console.log("{RESULT_MARKER}" + JSON.stringify({{i: __i, ok: false, error: String(__error && __error.name)}}));
+        }}
+    }});
+}})();
+"""
+
+
+def _parse_results(stdout: str) -> Dict[int, Dict[str, Any]]:
+    results = {}
+    for line in stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            try:
+                entry = json.loads(line[len(RESULT_MARKER):])
+                results[entry["i"]] = entry
+            except (ValueError, KeyError):
+                continue
+    return results
+
+
+class ConversionVerifier:
+    """Runs source and converted code side by side and compares their behavior"""
+
+    def __init__(self, max_workers: int = None):
+        # Each run is its own subprocess; threads only wait on them
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers or int(os.getenv("VERIFY_WORKERS", 4)),
+            thread_name_prefix="syntax-shift-verify",
+        )
+        self._cache = LRUCache(maxsize=256)
+
+    def can_verify(self, source_lang: str, target_lang: str) -> bool:
+        languages = {source_lang.lower(), target_lang.lower()}
+        return languages <= RUNNABLE_LANGUAGES and all(sandbox.available(lang) for lang in languages)
+
+    def verify(self, source_code: str, source_lang: str, converted_code: str, target_lang: str,
+               inputs: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Compare outputs of the source and converted programs on stdin inputs and generated calls"""
+        source_lang, target_lang = source_lang.lower(), target_lang.lower()
+        if not sandbox.execution_enabled():
+            return {"status": "disabled", "message": "Set ENABLE_CODE_EXECUTION=true on the server"}
+        if not self.can_verify(source_lang, target_lang):
+            return {"status": "unsupported", "message": f"Cannot run {source_lang} -> {target_lang} locally"}
+
+        inputs = inputs or [""]
+        key = content_key("verify", source_lang, source_code, target_lang, converted_code, json.dumps(inputs))
+        cached = self._cache.get(key)
+        if cached is not None:
+            return dict(cached, cached=True)
+
+        result = self._run_cases(source_code, source_lang, converted_code, target_lang, inputs)
+        self._cache.set(key, result)
+        return dict(result, cached=False)
+
+    def _run_cases(self, source_code: str, source_lang: str, converted_code: str, target_lang: str,
+                   inputs: List[str]) -> Dict[str, Any]:
+        # 1. Script runs on each stdin input, source and converted in parallel
+        script_runs = [
+            (self._pool.submit(sandbox.run, source_code, source_lang, stdin),
+             self._pool.submit(sandbox.run, converted_code, target_lang, stdin))
+            for stdin in inputs
+        ]
+
+        # 2. Generated function calls (Python source converted to JavaScript)
+        calls = []
+        if source_lang == "python" and target_lang == "javascript":
+            calls = _call_cases(_python_functions(source_code))
+        call_runs = None
+        if calls:
+            call_runs = (
+                self._pool.submit(sandbox.run, _python_call_harness(source_code, calls), "python"),
+                self._pool.submit(sandbox.run, _javascript_call_harness(converted_code, calls), "javascript"),
+            )
+
+        cases = []
+        for stdin, (expected_future, actual_future) in zip(inputs, script_runs):
+            expected, actual = expected_future.result(), actual_future.result()
+            if not expected.ok:
+                cases.append({"kind": "stdin", "input": stdin, "match": None,
+                              "note": "Original program failed on this input"})
+                continue
+            cases.append({
+                "kind": "stdin",
+                "input": stdin,
+                "expected": expected.stdout,
+                "actual": actual.stdout if actual.ok else actual.stderr[-500:],
+                "match": actual.ok and _normalize_output(expected.stdout) == _normalize_output(actual.stdout),
+            })
+
+        if call_runs is not None:
+            expected_results = _parse_results(call_runs[0].result().stdout)
+            actual_results = _parse_results(call_runs[1].result().stdout)
+            for i, call in enumerate(calls):
+                expected = expected_results.get(i)
+                if not expected or not expected["ok"]:
+                    continue  # The original rejects these arguments, so they say nothing about the conversion
+                actual = actual_results.get(i) or {"ok": False, "error": "no result"}
+                cases.append({
+                    "kind": "call",
+                    "input": f"{call['function']}{tuple(call['args'])}",
+                    "expected": expected["value"],
+                    "actual": actual.get("value") if actual["ok"] else actual.get("error"),
+                    "match": actual["ok"] and actual.get("value") == expected["value"],
+                })
+
+        checked = [case for case in cases if case["match"] is not None]
+        failed = sum(1 for case in checked if not case["match"])
+        if not checked:
+            status = "inconclusive"
+        else:
+            status = "failed" if failed else "passed"
+        return {"status": status, "passed": len(checked) - failed, "failed": failed, "cases": cases}
@@ -0,0 +1,15 @@
+import java.util.List;
+
+public class Stats {
+    public static double mean(List<Integer> values) {
+        int sum = 0;
+        for (int i = 0; i < values.size(); i++) {
+            sum += values.get(i);
+        }
+        return (double) sum / values.size();
+    }
+
+    public static void main(String[] args) {
+        System.out.println(mean(List.of(3, 5, 8, 13)));
+    }
+}
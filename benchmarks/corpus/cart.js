@@ -0,0 +1,12 @@
+function cartTotal(items) {
+    var total = 0;
+    for (let i = 0; i < items.length; i++) {
+        if (items[i].quantity == 0) {
+            continue;
+        }
+        total = total + items[i].price * items[i].quantity;
+    }
+    return total;
+}
+
+console.log(cartTotal([{ price: 2.5, quantity: 4 }, { price: 10, quantity: 0 }]));
@@ -0,0 +1,27 @@
+student1_name = "Alice"
+student1_scores = [85, 92, 78, 96, 88]
+student1_total = 0
+for score in student1_scores:
+    student1_total += score
+student1_average = student1_total / len(student1_scores)
+if student1_average >= 90:
+    student1_grade = "A"
+elif student1_average >= 80:
+    student1_grade = "B"
+else:
+    student1_grade = "C"
+print(f"{student1_name}: {student1_average:.1f} ({student1_grade})")
+
+student2_name = "Bob"
+student2_scores = [76, 84, 92, 88, 79]
+student2_total = 0
+for score in student2_scores:
+    student2_total += score
+student2_average = student2_total / len(student2_scores)
+if student2_average >= 90:
+    student2_grade = "A"
+elif student2_average >= 80:
+    student2_grade = "B"
+else:
+    student2_grade = "C"
+print(f"{student2_name}: {student2_average:.1f} ({student2_grade})")
@@ -0,0 +1,9 @@
+numbers = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+result = []
+
+for i in range(len(numbers)):
+    for j in range(len(numbers)):
+        if i != j and numbers[i] + numbers[j] == 10:
+            result.append((numbers[i], numbers[j]))
+
+print(result)
@@ -0,0 +1,21 @@
+def calculate_area_circle(radius):
+    pi = 3.14159
+    area = pi * radius * radius
+    return area
+
+def calculate_area_rectangle(length, width):
+    area = length * width
+    return area
+
+def calculate_area_triangle(base, height):
+    area = 0.5 * base * height
+    return area
+
+circle_area = calculate_area_circle(5)
+print(f"Circle area: {circle_area}")
+
+rectangle_area = calculate_area_rectangle(10, 8)
+print(f"Rectangle area: {rectangle_area}")
+
+triangle_area = calculate_area_triangle(6, 4)
+print(f"Triangle area: {triangle_area}")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+A/B benchmark: fused single-call prompts against the multi-call pipeline
+
+Runs optimize and transform on a set of Python snippets through both
+pipelines, using whichever LLM backend the environment configures
+(GROQ_API_KEY, or LLM_BACKEND=local with LOCAL_LLM_URL). Reports per
+pipeline:
+- latency, LLM calls and prompt/completion tokens;
+- quality proxies: whether the rewritten code still parses, how many
+  change explanations came back, and, with ENABLE_CODE_EXECUTION=true,
+  whether the rewrite prints the same output as the original.
+
+Usage: python benchmarks/fused_bench.py [rounds]   (default 2)
+"""
+
+import ast
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Reusing results across rounds or pipelines would hide the difference being measured
+os.environ["SIMILAR_INDEX_SIZE"] = "0"
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import components  # noqa: E402
+import context  # noqa: E402
+import main as api  # noqa: E402
+import sandbox  # noqa: E402
+
+SNIPPETS = {
+    "loops": """
+numbers = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+result = []
+for i in range(len(numbers)):
+    for j in range(len(numbers)):
+        if i != j and numbers[i] + numbers[j] == 10:
+            result.append((numbers[i], numbers[j]))
+print(result)
+""",
+    "repeated": """
+def area_circle(radius):
+    pi = 3.14159
+    area = pi * radius * radius
+    return area
+
+def area_rectangle(length, width):
+    area = length * width
+    return area
+
+def area_triangle(base, height):
+    area = 0.5 * base * height
+    return area
+
+print(area_circle(5), area_rectangle(10, 8), area_triangle(6, 4))
+""",
+    "lists": """
+data = list(range(20))
+squares = []
+for i in range(len(data)):
+    squares.append(data[i] * data[i])
+evens = []
+for num in data:
+    if num % 2 == 0:
+        evens.append(num)
+total = 0
+for num in data:
+    total = total + num
+print(squares, evens, total)
+""",
+}
+
+
+def parses(code: str) -> bool:
+    try:
+        ast.parse(code)
+        return True
+    except SyntaxError:
+        return False
+
+
+def same_output(original: str, rewritten: str):
+    if not sandbox.execution_enabled():
+        return None
+    check = components.verifier().verify(original, "python", rewritten, "python")
+    return check.get("status") == "passed"
+
+
+def run_once(operation: str, pipeline: str, code: str) -> dict:
+    request = api.CodeRequest(code=code, operation=operation, source_language="python", pipeline=pipeline)
+    ctx = context.RequestContext("benchmark", operation)
+    start = time.perf_counter()
+    with context.activate(ctx):
+        result = api._process(request)
+    return {
+        "seconds": time.perf_counter() - start,
+        "usage": ctx.usage.as_dict(),
+        "parses": parses(result["transformed_code"]),
+        "explanations": len(result["explanations"]),
+        "same_output": same_output(code, result["transformed_code"]),
+    }
+
+
+def report(operation: str, pipeline: str, runs: list) -> None:
+    seconds = [r["seconds"] for r in runs]
+    line = (
+        f"  {operation:<9} {pipeline:<6}"
+        f" latency median {statistics.median(seconds):6.2f}s"
+        f"  calls {statistics.mean(r['usage']['calls'] for r in runs):4.1f}"
+        f"  prompt {statistics.mean(r['usage']['prompt_tokens'] for r in runs):7.0f}"
+        f"  completion {statistics.mean(r['usage']['completion_tokens'] for r in runs):6.0f}"
+        f"  parses {sum(r['parses'] for r in runs)}/{len(runs)}"
+        f"  explanations {statistics.mean(r['explanations'] for r in runs):4.1f}"
+    )
+    checked = [r["same_output"] for r in runs if r["same_output"] is not None]
+    if checked:
+        line += f"  same output {sum(checked)}/{len(checked)}"
+    print(line)
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    components.explainer()  # build outside the timed region
+    print(f"{len(SNIPPETS)} snippets x {rounds} rounds per pipeline")
+    for operation in ("optimize", "transform"):
+        runs = {"multi": [], "fused": []}
+        for round_number in range(rounds):
+            for code in SNIPPETS.values():
+                # A marker per operation and round keeps the explanation memo out of the comparison
+                code = f"# {operation} round {round_number}\n{code.strip()}\n"
+                # Interleave the pipelines so provider-side drift affects both alike
+                for pipeline in runs:
+                    runs[pipeline].append(run_once(operation, pipeline, code))
+        for pipeline, results in runs.items():
+            report(operation, pipeline, results)
+
+
+if __name__ == "__main__":
+    main()
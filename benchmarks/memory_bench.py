@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Peak memory benchmark for large submissions
+
+Measures tracemalloc peaks (on top of the input itself) for line access,
+chunk planning and the duplicate-line scan, comparing the previous
+list-of-lines approach with the offset views in source.py.
+
+Usage: python benchmarks/memory_bench.py [megabytes ...]   (default 1 10)
+"""
+
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import limits  # noqa: E402
+import source  # noqa: E402
+from transformer import CodeTransformer  # noqa: E402
+
+
+def make_input(megabytes: float) -> str:
+    block = (
+        "function handler_{i}(items) {{\n"
+        "    for (let j = 0; j < items.length; j++) {{\n"
+        "        console.log(items[j] * {i});\n"
+        "    }}\n"
+        "}}\n"
+    )
+    parts, size, i = [], 0, 0
+    while size < megabytes * 1024 * 1024:
+        parts.append(block.format(i=i))
+        size += len(parts[-1])
+        i += 1
+    return "".join(parts)
+
+
+# Previous implementations, kept here as the baseline
+
+def legacy_chunks(code, max_tokens):
+    lines = code.split("\n")
+    boundaries = [
+        i for i in range(1, len(lines))
+        if lines[i][:1] not in ("", " ", "\t", "}") and (not lines[i - 1].strip() or lines[i - 1].strip().endswith("}"))
+    ]
+    starts = sorted(set([0] + boundaries))
+    segments = [lines[start:end] for start, end in zip(starts, starts[1:] + [len(lines)])]
+    chunks, current, current_chars = [], [], 0
+    for segment in segments:
+        segment_chars = sum(len(line) + 1 for line in segment)
+        if current and (current_chars + segment_chars) / 4 > max_tokens:
+            chunks.append("\n".join(current))
+            current, current_chars = [], 0
+        current.extend(segment)
+        current_chars += segment_chars
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def legacy_duplicates(code):
+    seen = {}
+    for i, line in enumerate(code.split("\n")):
+        clean = line.strip()
+        if len(clean) > 10 and clean not in seen:
+            seen[clean] = i
+    return seen
+
+
+def peak(fn):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    result = fn()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak_bytes
+
+
+def main():
+    sizes = [float(arg) for arg in sys.argv[1:]] or [1, 10]
+    transformer = CodeTransformer()
+
+    for megabytes in sizes:
+        code = make_input(megabytes)
+        budget = limits.OPERATION_CHUNK_TOKENS["optimize"]
+        # "text" has no parser, so both sides use the generic blank-line/brace boundaries
+        cases = [
+            ("line index",
+             lambda: code.split("\n"),
+             lambda: source.SourceText(code)),
+            ("chunk planning",
+             lambda: legacy_chunks(code, budget),
+             lambda: limits.chunk_spans(code, "text", budget)),
+            ("duplicate-line scan",
+             lambda: legacy_duplicates(code),
+             lambda: transformer._remove_duplicates(code, [])),
+        ]
+        input_bytes = sys.getsizeof(code)
+        print(f"Input: {len(code):,} characters ({input_bytes / 2 ** 20:.1f} MiB)")
+        for name, legacy, current in cases:
+            legacy_peak, current_peak = peak(legacy), peak(current)
+            print(f"  {name:<20} legacy {legacy_peak / 2 ** 20:8.2f} MiB ({legacy_peak / input_bytes:4.1f}x input)   "
+                  f"views {current_peak / 2 ** 20:8.2f} MiB ({current_peak / input_bytes:4.1f}x input)")
+
+
+if __name__ == "__main__":
+    main()
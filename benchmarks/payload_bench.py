@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Payload size benchmark for /api/transform responses
+
+Compares the default response against include_original=false, the diff
+format and gzip/brotli compression for a large input with a few edits.
+
+Usage: python benchmarks/payload_bench.py [lines]
+"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import payload  # noqa: E402
+
+
+def make_input(lines: int):
+    """A large module and a lightly edited copy of it"""
+    original = "\n".join(
+        f"def handler_{i}(items):\n    for i in range(len(items)):\n        print(items[i])\n"
+        for i in range(lines // 4)
+    )
+    modified = original.replace("def handler_1(", "def handle_first(", 1)
+    modified = modified.replace("print(items[i])", "print(item)", 25)
+    return original, modified
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    original, modified = make_input(lines)
+    response = {
+        "original_code": original,
+        "transformed_code": modified,
+        "explanations": ["🔄 Renamed handler_1 to handle_first"] * 5,
+        "suggestions": ["Replaced range(len()) with enumerate for better performance"],
+        "success": True,
+        "error_message": None,
+    }
+
+    variants = {
+        "default": payload.shape(dict(response), original),
+        "include_original=false": payload.shape(dict(response), original, include_original=False),
+        "diff": payload.shape(dict(response), original, include_original=False, code_format="diff"),
+    }
+
+    print(f"Input: {lines} lines, {len(original.encode()):,} bytes")
+    baseline = None
+    for name, data in variants.items():
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        for encoding in ("identity", "gzip", "br"):
+            compressed, used = payload.compress(body, encoding)
+            if encoding != "identity" and used != encoding:
+                continue
+            size = len(compressed)
+            baseline = baseline or size
+            print(f"  {name:<24} {encoding:<8} {size:>10,} bytes  ({baseline / size:6.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Time-to-first-token benchmark for the prompt layout
+
+Sends the same operation for a series of different snippets to a local
+OpenAI-compatible server (llama.cpp, vLLM, ...) twice: once with the code in
+the middle of a single user message (the old layout) and once with the
+templates from prompts.py (stable system prefix, code last). With the new
+layout the server can reuse the cached prefix, so only the code needs
+prompt processing.
+
+Start a server first, for example:
+    llama-server -m model.gguf --port 8080
+
+Usage: python benchmarks/prefix_cache_bench.py [base_url] [template] [requests]
+       (defaults: http://localhost:8080/v1 explain_code 12)
+"""
+
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import prompts  # noqa: E402
+
+
+def make_snippet(i: int) -> str:
+    return (
+        f"def process_{i}(items):\n"
+        f"    total = 0\n"
+        f"    for item in items:\n"
+        f"        if item % {i + 2} == 0:\n"
+        f"            total += item * {i}\n"
+        f"    return total\n"
+    )
+
+
+def legacy_messages(template: prompts.PromptTemplate, code: str):
+    """The previous layout: variable input first, instructions after it, one user message"""
+    user = template.user.format(language="python", code=code, source_lang="python", target_lang="javascript")
+    return [{"role": "user", "content": f"{user}\n\n{template.system}"}]
+
+
+def time_to_first_token(client: httpx.Client, base_url: str, messages) -> dict:
+    body = {
+        "messages": messages,
+        "max_tokens": 16,
+        "temperature": 0,
+        "stream": True,
+        "cache_prompt": True,  # llama.cpp; ignored by other servers
+    }
+    start = time.perf_counter()
+    first = None
+    timings = {}
+    with client.stream("POST", f"{base_url}/chat/completions", json=body) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line.startswith("data: ") or line == "data: [DONE]":
+                continue
+            chunk = json.loads(line[6:])
+            timings = chunk.get("timings", timings)
+            choices = chunk.get("choices") or [{}]
+            if first is None and choices[0].get("delta", {}).get("content"):
+                first = time.perf_counter() - start
+    return {"ttft": first if first is not None else time.perf_counter() - start, "timings": timings}
+
+
+def run(client, base_url, template, layout, count):
+    results = []
+    for i in range(count):
+        code = make_snippet(i)
+        if layout == "legacy":
+            messages = legacy_messages(template, code)
+        else:
+            messages = template.render(language="python", code=code, source_lang="python", target_lang="javascript")
+        results.append(time_to_first_token(client, base_url, messages))
+    # The first request of each layout is cold; the rest show the steady state
+    warm = results[1:] or results
+    ttft = [r["ttft"] * 1000 for r in warm]
+    processed = [r["timings"].get("prompt_n") for r in warm if r["timings"].get("prompt_n") is not None]
+    cached = [r["timings"].get("cache_n") for r in warm if r["timings"].get("cache_n") is not None]
+    line = f"  {layout:<8} TTFT median {statistics.median(ttft):7.1f} ms   p90 {sorted(ttft)[int(len(ttft) * 0.9) - 1]:7.1f} ms"
+    if processed:
+        line += f"   prompt tokens processed {statistics.mean(processed):6.1f}"
+    if cached:
+        line += f"   from cache {statistics.mean(cached):6.1f}"
+    print(line)
+
+
+def main():
+    base_url = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8080/v1"
+    template = prompts.get(sys.argv[2] if len(sys.argv) > 2 else "explain_code")
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 12
+
+    print(f"{template.id} against {base_url}, {count} requests per layout")
+    with httpx.Client(timeout=120) as client:
+        for layout in ("legacy", "prefix"):
+            run(client, base_url, template, layout, count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Wall time of project conversion against the depth of the import graph
+
+Generates a package of `depth` layers with `width` modules each, where
+every module imports two modules of the layer below, and converts it to
+JavaScript with whichever LLM backend the environment configures
+(GROQ_API_KEY, or LLM_BACKEND=local with LOCAL_LLM_URL; a recording made
+with LLM_TRAFFIC_MODE=record replays offline). Reports the wall time, the
+summed per-module time a file-by-file conversion would take, and the time
+per level.
+
+Usage: python benchmarks/project_bench.py [depth] [width]   (defaults: 3 4)
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import context  # noqa: E402
+import project  # noqa: E402
+
+
+def make_files(depth: int, width: int):
+    files = []
+    for layer in range(depth):
+        for i in range(width):
+            lines = []
+            if layer:
+                for j in (i, (i + 1) % width):
+                    lines.append(f"from pkg.layer{layer - 1}_{j} import compute_{layer - 1}_{j}")
+            lines += [
+                "",
+                f"def compute_{layer}_{i}(values):",
+                "    total = 0",
+                "    for v in values:",
+                "        total += v * " + str(i + 1),
+            ]
+            if layer:
+                lines.append(f"    return total + compute_{layer - 1}_{i}(values) + compute_{layer - 1}_{(i + 1) % width}(values)")
+            else:
+                lines.append("    return total")
+            files.append((f"pkg/layer{layer}_{i}.py", "\n".join(lines) + "\n"))
+    return files
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    plan = project.Project(make_files(depth, width))
+
+    ctx = context.RequestContext("benchmark", "convert_project")
+    per_level = {}
+    start = time.perf_counter()
+    with context.activate(ctx):
+        for event in project.convert_project(plan, "javascript"):
+            if event["type"] == "module":
+                per_level.setdefault(event["level"], []).append(event["seconds"])
+            elif event["type"] == "done":
+                failed = event["failed"]
+    wall = time.perf_counter() - start
+
+    sequential = sum(sum(seconds) for seconds in per_level.values())
+    print(f"{depth * width} modules in {len(plan.levels)} levels, {project.PROJECT_WORKERS} workers, {failed} failed")
+    for level, seconds in sorted(per_level.items()):
+        print(f"  level {level}: {len(seconds)} modules, slowest {max(seconds):6.2f}s")
+    print(f"  wall {wall:6.2f}s   file by file {sequential:6.2f}s   ({sequential / wall:4.1f}x)")
+    print(f"  usage {ctx.usage.as_dict()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark of /api/transform with recorded LLM traffic
+
+1. Record once, with network access and a configured backend. Every
+   completion is written to LLM_TRAFFIC_PATH
+   (default recordings/llm_traffic.jsonl.gz):
+       python benchmarks/replay_bench.py record
+2. Replay as often as needed, offline and deterministically:
+       python benchmarks/replay_bench.py replay
+   LLM_REPLAY_SPEED=1 keeps the recorded latency (the default),
+   10 replays 10x faster, and 0 removes it to measure the server alone.
+
+Each file in the corpus directory is sent through the operations that
+apply to its language, `concurrency` requests at a time. The report
+shows latency percentiles per operation, throughput, replay misses, and
+a digest of all responses; the digest is identical across replays of
+the same recording.
+
+Usage: python benchmarks/replay_bench.py record|replay [corpus_dir] [concurrency]
+       (defaults: benchmarks/corpus 4)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+if len(sys.argv) < 2 or sys.argv[1] not in ("record", "replay"):
+    sys.exit(__doc__)
+# The traffic mode is read when llm.py is imported
+os.environ["LLM_TRAFFIC_MODE"] = sys.argv[1]
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import httpx  # noqa: E402
+
+import llm  # noqa: E402
+import main as api  # noqa: E402
+
+LANGUAGES = {".py": "python", ".js": "javascript", ".java": "java", ".cpp": "cpp"}
+
+OPERATIONS = {
+    "python": [("optimize", None), ("transform", None), ("explain", None), ("convert", "javascript")],
+    "javascript": [("optimize", None), ("explain", None), ("convert", "python")],
+    "java": [("optimize", None), ("explain", None)],
+    "cpp": [("optimize", None), ("explain", None)],
+}
+
+
+def load_corpus(directory: Path):
+    """(name, language, code) for every snippet in the corpus, in a stable order"""
+    snippets = []
+    for path in sorted(directory.iterdir()):
+        language = LANGUAGES.get(path.suffix)
+        if language:
+            snippets.append((path.name, language, path.read_text(encoding="utf-8")))
+    return snippets
+
+
+async def run_request(client, limit, name, language, code, operation, target):
+    body = {"code": code, "source_language": language, "operation": operation}
+    if target:
+        body["target_language"] = target
+    async with limit:
+        start = time.perf_counter()
+        response = await client.post("/api/transform", json=body)
+        seconds = time.perf_counter() - start
+    data = response.json()
+    return {"name": name, "operation": operation, "seconds": seconds, "status": response.status_code, "data": data}
+
+
+async def run(snippets, concurrency):
+    limit = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        jobs = [
+            run_request(client, limit, name, language, code, operation, target)
+            for name, language, code in snippets
+            for operation, target in OPERATIONS[language]
+        ]
+        start = time.perf_counter()
+        results = await asyncio.gather(*jobs)
+        return results, time.perf_counter() - start
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    mode = sys.argv[1]
+    corpus = Path(sys.argv[2]) if len(sys.argv) > 2 else Path(__file__).resolve().parent / "corpus"
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    snippets = load_corpus(corpus)
+    if not snippets:
+        sys.exit(f"No snippets found in {corpus}")
+
+    results, wall = asyncio.run(run(snippets, concurrency))
+
+    print(f"{mode}: {len(results)} requests over {len(snippets)} snippets, concurrency {concurrency}")
+    for operation in sorted({r["operation"] for r in results}):
+        ms = [r["seconds"] * 1000 for r in results if r["operation"] == operation]
+        print(f"  {operation:<10} n={len(ms):<3} p50 {statistics.median(ms):8.1f} ms   p95 {percentile(ms, 0.95):8.1f} ms")
+    failed = sum(1 for r in results if r["status"] != 200 or not r["data"].get("success"))
+    print(f"  throughput {len(results) / wall:.2f} req/s, {failed} failed")
+    print(f"  traffic {llm.traffic_store.stats()}")
+
+    # Usage and timing fields vary between runs; the content must not
+    digest = hashlib.sha256()
+    for r in sorted(results, key=lambda r: (r["name"], r["operation"])):
+        content = {key: r["data"].get(key) for key in ("transformed_code", "explanations", "suggestions")}
+        digest.update(json.dumps(content, sort_keys=True).encode("utf-8"))
+    print(f"  response digest {digest.hexdigest()[:16]}")
+
+    llm.traffic_store.close()
+
+
+if __name__ == "__main__":
+    main()
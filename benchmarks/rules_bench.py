@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the line-based rule passes
+
+Times the Python optimize rewrites (range(len()) -> enumerate, append loops
+-> comprehensions) on generated inputs against the previous line-by-line
+implementation (inline regexes, split/join per pass), and checks that both
+produce the same code and suggestions.
+
+Usage: python benchmarks/rules_bench.py [lines ...]   (default 10000 100000 1000000)
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from transformer import CodeTransformer  # noqa: E402
+
+
+def make_python(lines: int) -> str:
+    block = [
+        "def handler(items):",
+        "    result = []",
+        "    for i in range(len(items)):",
+        "        print(items[i])",
+        "    for x in items:",
+        "        result.append(x * 2)",
+        "    return result",
+        "",
+    ]
+    return "\n".join(block[i % len(block)] for i in range(lines))
+
+
+# Previous implementation, kept here as the baseline
+
+def legacy_optimize(code, suggestions):
+    if "range(len(" in code:
+        code = re.sub(r'for\s+(\w+)\s+in\s+range\(len\((\w+)\)\):', r'for \1, item in enumerate(\2):', code)
+        suggestions.append("Replaced range(len()) with enumerate for better performance")
+    lines = code.split('\n')
+    new_lines = []
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        if (line.startswith('for ') and i + 1 < len(lines) and
+                'append(' in lines[i + 1] and lines[i + 1].strip().count(' ') <= 8):
+            for_match = re.match(r'for\s+(\w+)\s+in\s+(.+):', line)
+            if for_match:
+                next_line = lines[i + 1].strip()
+                append_match = re.match(r'(\w+)\.append\((.+)\)', next_line)
+                if append_match:
+                    new_lines.append(f"{append_match.group(1)} = [{append_match.group(2)} for {for_match.group(1)} in {for_match.group(2)}]")
+                    suggestions.append("Converted loop to list comprehension for better performance")
+                    i += 2
+                    continue
+        new_lines.append(lines[i])
+        i += 1
+    return '\n'.join(new_lines)
+
+
+def best_of(fn, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    transformer = CodeTransformer()
+
+    for lines in sizes:
+        code = make_python(lines)
+        repeat = 5 if lines < 1_000_000 else 2
+        legacy_suggestions, suggestions = [], []
+        legacy_time, expected = best_of(lambda: legacy_optimize(code, legacy_suggestions), repeat)
+        current_time, actual = best_of(lambda: transformer._rewrite_loops(code, suggestions), repeat)
+        same = actual == expected and suggestions == legacy_suggestions
+        print(f"{lines:>10,} lines   legacy {legacy_time * 1000:8.1f} ms   compiled rules {current_time * 1000:8.1f} ms   "
+              f"({legacy_time / current_time:4.2f}x, {'same output' if same else 'OUTPUT DIFFERS'})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Serialization microbenchmark for /api/transform responses
+
+Times turning a large operation result into response bytes:
+- "pydantic + json": the previous path, CodeResponse(**result).model_dump()
+  then json.dumps;
+- "fastapi encoder": FastAPI's default, jsonable_encoder on the model;
+- "direct + json" and "direct + orjson": the current path, which fills in
+  defaults without validation;
+- "direct + msgpack": what clients get with Accept: application/msgpack.
+
+orjson and msgpack rows are skipped when the package is not installed.
+
+Usage: python benchmarks/serialization_bench.py [lines] [repeat]   (defaults: 20000 20)
+"""
+
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+import main as api  # noqa: E402
+import payload  # noqa: E402
+
+
+def make_result(lines: int) -> dict:
+    """A large optimize result with explanations, as _process returns it"""
+    code = "\n".join(
+        f"def handler_{i}(items):\n    for i in range(len(items)):\n        print(items[i], 'é')\n"
+        for i in range(lines // 4)
+    )
+    return {
+        "original_code": code,
+        "transformed_code": code.replace("range(len(items))", "enumerate(items)"),
+        "explanations": [f"🔄 Handler {i} now iterates with enumerate()" for i in range(200)],
+        "suggestions": ["Replaced range(len()) with enumerate for better performance"] * 20,
+        "success": True,
+        "usage": {"calls": 2, "prompt_tokens": 12000, "completion_tokens": 9000, "total_tokens": 21000},
+    }
+
+
+def stdlib_json(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    result = make_result(lines)
+
+    variants = {
+        "pydantic + json": lambda: stdlib_json(api.CodeResponse(**result).model_dump()),
+        "fastapi encoder": lambda: stdlib_json(jsonable_encoder(api.CodeResponse(**result))),
+        "direct + json": lambda: stdlib_json({**api.RESPONSE_DEFAULTS, **result}),
+    }
+    if payload.orjson is not None:
+        variants["direct + orjson"] = lambda: payload.orjson.dumps({**api.RESPONSE_DEFAULTS, **result})
+    if payload.msgpack is not None:
+        variants["direct + msgpack"] = lambda: payload.msgpack.packb({**api.RESPONSE_DEFAULTS, **result}, use_bin_type=True)
+
+    print(f"Result with {lines} lines of code, best of {repeat}")
+    baseline = None
+    for name, fn in variants.items():
+        seconds = min(timeit.repeat(fn, number=1, repeat=repeat))
+        size = len(fn())
+        baseline = baseline or seconds
+        print(f"  {name:<18} {seconds * 1000:8.2f} ms  {size:>10,} bytes  ({baseline / seconds:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Memory and lookup latency of the near-duplicate snippet index
+
+Fills a SnippetIndex with `entries` generated Python functions (each one
+a random mix of loops, conditions and arithmetic over random names), then
+times lookups for three kinds of query:
+- renamed: a stored snippet with every identifier renamed and a comment
+  added, found through the exact normalized key;
+- edited: a stored snippet with one statement added, found through LSH;
+- unseen: a snippet that was never stored.
+
+Memory is the growth of the process's peak resident size while the index
+is built (Linux reports it in KiB), including the stored input code;
+every entry shares one small result so the figure is the index's own cost.
+
+Usage: python benchmarks/similarity_bench.py [entries] [queries]   (defaults: 1000000 2000)
+"""
+
+import random
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import similarity  # noqa: E402
+
+NAMESPACE = "benchmark|optimize|python|"
+WORDS = ["total", "items", "value", "count", "data", "result", "index", "score", "price", "name",
+         "row", "col", "acc", "limit", "step", "left", "right", "node", "key", "size"]
+
+STATEMENTS = [
+    "    {a} = {b} + {n}",
+    "    {a} = {a} * {n}",
+    "    for {c} in range(len({b})):\n        {a} += {b}[{c}]",
+    "    if {a} > {n}:\n        {a} = {a} - {b}",
+    "    {a} = [{c} * {n} for {c} in {b}]",
+    "    while {a} < {n}:\n        {a} += 1",
+    "    {a} = {b}.get({c}, {n})",
+    "    print({a}, {b})",
+]
+
+
+def snippet(seed: int, renamed: bool = False, edited: bool = False) -> str:
+    """A function whose structure depends on seed; renamed changes only the names"""
+    structure = random.Random(seed)
+    names = random.Random(seed * 7919 + (1 if renamed else 0))
+    words = names.sample(WORDS, 6)
+    suffix = f"_{names.randrange(1000)}"
+    lines = [f"def {words[0]}{suffix}({words[1]}, {words[2]}):"]
+    if renamed:
+        lines.append("    # renamed copy")
+    for _ in range(structure.randrange(6, 12)):
+        a, b, c = (words[structure.randrange(1, 6)] for _ in range(3))
+        lines.append(structure.choice(STATEMENTS).format(a=a, b=b, c=c, n=structure.randrange(100)))
+    if edited:
+        lines.append(f"    print('checked', {words[1]})")
+    lines.append(f"    return {words[1]}")
+    return "\n".join(lines) + "\n"
+
+
+def percentiles(seconds):
+    ms = sorted(s * 1000 for s in seconds)
+    return f"p50 {statistics.median(ms):7.3f} ms   p99 {ms[min(len(ms) - 1, int(len(ms) * 0.99))]:7.3f} ms"
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    result = {"transformed_code": "", "explanations": [], "suggestions": []}
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    index = similarity.SnippetIndex(capacity=entries)
+    start = time.perf_counter()
+    for seed in range(entries):
+        index.add(snippet(seed), "python", NAMESPACE, result)
+        if seed and seed % 100_000 == 0:
+            print(f"  {seed:>9,} entries  {seed / (time.perf_counter() - start):8.0f} inserts/s")
+    build = time.perf_counter() - start
+    current = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) * 1024
+    print(f"{entries:,} entries built in {build:.1f}s ({entries / build:.0f} inserts/s)")
+    print(f"  memory {current / 2**20:8.1f} MiB  ({current / entries:.0f} bytes per entry)")
+
+    picker = random.Random(1)
+    kinds = {
+        "renamed": lambda: snippet(picker.randrange(entries), renamed=True),
+        "edited": lambda: snippet(picker.randrange(entries), edited=True),
+        "unseen": lambda: snippet(entries + picker.randrange(10 * entries)),
+    }
+    for kind, make in kinds.items():
+        fingerprint_seconds, lookup_seconds, found = [], [], 0
+        for _ in range(queries):
+            code = make()
+            t0 = time.perf_counter()
+            fp = similarity.fingerprint(code, "python", NAMESPACE)
+            t1 = time.perf_counter()
+            match = index.lookup(fp)
+            t2 = time.perf_counter()
+            fingerprint_seconds.append(t1 - t0)
+            lookup_seconds.append(t2 - t1)
+            found += match is not None
+        print(f"  {kind:<8} found {found / queries:6.1%}   fingerprint {percentiles(fingerprint_seconds)}"
+              f"   lookup {percentiles(lookup_seconds)}")
+
+
+if __name__ == "__main__":
+    main()
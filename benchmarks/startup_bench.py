@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the Syntax Shift API
+
+Spawns fresh interpreters and measures how long it takes to import the app
+and answer the first liveness/readiness probes.
+
+Usage: python benchmarks/startup_bench.py [runs]
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+PROBE = r"""
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    client.get("/api/health")
+    live = time.perf_counter()
+    client.get("/api/ready")
+    ready = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "live": live - start,
+    "ready": ready - start,
+}))
+"""
+
+
+def run_once() -> dict:
+    """Measure one cold start in a fresh interpreter"""
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    samples = [run_once() for _ in range(runs)]
+
+    print(f"Cold start over {runs} runs (seconds)")
+    for key in ("import", "live", "ready"):
+        values = [sample[key] for sample in samples]
+        print(f"  {key:<7} median={statistics.median(values):.4f}  max={max(values):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,13 @@ const AppState = {
     transformedCode: '',
     currentLanguage: 'python',
     targetLanguage: 'javascript',
-    isProcessing: false
+    isProcessing: false,
+    // Lets the server reuse this tab's earlier explanations
+    sessionId: sessionStorage.getItem('sessionId') || (() => {
+        const id = Math.random().toString(36).slice(2) + Date.now().toString(36);
+        sessionStorage.setItem('sessionId', id);
+        return id;
+    })()
 };
 
 // ===== Sample Code Data =====
@@ -299,9 +305,16 @@ async function handleCodeOperation(operation) {
             code: code,
             source_language: AppState.currentLanguage,
             target_language: operation === 'convert' ? AppState.targetLanguage : null,
-            operation: operation
+            operation: operation,
+            // We already hold the input, so ask for a diff instead of echoed code
+            include_original: false,
+            code_format: 'diff'
         });
         
+        if (result.transformed_diff !== undefined) {
+            result.transformed_code = applyUnifiedDiff(code, result.transformed_diff);
+        }
+        
         if (result.success) {
             AppState.transformedCode = result.transformed_code;
             displayResults(result, operation);
@@ -321,14 +334,27 @@ async function handleCodeOperation(operation) {
 }
 
 // ===== API Communication =====
+// Give up on slow requests; aborting the fetch also cancels the server's remaining LLM calls
+const REQUEST_TIMEOUT_SECONDS = 60;
+
 async function makeAPIRequest(operation, data) {
-    const response = await fetch('/api/transform', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(data)
-    });
+    const controller = new AbortController();
+    const timer = setTimeout(() => controller.abort(), REQUEST_TIMEOUT_SECONDS * 1000);
+    let response;
+    try {
+        response = await fetch('/api/transform', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-Session-ID': AppState.sessionId,
+                'X-Request-Timeout': String(REQUEST_TIMEOUT_SECONDS),
+            },
+            body: JSON.stringify(data),
+            signal: controller.signal
+        });
+    } finally {
+        clearTimeout(timer);
+    }
     
     if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
@@ -337,6 +363,34 @@ async function makeAPIRequest(operation, data) {
     return await response.json();
 }
 
+// Rebuild the transformed code from a zero-context unified diff against the input
+function applyUnifiedDiff(original, diff) {
+    if (!diff) return original;
+    
+    const source = original.split('\n');
+    const output = [];
+    let position = 0;
+    let inHunk = false;
+    
+    for (const line of diff.split('\n')) {
+        const hunk = line.match(/^@@ -(\d+)(?:,(\d+))? \+\d+(?:,\d+)? @@/);
+        if (hunk) {
+            inHunk = true;
+            const start = parseInt(hunk[1], 10);
+            const count = hunk[2] === undefined ? 1 : parseInt(hunk[2], 10);
+            // A pure insertion is anchored after line `start`, otherwise it replaces from `start`
+            const hunkStart = count === 0 ? start : start - 1;
+            output.push(...source.slice(position, hunkStart));
+            position = hunkStart + count;
+        } else if (inHunk && line.startsWith('+')) {
+            output.push(line.slice(1));
+        }
+    }
+    
+    output.push(...source.slice(position));
+    return output.join('\n');
+}
+
 // ===== Results Display =====
 function displayResults(result, operation) {
     // Show results section
@@ -622,8 +676,52 @@ elements.codeInput.addEventListener('input', function() {
     }, 1000);
 });
 
+// Live analysis: local diagnostics on every pause in typing, AI explanations once the edits settle
+const LiveAnalysis = {
+    socket: null,
+    editId: 0,
+    suggestions: [],
+    timeout: null,
+
+    connect() {
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        const url = `${protocol}//${window.location.host}/ws/analyze?session=${encodeURIComponent(AppState.sessionId)}`;
+        this.socket = new WebSocket(url);
+        this.socket.addEventListener('message', (event) => this.receive(JSON.parse(event.data)));
+        this.socket.addEventListener('close', () => {
+            this.socket = null;
+        });
+    },
+
+    send(code, language) {
+        if (!this.socket || this.socket.readyState !== WebSocket.OPEN) return;
+        this.editId += 1;
+        this.socket.send(JSON.stringify({ type: 'edit', id: this.editId, code, language, ai: true }));
+    },
+
+    receive(message) {
+        // Results for an older edit are stale; the server cancels them but some may already be in flight
+        if (message.id !== this.editId || AppState.isProcessing) return;
+        if (message.type === 'diagnostics') {
+            this.suggestions = message.suggestions || [];
+            displayExplanations(message.explanations || [], this.suggestions);
+        } else if (message.type === 'analysis') {
+            displayExplanations(message.explanations || [], this.suggestions);
+        }
+    }
+};
+
+elements.codeInput.addEventListener('input', function() {
+    clearTimeout(LiveAnalysis.timeout);
+    LiveAnalysis.timeout = setTimeout(() => {
+        if (!LiveAnalysis.socket) LiveAnalysis.connect();
+        LiveAnalysis.send(elements.codeInput.value, elements.sourceLanguage.value);
+    }, 400);
+});
+
 // Load saved code on page load
 window.addEventListener('load', function() {
+    LiveAnalysis.connect();
     const savedCode = localStorage.getItem('syntaxshift_code');
     const savedLanguage = localStorage.getItem('syntaxshift_language');
     
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Reports over the structured request log (REQUEST_LOG_DIR)
+
+Reads every requests-*.parquet, .arrow and .jsonl file in the log
+directory (Parquet and Arrow files need pyarrow; the file still being
+written is skipped until it is rotated) and prints:
+- latency: requests, p50/p95/p99 and error rate per endpoint and operation
+- stages: time per stage (LLM calls, similarity, serialize, ...)
+- sizes: input size per operation
+- failures: status codes and the most common error messages
+- cache: reuse, memo hits, degraded answers and tokens per operation
+
+Usage: python scripts/request_report.py [log_dir] [--since HOURS] [--report NAME]
+       (defaults: logs/requests, all time, all reports)
+"""
+
+import argparse
+import json
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+try:
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+def load(directory: Path, since: float):
+    rows = []
+    for path in sorted(directory.glob("requests-*")):
+        try:
+            if path.suffix == ".jsonl":
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            rows.append(json.loads(line))
+                        except ValueError:
+                            break  # a line cut short by a crash
+            elif pyarrow is None:
+                print(f"skipping {path.name}: pyarrow is not installed")
+                continue
+            elif path.suffix == ".parquet":
+                rows.extend(pyarrow.parquet.read_table(path).to_pylist())
+            elif path.suffix == ".arrow":
+                rows.extend(pyarrow.ipc.open_file(path).read_all().to_pylist())
+        except Exception as e:
+            print(f"skipping {path.name}: {e}")
+    for row in rows:
+        # Arrow map columns come back as (key, value) pairs
+        if isinstance(row.get("stage_ms"), list):
+            row["stage_ms"] = dict(row["stage_ms"])
+    return [row for row in rows if row["ts"] >= since]
+
+
+def pct(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0
+
+
+def failed(row) -> bool:
+    return row["status"] >= 400 or row.get("success") is False
+
+
+def report_latency(rows):
+    print("\nLatency (ms) per endpoint and operation")
+    groups = defaultdict(list)
+    for row in rows:
+        groups[(row["path"], row.get("operation") or "-")].append(row)
+    for (path, operation), group in sorted(groups.items()):
+        ms = [r["duration_ms"] for r in group]
+        errors = sum(failed(r) for r in group) / len(group)
+        print(f"  {path:<26} {operation:<16} n={len(group):<7} p50 {pct(ms, .5):8.1f}  p95 {pct(ms, .95):8.1f}"
+              f"  p99 {pct(ms, .99):8.1f}  errors {errors:6.1%}")
+
+
+def report_stages(rows):
+    print("\nTime per stage (ms)")
+    stages = defaultdict(list)
+    for row in rows:
+        for stage, ms in (row.get("stage_ms") or {}).items():
+            stages[stage].append(ms)
+    total = sum(sum(ms) for ms in stages.values()) or 1
+    for stage, ms in sorted(stages.items(), key=lambda item: -sum(item[1])):
+        print(f"  {stage:<28} n={len(ms):<7} p50 {pct(ms, .5):8.1f}  p95 {pct(ms, .95):8.1f}"
+              f"  share {sum(ms) / total:6.1%}")
+
+
+def report_sizes(rows):
+    print("\nInput size per operation")
+    groups = defaultdict(list)
+    for row in rows:
+        if row.get("code_chars") is not None:
+            groups[row.get("operation") or "-"].append(row)
+    for operation, group in sorted(groups.items()):
+        chars = [r["code_chars"] for r in group]
+        lines = [r["code_lines"] for r in group]
+        print(f"  {operation:<16} n={len(group):<7} chars p50 {pct(chars, .5):7}  p95 {pct(chars, .95):7}"
+              f"  max {max(chars):7}   lines p50 {pct(lines, .5):5}  p95 {pct(lines, .95):5}")
+
+
+def report_failures(rows):
+    print("\nFailures")
+    statuses = Counter(row["status"] for row in rows)
+    print("  status " + "  ".join(f"{status}: {count}" for status, count in sorted(statuses.items())))
+    errors = Counter((row.get("error") or "")[:80] for row in rows if failed(row) and row.get("error"))
+    for message, count in errors.most_common(10):
+        print(f"  {count:>7}  {message}")
+
+
+def report_cache(rows):
+    print("\nReuse, memo hits, degraded answers and tokens per operation")
+    groups = defaultdict(list)
+    for row in rows:
+        if row.get("operation"):
+            groups[row["operation"]].append(row)
+    for operation, group in sorted(groups.items()):
+        n = len(group)
+        reused = Counter(r.get("reused") for r in group)
+        print(f"  {operation:<16} n={n:<7} reused exact {reused['exact'] / n:6.1%}  near {reused['near'] / n:6.1%}"
+              f"  memo hits {sum(bool(r.get('cache_hits')) for r in group) / n:6.1%}"
+              f"  degraded {sum(bool(r.get('degraded')) for r in group) / n:6.1%}"
+              f"  tokens/request {sum((r.get('prompt_tokens') or 0) + (r.get('completion_tokens') or 0) for r in group) / n:8.0f}")
+
+
+REPORTS = {
+    "latency": report_latency,
+    "stages": report_stages,
+    "sizes": report_sizes,
+    "failures": report_failures,
+    "cache": report_cache,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reports over the structured request log")
+    parser.add_argument("log_dir", nargs="?", default="logs/requests")
+    parser.add_argument("--since", type=float, help="only the last N hours")
+    parser.add_argument("--report", choices=sorted(REPORTS), help="a single report")
+    args = parser.parse_args()
+
+    since = time.time() - args.since * 3600 if args.since else 0
+    rows = load(Path(args.log_dir), since)
+    print(f"{len(rows)} requests from {args.log_dir}")
+    if not rows:
+        return
+    for name, report in REPORTS.items():
+        if args.report in (None, name):
+            report(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -86,7 +86,11 @@ def install_dependencies(venv_name):
         "groq",
         "python-multipart",
         "jinja2",
-        "aiofiles"
+        "aiofiles",
+        "tree-sitter",
+        "tree-sitter-javascript",
+        "tree-sitter-cpp",
+        "tree-sitter-java"
     ]
     
     try:
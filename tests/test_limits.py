@@ -0,0 +1,14 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import limits
+import main
+
+
+def test_chunked_body_over_the_limit_is_rejected():
+    body = json.dumps({"code": "x" * (limits.MAX_BODY_BYTES + 1), "language": "python"}).encode()
+    chunks = (body[i:i + 65536] for i in range(0, len(body), 65536))
+    response = TestClient(main.app).post("/api/complexity", content=chunks,
+                                         headers={"content-type": "application/json"})
+    assert response.status_code == 413
@@ -0,0 +1,43 @@
+import asyncio
+import threading
+
+from fastapi.testclient import TestClient
+
+import limits
+import live
+import main
+
+
+def test_malformed_frames_get_an_error_and_keep_the_socket_open():
+    with TestClient(main.app).websocket_connect("/ws/analyze") as ws:
+        ws.send_text("not json")
+        assert ws.receive_json()["message"] == "Messages must be JSON objects"
+        ws.send_json([1, 2])
+        assert ws.receive_json()["message"] == "Messages must be JSON objects"
+        ws.send_json({"id": 1, "code": 42})
+        assert ws.receive_json() == {"type": "error", "id": 1, "status": 400, "message": "'code' must be a string"}
+        ws.send_json({"id": 2, "code": "x = 1", "language": "cobol"})
+        assert ws.receive_json()["message"] == "Unsupported language: cobol"
+        ws.send_json({"id": 3, "code": "x = 1\n", "language": "python", "ai": False})
+        assert ws.receive_json()["type"] == "diagnostics"
+
+
+def test_cancelled_analysis_keeps_its_slot_until_the_thread_returns():
+    gate = limits.AdmissionGate(1, 0, 1)
+    release = threading.Event()
+
+    async def analyze():
+        async with gate.admit():
+            await live.run_to_completion(release.wait)
+
+    async def scenario():
+        task = asyncio.create_task(analyze())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.sleep(0.05)
+        assert gate.active == 1 and not task.done()
+        release.set()
+        await asyncio.gather(task, return_exceptions=True)
+        assert gate.active == 0 and task.cancelled()
+
+    asyncio.run(scenario())
@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+import llm
+from converter import LanguageConverter
+
+FIELDS = {"converted_code": str, "conversion_notes": [str], "language_differences": [str]}
+
+
+def test_auxiliary_fields_are_coerced():
+    reply = json.dumps({"converted_code": "int x;", "conversion_notes": ["ok", 3, None],
+                        "language_differences": "C++ is static"})
+    assert llm.parse_json(reply, FIELDS, required=("converted_code",)) == {
+        "converted_code": "int x;", "conversion_notes": ["ok"], "language_differences": ["C++ is static"],
+    }
+
+
+def test_required_field_must_be_present_and_typed():
+    with pytest.raises(ValueError):
+        llm.parse_json('{"conversion_notes": []}', FIELDS, required=("converted_code",))
+    with pytest.raises(ValueError):
+        llm.parse_json('{"converted_code": ["int x;"]}', FIELDS, required=("converted_code",))
+
+
+def test_conversion_keeps_valid_code_despite_a_mistyped_note(monkeypatch):
+    monkeypatch.setattr(llm, "complete", lambda *args, **kwargs: json.dumps(
+        {"converted_code": "int main() {}", "language_differences": "C++ is static"}))
+    code, notes = LanguageConverter().convert_language("x = 1", "python", "cpp")
+    assert code == "int main() {}"
+    assert "C++ is static" in notes and not any("failed" in note for note in notes)
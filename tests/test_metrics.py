@@ -0,0 +1,14 @@
+import explainer
+import metrics
+
+
+def test_long_expression_does_not_exhaust_the_stack():
+    result = metrics.analyze_python("x = " + "+".join(["1"] * 2000) + "\n")
+    assert result["halstead"]["total_operators"] == 1999
+
+
+def test_too_deep_for_the_parser_falls_back_to_basic_metrics():
+    code = "x = " + "+".join(["1"] * 20000) + "\n"
+    analysis = explainer.CodeExplainer()
+    assert analysis.get_code_complexity(code, "python")["complexity_level"] == "Unknown"
+    assert analysis.explain_locally(code, "python")
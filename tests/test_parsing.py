@@ -0,0 +1,43 @@
+import pytest
+
+import live
+import parsing
+
+pytest.importorskip("tree_sitter_javascript")
+
+VERSION_1 = "function total(items) {\n  let sum = 0;\n  for (const x of items) sum += x;\n  return sum;\n}\n"
+VERSION_2 = VERSION_1.replace("sum += x", "sum += x * 2")
+
+
+class RecordingParser:
+    """Wraps a tree-sitter parser and records the old tree passed to each parse"""
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.old_trees = []
+
+    def parse(self, source, old_tree=None):
+        self.old_trees.append(old_tree)
+        return self.parser.parse(source) if old_tree is None else self.parser.parse(source, old_tree)
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    real = parsing._get_parser("javascript")
+    recorder = RecordingParser(real)
+    monkeypatch.setitem(parsing._parsers, "javascript", recorder)
+    return recorder
+
+
+def test_edit_reparses_against_the_previous_tree(recorder):
+    first = parsing.parse(VERSION_1, "javascript", "doc-1")
+    second = parsing.parse(VERSION_2, "javascript", "doc-1")
+    assert recorder.old_trees == [None, first]
+    assert str(second.root_node) == str(recorder.parser.parse(VERSION_2.encode()).root_node)
+
+
+def test_live_diagnostics_reuse_the_document_tree(recorder):
+    live.local_diagnostics(VERSION_1 + "// live 1\n", "javascript", "live:test")
+    live.local_diagnostics(VERSION_2 + "// live 1\n", "javascript", "live:test")
+    assert len(recorder.old_trees) == 2
+    assert recorder.old_trees[0] is None and recorder.old_trees[1] is not None
@@ -0,0 +1,9 @@
+import perfcheck
+
+
+def test_zero_mean_is_inconclusive(monkeypatch):
+    assert perfcheck._speedup_interval([0.0, 0.0], [1e-6, 1e-6]) is None
+    monkeypatch.setattr(perfcheck, "_run_harness", lambda *args, **kwargs: {
+        "samples": [0.0] * perfcheck.REPEAT, "number": 1, "peak_bytes": 0, "output": "same"})
+    report = perfcheck.PerformanceChecker()._measure("x = 1", "x = 1", None)
+    assert report["verdict"] == "inconclusive"
@@ -0,0 +1,16 @@
+import os
+
+import profiling
+
+
+def test_only_the_newest_profiles_are_kept(tmp_path):
+    ids = []
+    for age in range(5):
+        profile = profiling.Profile("/api/transform")
+        profile.save(tmp_path)
+        for path in tmp_path.glob(f"{profile.id}.*"):
+            os.utime(path, (age, age))
+        ids.append(profile.id)
+    profiling._prune(tmp_path, keep=2)
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        f"{profile_id}{suffix}" for profile_id in ids[-2:] for suffix in (".folded", ".json"))
@@ -0,0 +1,45 @@
+import context
+import llm
+import project
+
+FILES = [
+    ("pkg/util.py", "def total_price(items):\n    return sum(items)\n"),
+    ("pkg/app.py", "from pkg.util import total_price\n\nprint(total_price([1, 2]))\n"),
+]
+
+
+def run(monkeypatch, reply, use_ai=True, ctx=None):
+    def complete(*args, **kwargs):
+        context.check()
+        return reply
+    monkeypatch.setattr(llm, "complete", complete)
+    with context.activate(ctx or context.RequestContext("test", "convert_project")):
+        events = list(project.convert_project(project.Project(FILES), "javascript", use_ai))
+    return [e for e in events if e["type"] == "module"], events[-1]
+
+
+def test_unusable_replies_fail_the_module(monkeypatch):
+    modules, done = run(monkeypatch, "not json")
+    assert [m["success"] for m in modules] == [False, False]
+    assert all(m["converted_code"] is None and "AI conversion failed" in m["error_message"] for m in modules)
+    assert done["failed"] == 2
+
+
+def test_cancelled_modules_fail(monkeypatch):
+    ctx = context.RequestContext("test", "convert_project")
+    ctx.cancel()
+    modules, done = run(monkeypatch, '{"converted_code": "x"}', ctx=ctx)
+    assert all(not m["success"] and m["error_message"] == "Request was cancelled" for m in modules)
+    assert done["failed"] == len(FILES)
+
+
+def test_degraded_modules_fail(monkeypatch):
+    modules, done = run(monkeypatch, "", use_ai=False)
+    assert all(m["degraded"] and not m["success"] for m in modules)
+    assert done["failed"] == 2 and done["degraded"]
+
+
+def test_converted_modules_succeed(monkeypatch):
+    modules, done = run(monkeypatch, '{"converted_code": "export const x = 1;", "interface": ["x"]}')
+    assert all(m["success"] and m["converted_code"] == "export const x = 1;" for m in modules)
+    assert done["failed"] == 0
@@ -0,0 +1,71 @@
+import similarity
+
+NAMESPACE = "client|optimize|python|"
+RESULT = {"transformed_code": "total = sum(f(x) for x in items)\nprint(total)\n",
+          "explanations": ["Summed with a generator"], "suggestions": []}
+
+
+def _index_with(code, result=RESULT):
+    index = similarity.SnippetIndex(capacity=10)
+    index.add(code, "python", NAMESPACE, result)
+    return index
+
+
+def _reuse(index, code):
+    fp = similarity.fingerprint(code, "python", NAMESPACE)
+    match = index.lookup(fp)
+    return match and similarity.adapt(match, code, fp.names, "python", "python", allow_merge=True)
+
+
+def test_indentation_only_change_is_not_reused():
+    stored = "for x in items:\n    total = f(x)\nprint(total)\n"
+    indented = "for x in items:\n    total = f(x)\n    print(total)\n"
+    assert similarity.fingerprint(stored, "python", NAMESPACE).exact_key != \
+        similarity.fingerprint(indented, "python", NAMESPACE).exact_key
+    index = _index_with(stored)
+    match = index.lookup(similarity.fingerprint(indented, "python", NAMESPACE))
+    assert match is None or not match.exact
+
+
+def test_renamed_copy_is_reused_with_new_names():
+    index = _index_with("for x in items:\n    total = f(x)\nprint(total)\n")
+    reused = _reuse(index, "for y in rows:  # same loop\n  acc = f(y)\nprint(acc)\n")
+    assert reused["transformed_code"] == "acc = sum(f(y) for y in rows)\nprint(acc)\n"
+
+
+def test_rename_clashing_with_introduced_name_is_not_reused():
+    result = {"transformed_code": "result = [f(x) for x in items]\nprint(result)\n",
+              "explanations": [], "suggestions": []}
+    index = _index_with("out = []\nfor x in items:\n    out.append(f(x))\nprint(out)\n", result)
+    # `result` was introduced by the rewrite; the new input calls its list `result` too
+    assert not _reuse(index, "result = []\nfor x in items:\n    result.append(f(x))\nprint(result)\n")
+
+
+def test_renamed_convert_is_not_reused_across_languages():
+    namespace = "client|convert|python|javascript"
+    index = similarity.SnippetIndex(capacity=10)
+    index.add("def total_price(items):\n    return len(items)\n", "python", namespace,
+              {"transformed_code": "function totalPrice(items) {\n  return items.length;\n}\n",
+               "explanations": [], "suggestions": []})
+    code = "def order_count(rows):\n    return len(rows)\n"
+    fp = similarity.fingerprint(code, "python", namespace)
+    match = index.lookup(fp)
+    assert match.exact
+    assert similarity.adapt(match, code, fp.names, "python", "javascript", allow_merge=False) is None
+
+
+def test_old_name_left_in_an_fstring_is_not_reused():
+    result = {"transformed_code": "total = sum(items)\nprint(f\"{total}\")\n", "explanations": [], "suggestions": []}
+    index = _index_with("total = 0\nfor x in items:\n    total += x\nprint(total)\n", result)
+    assert not _reuse(index, "acc = 0\nfor x in items:\n    acc += x\nprint(acc)\n")
+
+
+def test_keyword_arguments_and_imports_stay_literal():
+    def key(code):
+        return similarity.fingerprint(code, "python", NAMESPACE).exact_key
+
+    assert key("plot(xs, color=c)\n") != key("plot(xs, label=c)\n")
+    assert key("from math import sqrt\nprint(sqrt(x))\n") != key("from math import floor\nprint(floor(x))\n")
+    assert key("import numpy as np\nnp.array(x)\n") != key("import pandas as np\nnp.array(x)\n")
+    assert key("import numpy as np\nnp.array(x)\n") == key("import numpy as n\nn.array(x)\n")
+    assert similarity.tokenize("import { readFile } from 'fs';\nreadFile(p);", "javascript")[1] == ["p"]